@@ -0,0 +1,253 @@
+"""
+Price statistics per category and specification facet, from a columnar snapshot.
+
+Each process keeps an Arrow table with one row per item: id, category, price,
+updated_at, and one string column per facet pulled out of specifications
+(car year and make, house bedrooms, ...). Specifications are parsed once per
+refresh instead of on every request, and every statistic is a vectorized
+pass over the price column: percentiles, a histogram, and a group-by per
+facet value with t-digest quartiles.
+
+A refresh only re-reads items whose updated_at moved past the previous
+refresh (idx_item_updated_at, migration 0013). It drops the ids that the
+item_deletion table (migration 0015) recorded as deleted since then. It
+reloads everything when many rows changed, or every few refreshes, to pick
+up rows written around the updated_at column and deletes made outside the
+ORM. The table can be kept in a Parquet file (ANALYTICS_PARQUET_PATH), so a
+new process starts from it and only reads what changed since.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import select
+
+FACETS = {
+    'cars': ('year', 'make', 'condition'),
+    'houses': ('bedrooms', 'bathrooms', 'location'),
+    'furniture': ('material', 'condition'),
+}
+FACET_COLUMNS = sorted({facet for facets in FACETS.values() for facet in facets})
+PERCENTILES = (10, 25, 50, 75, 90)
+FACET_QUANTILES = (0.25, 0.5, 0.75)
+DEFAULT_BINS = 20
+MAX_BINS = 100
+BATCH_SIZE = 50000
+# Reload everything when more than this fraction of rows changed since the last refresh
+FULL_REFRESH_FRACTION = 0.2
+FULL_REFRESH_EVERY = 12
+# Transactions that committed after a refresh with an older updated_at are still picked up
+WATERMARK_OVERLAP = timedelta(seconds=60)
+# item_deletion rows are kept this long (`python jobs.py purge`); older Parquet copies are not used
+DELETION_RETENTION = timedelta(days=7)
+
+SCHEMA = pa.schema(
+    [('id', pa.int64()), ('category', pa.string()), ('price', pa.float64()), ('updated_at', pa.timestamp('us'))]
+    + [(facet, pa.string()) for facet in FACET_COLUMNS]
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _facet_value(value):
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _to_table(rows):
+    columns = {name: [] for name in SCHEMA.names}
+    for row in rows:
+        columns['id'].append(row.id)
+        columns['category'].append(row.category)
+        columns['price'].append(row.price)
+        columns['updated_at'].append(row.updated_at)
+        specifications = row.specifications if isinstance(row.specifications, dict) else {}
+        for facet in FACET_COLUMNS:
+            columns[facet].append(_facet_value(specifications.get(facet)))
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def load_items(connection, item_table, since=None, batch_size=BATCH_SIZE):
+    """Read items (updated at or after `since`, if given) into an Arrow table."""
+    columns = item_table.c
+    statement = select(columns.id, columns.category, columns.price, columns.specifications, columns.updated_at)
+    if since is not None:
+        statement = statement.where(columns.updated_at >= since)
+    result = connection.execution_options(yield_per=batch_size).execute(statement)
+    tables = [_to_table(batch) for batch in result.partitions()]
+    return pa.concat_tables(tables) if tables else SCHEMA.empty_table()
+
+
+def load_deleted_ids(connection, deletion_table, since):
+    """Ids deleted at or after `since`, and the latest deleted_at among them (None if there are none)."""
+    columns = deletion_table.c
+    rows = connection.execute(select(columns.item_id, columns.deleted_at).where(columns.deleted_at >= since)).all()
+    return pa.array([row.item_id for row in rows], pa.int64()), max((row.deleted_at for row in rows), default=None)
+
+
+def _round(value):
+    return None if value is None else round(float(value), 2)
+
+
+def _sort_key(value):
+    # Numeric facets (year, bedrooms) sort as numbers, the rest alphabetically
+    try:
+        return 0, float(value), ''
+    except ValueError:
+        return 1, 0.0, value
+
+
+class PriceSnapshot:
+    """The columnar item snapshot of this process and the statistics computed from it."""
+
+    def __init__(self, parquet_path=None, overlap=WATERMARK_OVERLAP, full_refresh_every=FULL_REFRESH_EVERY):
+        self.parquet_path = parquet_path
+        self.overlap = overlap
+        self.full_refresh_every = full_refresh_every
+        self.table = None
+        self.watermark = None
+        self.deleted_watermark = None
+        self.refreshed_at = None
+        self.incremental_refreshes = 0
+        self.results = {}
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()
+
+    def _swap(self, table, deleted_watermark=None):
+        watermark = pc.max(table['updated_at']).as_py() if table.num_rows else None
+        with self.lock:
+            self.table, self.watermark, self.refreshed_at = table, watermark, datetime.utcnow()
+            # Deletes are certainly applied up to the newest row's update
+            self.deleted_watermark = deleted_watermark or watermark
+            self.results = {}
+
+    def load_parquet(self):
+        """Start from the Parquet copy, if there is one recent enough; returns whether it was loaded."""
+        if not self.parquet_path or not os.path.exists(self.parquet_path):
+            return False
+        table = pq.read_table(self.parquet_path, schema=SCHEMA)
+        # Deletes older than DELETION_RETENTION may already be purged from item_deletion
+        watermark = pc.max(table['updated_at']).as_py() if table.num_rows else None
+        if watermark is None or watermark < datetime.utcnow() - DELETION_RETENTION + self.overlap:
+            return False
+        self._swap(table)
+        return True
+
+    def save_parquet(self):
+        if not self.parquet_path:
+            return
+        writing = f'{self.parquet_path}.{os.getpid()}.tmp'
+        pq.write_table(self.table, writing)
+        os.replace(writing, self.parquet_path)
+
+    def refresh(self, connection, item_table, deletion_table):
+        """Bring the snapshot up to date; returns ('full' or 'incremental', rows read)."""
+        table = self.table
+        if (table is None or self.watermark is None
+                or self.incremental_refreshes >= self.full_refresh_every):
+            # Everything deleted before the load started is already missing from it
+            deleted_watermark = datetime.utcnow()
+            table = load_items(connection, item_table)
+            mode, read = 'full', table.num_rows
+            self.incremental_refreshes = 0
+        else:
+            changed = load_items(connection, item_table, since=self.watermark - self.overlap)
+            if changed.num_rows > FULL_REFRESH_FRACTION * max(table.num_rows, 1):
+                self.incremental_refreshes = self.full_refresh_every
+                return self.refresh(connection, item_table, deletion_table)
+            deleted, latest = load_deleted_ids(connection, deletion_table, self.deleted_watermark - self.overlap)
+            replaced = pa.concat_arrays([changed['id'].combine_chunks(), deleted])
+            table = pa.concat_tables([table.filter(pc.invert(pc.is_in(table['id'], replaced))), changed])
+            deleted_watermark = max(self.deleted_watermark, latest) if latest else self.deleted_watermark
+            mode, read = 'incremental', changed.num_rows
+            self.incremental_refreshes += 1
+        self._swap(table.combine_chunks(), deleted_watermark)
+        self.save_parquet()
+        return mode, read
+
+    def refresh_if_stale(self, connect, item_table, deletion_table, max_age):
+        """Refresh when older than max_age seconds, in one thread at a time; callers wait only for the first load.
+
+        `connect` is called, only when refreshing, for the connection to read from.
+        """
+        def fresh():
+            return self.table is not None and (datetime.utcnow() - self.refreshed_at).total_seconds() < max_age
+
+        if fresh() or not self.refreshing.acquire(blocking=self.table is None):
+            return False
+        try:
+            # Another thread may have loaded it while this one waited
+            if fresh():
+                return False
+            if self.table is None and self.load_parquet():
+                logger.info("Loaded price analytics snapshot from %s", self.parquet_path)
+            mode, read = self.refresh(connect(), item_table, deletion_table)
+            logger.info("Price analytics %s refresh read %d rows", mode, read)
+            return True
+        finally:
+            self.refreshing.release()
+
+    def price_stats(self, category, facet=None, bins=DEFAULT_BINS):
+        """Price distribution of a category, broken down by a facet if given; cached until the next refresh."""
+        key = (category, facet, bins)
+        with self.lock:
+            table, refreshed_at = self.table, self.refreshed_at
+            cached = self.results.get(key)
+        if cached is not None:
+            return cached
+
+        rows = table.filter(pc.and_(pc.equal(table['category'], category), pc.is_valid(table['price'])))
+        prices = rows['price'].to_numpy()
+        result = {
+            'category': category,
+            'as_of': refreshed_at.isoformat(),
+            'count': len(prices),
+            'min': None, 'max': None, 'mean': None,
+            'percentiles': {},
+            'histogram': {'edges': [], 'counts': []},
+        }
+        if len(prices):
+            counts, edges = np.histogram(prices, bins=bins)
+            result.update({
+                'min': _round(prices.min()),
+                'max': _round(prices.max()),
+                'mean': _round(prices.mean()),
+                'percentiles': {f'p{pct}': _round(value)
+                                for pct, value in zip(PERCENTILES, np.percentile(prices, PERCENTILES))},
+                'histogram': {'edges': [_round(edge) for edge in edges], 'counts': counts.tolist()},
+            })
+        if facet is not None:
+            result['facet'] = facet
+            result['facets'] = self._facet_breakdown(rows, facet)
+
+        with self.lock:
+            if self.refreshed_at == refreshed_at:
+                self.results[key] = result
+        return result
+
+    def _facet_breakdown(self, rows, facet):
+        grouped = rows.filter(pc.is_valid(rows[facet])).group_by(facet).aggregate([
+            ('price', 'count'), ('price', 'min'), ('price', 'max'), ('price', 'mean'),
+            ('price', 'tdigest', pc.TDigestOptions(q=list(FACET_QUANTILES))),
+        ]).to_pylist()
+        breakdown = []
+        for group in sorted(grouped, key=lambda group: _sort_key(group[facet])):
+            quartiles = group['price_tdigest']
+            breakdown.append({
+                'value': group[facet],
+                'count': group['price_count'],
+                'min': _round(group['price_min']),
+                'max': _round(group['price_max']),
+                'mean': _round(group['price_mean']),
+                **{f'p{int(q * 100)}': _round(value) for q, value in zip(FACET_QUANTILES, quartiles)},
+            })
+        return breakdown
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline.
+
+The build step purges Tailwind down to the classes that appear in templates/,
+writes every asset to static/ under a content-hash filename and records the
+mapping in static/manifest.json. At runtime asset_url() resolves logical names
+such as 'css/tailwind.css' through the manifest, so fingerprinted files can be
+served with far-future immutable cache headers.
+
+Usage:
+    python assets.py build                           # download Tailwind from the CDN
+    python assets.py build path/to/tailwind.min.css  # use a local copy
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+SOURCE_DIR = os.path.join(BASE_DIR, 'assets')
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+MANIFEST_NAME = 'manifest.json'
+
+TAILWIND_VERSION = '2.2.19'
+TAILWIND_URL = f'https://cdn.jsdelivr.net/npm/tailwindcss@{TAILWIND_VERSION}/dist/tailwind.min.css'
+TAILWIND_ASSET = 'css/tailwind.css'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Same idea as Tailwind's default PurgeCSS extractor: any run of class-like characters
+CANDIDATE_PATTERN = re.compile(r'[^<>"\'`\s]*[^<>"\'`\s:]')
+CLASS_SELECTOR_PATTERN = re.compile(r'\.((?:\\.|[\w-])+)')
+FINGERPRINT_PATTERN = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+
+def used_class_names(template_dir=TEMPLATES_DIR):
+    """Collect every token in the templates that could be a class name."""
+    names = set()
+    for path in glob.glob(os.path.join(template_dir, '**', '*.html'), recursive=True):
+        with open(path, encoding='utf-8') as f:
+            names.update(CANDIDATE_PATTERN.findall(f.read()))
+    return names
+
+
+def _skip_string(css, index):
+    quote = css[index]
+    index += 1
+    while css[index] != quote:
+        index += 2 if css[index] == '\\' else 1
+    return index + 1
+
+
+def _matching_brace(css, index):
+    """Return the index just past the '}' closing the block opened at css[index]."""
+    depth = 0
+    while True:
+        char = css[index]
+        if char in '"\'':
+            index = _skip_string(css, index)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+
+
+def parse_css(css):
+    """Split a stylesheet into nodes: ('comment', text), ('statement', text) or ('block', prelude, body)."""
+    nodes = []
+    index = 0
+    while index < len(css):
+        if css[index].isspace():
+            index += 1
+        elif css.startswith('/*', index):
+            end = css.index('*/', index) + 2
+            nodes.append(('comment', css[index:end]))
+            index = end
+        else:
+            start = index
+            while css[index] not in '{;':
+                index = _skip_string(css, index) if css[index] in '"\'' else index + 1
+            if css[index] == ';':
+                nodes.append(('statement', css[start:index + 1].strip()))
+                index += 1
+            else:
+                end = _matching_brace(css, index)
+                nodes.append(('block', css[start:index].strip(), css[index + 1:end - 1]))
+                index = end
+    return nodes
+
+
+def split_selectors(prelude):
+    """Split a selector list on top-level commas only."""
+    selectors, depth, current = [], 0, ''
+    for char in prelude:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if char == ',' and depth == 0:
+            selectors.append(current.strip())
+            current = ''
+        else:
+            current += char
+    selectors.append(current.strip())
+    return selectors
+
+
+def selector_is_used(selector, used):
+    """A selector is kept when every class it mentions is used (or it mentions none)."""
+    return all(name.replace('\\', '') in used for name in CLASS_SELECTOR_PATTERN.findall(selector))
+
+
+def purge_css(css, used):
+    """Drop rules whose selectors only target unused classes; keep base styles and at-rules."""
+    output = []
+    for node in parse_css(css):
+        if node[0] == 'comment':
+            # Keep license comments (/*! ... */) only
+            if node[1].startswith('/*!'):
+                output.append(node[1])
+        elif node[0] == 'statement':
+            output.append(node[1])
+        else:
+            _, prelude, body = node
+            if prelude.startswith('@media') or prelude.startswith('@supports'):
+                inner = purge_css(body, used)
+                if inner:
+                    output.append(f'{prelude}{{{inner}}}')
+            elif prelude.startswith('@'):
+                output.append(f'{prelude}{{{body}}}')
+            else:
+                kept = [s for s in split_selectors(prelude) if selector_is_used(s, used)]
+                if kept:
+                    output.append(f'{",".join(kept)}{{{body}}}')
+    return ''.join(output)
+
+
+def fingerprint(logical_name, content):
+    """Return the content-hash filename for an asset, e.g. css/tailwind.0123456789ab.css."""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    root, ext = os.path.splitext(logical_name)
+    return f'{root}.{digest}{ext}'
+
+
+def write_asset(static_dir, logical_name, content):
+    hashed_name = fingerprint(logical_name, content)
+    path = os.path.join(static_dir, hashed_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return hashed_name
+
+
+def build(tailwind_css, static_dir=STATIC_DIR, source_dir=SOURCE_DIR, template_dir=TEMPLATES_DIR):
+    """Purge Tailwind, fingerprint every asset and write the manifest; returns the manifest."""
+    manifest = {}
+    purged = purge_css(tailwind_css, used_class_names(template_dir))
+    manifest[TAILWIND_ASSET] = write_asset(static_dir, TAILWIND_ASSET, purged.encode('utf-8'))
+
+    for path in sorted(glob.glob(os.path.join(source_dir, '**', '*.*'), recursive=True)):
+        logical_name = os.path.relpath(path, source_dir).replace(os.sep, '/')
+        with open(path, 'rb') as f:
+            manifest[logical_name] = write_asset(static_dir, logical_name, f.read())
+
+    # Write the manifest last and atomically, so a running app never sees it half-written
+    temporary = os.path.join(static_dir, f'.{MANIFEST_NAME}.tmp')
+    with open(temporary, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary, os.path.join(static_dir, MANIFEST_NAME))
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """Return the logical name -> fingerprinted file mapping, or {} when assets are not built."""
+    try:
+        with open(os.path.join(static_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_fingerprinted(filename):
+    return bool(FINGERPRINT_PATTERN.search(filename))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print(__doc__)
+        sys.exit(1)
+
+    print("========================================")
+    print("Building static assets")
+    print("========================================")
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], encoding='utf-8') as f:
+            source = f.read()
+    else:
+        print(f"Downloading Tailwind {TAILWIND_VERSION}...")
+        response = requests.get(TAILWIND_URL, timeout=60)
+        response.raise_for_status()
+        source = response.text
+
+    manifest = build(source)
+    for logical_name, hashed_name in sorted(manifest.items()):
+        size = os.path.getsize(os.path.join(STATIC_DIR, hashed_name))
+        print(f"✓ {logical_name} -> static/{hashed_name} ({size / 1024:.1f} KiB)")
+    print(f"Tailwind purged from {len(source) / 1024:.1f} KiB")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Measure what a freshly started worker pays before its first response.
+
+Every run happens in a new Python process, like a worker after a deploy or a
+scale-out: it imports the application (boot time), then renders each page
+twice through the test client. The first render includes compiling the
+templates that were not warmed up; the second is the steady state.
+
+Modes compared:
+    lazy     no bytecode cache, no warm-up, auto-reload on (the old behaviour)
+    warm     templates compiled at boot
+    cached   templates compiled at boot from a hot bytecode cache
+
+Usage:
+    python benchmarks/first_request.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PAGES = ('/', '/furniture', '/cars', '/houses', '/favorites')
+USER_ID = 'first-request-benchmark'
+
+
+def measure_worker():
+    """Runs inside the child process; prints one JSON line of timings in ms."""
+    sys.path.insert(0, BASE_DIR)
+    start_time = time.perf_counter()
+    from application import application, db, User
+    boot_ms = (time.perf_counter() - start_time) * 1000
+
+    with application.app_context():
+        if db.session.get(User, USER_ID) is None:
+            db.session.add(User(id=USER_ID, name='Benchmark', email='benchmark@example.invalid'))
+            db.session.commit()
+
+    timings = {'boot': boot_ms}
+    with application.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['_user_id'] = USER_ID
+        for page in PAGES:
+            for label in ('first', 'second'):
+                start_time = time.perf_counter()
+                client.get(page)
+                timings[f'{page} {label}'] = (time.perf_counter() - start_time) * 1000
+    print(json.dumps(timings))
+
+
+def run_worker(env):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker'],
+        env={**os.environ, **env}, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmark(runs):
+    cache_dir = tempfile.mkdtemp(prefix='jinja-bytecode-')
+    modes = {
+        'lazy': {'TEMPLATE_WARMUP': '0', 'TEMPLATES_AUTO_RELOAD': '1'},
+        'warm': {'TEMPLATE_WARMUP': '1', 'TEMPLATES_AUTO_RELOAD': '0'},
+        'cached': {'TEMPLATE_WARMUP': '1', 'TEMPLATES_AUTO_RELOAD': '0', 'JINJA_BYTECODE_CACHE_DIR': cache_dir},
+    }
+    # Populate the bytecode cache once, as the first worker on a host would
+    run_worker(modes['cached'])
+
+    results = {}
+    for mode, env in modes.items():
+        # Modes without a hot cache get an empty cache directory per worker
+        samples = [run_worker({'JINJA_BYTECODE_CACHE_DIR': tempfile.mkdtemp(prefix='jinja-cold-'), **env})
+                   for _ in range(runs)]
+        results[mode] = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+    keys = list(results['lazy'])
+    print(f"{'median ms':<28}" + ''.join(f"{mode:>10}" for mode in modes))
+    print('-' * (28 + 10 * len(modes)))
+    for key in keys:
+        print(f"{key:<28}" + ''.join(f"{results[mode][key]:>10.1f}" for mode in modes))
+    return results
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--worker']:
+        measure_worker()
+    else:
+        runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+        print(f"First-request latency over {runs} fresh worker(s) per mode")
+        run_benchmark(runs)
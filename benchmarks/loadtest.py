@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Load generator for a locally running marketplace server.
+
+Each virtual user is an asyncio task with its own keep-alive connections and
+cookie jar. It signs in through the real /login -> provider -> /auth flow
+(against benchmarks/oauth_stub.py), then replays a weighted mix of pages and
+API calls until the run ends. The report lists throughput, latency percentiles
+and error rates per request and overall.
+
+Usage:
+    python benchmarks/oauth_stub.py 8765 &
+    GOOGLE_...=... RATE_LIMIT_ENABLED=0 waitress-serve --port=8000 application:application &
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 --users 50 --duration 60
+
+The mix is a JSON object of path -> weight (default: benchmarks/loadtest_mix.json).
+All virtual users share one address, so rate limiting is turned off for the run.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_MIX = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadtest_mix.json')
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def load_mix(path):
+    """Read a path -> weight mapping and return (paths, weights)."""
+    with open(path) as f:
+        mix = json.load(f)
+    if not isinstance(mix, dict) or not all(
+            isinstance(weight, (int, float)) and not isinstance(weight, bool) and math.isfinite(weight)
+            for weight in mix.values()):
+        raise ValueError(f"Traffic mix {path} must map each path to a number")
+    if any(weight < 0 for weight in mix.values()):
+        raise ValueError(f"Traffic mix {path} has a negative weight")
+    if sum(mix.values()) <= 0:
+        # random.choices would only fail once the run is under way
+        raise ValueError(f"Traffic mix {path} needs at least one path with a positive weight")
+    return list(mix), list(mix.values())
+
+
+class HTTPClient:
+    """Minimal keep-alive HTTP/1.1 client with a per-host cookie jar."""
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.connections = {}
+        self.cookies = defaultdict(dict)
+
+    async def close(self):
+        for _, writer in self.connections.values():
+            writer.close()
+        self.connections.clear()
+
+    async def _connection(self, host, port):
+        if (host, port) not in self.connections:
+            self.connections[(host, port)] = await asyncio.open_connection(host, port)
+        return self.connections[(host, port)]
+
+    def _store_cookies(self, host, headers):
+        for name, value in headers:
+            if name != 'set-cookie':
+                continue
+            pair = value.split(';', 1)[0]
+            cookie, _, cookie_value = pair.partition('=')
+            expired = 'max-age=0' in value.lower() or not cookie_value
+            if expired:
+                self.cookies[host].pop(cookie.strip(), None)
+            else:
+                self.cookies[host][cookie.strip()] = cookie_value.strip()
+
+    async def request(self, method, url):
+        """Send one request and return (status, headers, body); retries once on a stale connection."""
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        target = parts.path or '/'
+        if parts.query:
+            target += f'?{parts.query}'
+        for attempt in range(2):
+            reader, writer = await self._connection(host, port)
+            cookie = '; '.join(f'{k}={v}' for k, v in self.cookies[host].items())
+            lines = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive']
+            if cookie:
+                lines.append(f'Cookie: {cookie}')
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+            try:
+                await writer.drain()
+                return await asyncio.wait_for(self._read_response(host, port, reader), self.timeout)
+            except asyncio.TimeoutError:
+                # The response may still arrive later, so this connection cannot be reused
+                self.connections.pop((host, port), None)
+                writer.close()
+                raise
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.connections.pop((host, port), None)
+                writer.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self, host, port, reader):
+        status_line = await reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = []
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.append((name.strip().lower(), value.strip()))
+        header_map = dict(headers)
+
+        if header_map.get('transfer-encoding') == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readuntil(b'\r\n')
+                    break
+                body += await reader.readexactly(size + 2)
+                del body[-2:]
+            body = bytes(body)
+        elif 'content-length' in header_map:
+            body = await reader.readexactly(int(header_map['content-length']))
+        else:
+            body = await reader.read()
+            header_map['connection'] = 'close'
+
+        self._store_cookies(host, headers)
+        if header_map.get('connection', '').lower() == 'close':
+            _, writer = self.connections.pop((host, port))
+            writer.close()
+        return status, header_map, body
+
+
+class Stats:
+    """Latency samples and outcomes per request name."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, latency_ms, status=None, error=False):
+        self.latencies[name].append(latency_ms)
+        if status is not None:
+            self.statuses[name][status] += 1
+        if error:
+            self.errors[name] += 1
+
+    def summary(self, elapsed):
+        rows = {}
+        every = []
+        for name, values in sorted(self.latencies.items()):
+            every.extend(values)
+            rows[name] = self._row(values, self.errors[name], elapsed)
+            rows[name]['statuses'] = dict(self.statuses[name])
+        rows['TOTAL'] = self._row(every, sum(self.errors.values()), elapsed)
+        return rows
+
+    @staticmethod
+    def _row(values, errors, elapsed):
+        ordered = sorted(values)
+        row = {
+            'requests': len(ordered),
+            'throughput_rps': len(ordered) / elapsed if elapsed else 0.0,
+            'error_rate': errors / len(ordered) if ordered else 0.0,
+            'mean_ms': sum(ordered) / len(ordered) if ordered else 0.0,
+            'max_ms': ordered[-1] if ordered else 0.0,
+        }
+        for pct in PERCENTILES:
+            row[f'p{pct}_ms'] = percentile(ordered, pct)
+        return row
+
+
+async def timed_request(client, stats, name, url):
+    start_time = time.perf_counter()
+    try:
+        status, headers, body = await client.request('GET', url)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        stats.record(name, (time.perf_counter() - start_time) * 1000, error=True)
+        return None, {}, b''
+    # A redirect back to /login means the session was lost, which counts as an error
+    lost_session = status == 302 and '/login' in headers.get('location', '')
+    stats.record(name, (time.perf_counter() - start_time) * 1000, status, error=status >= 400 or lost_session)
+    return status, headers, body
+
+
+async def sign_in(client, stats, base_url, max_redirects=5):
+    """Follow /login through the OAuth provider and back to /auth."""
+    url = urljoin(base_url, '/login')
+    start_time = time.perf_counter()
+    for _ in range(max_redirects):
+        status, headers, _ = await client.request('GET', url)
+        if status not in (301, 302, 303, 307) or urlsplit(url).path == '/auth':
+            break
+        url = urljoin(url, headers['location'])
+    signed_in = status == 302 and headers.get('location', '').rstrip('/') in ('', base_url.rstrip('/'))
+    stats.record('login flow', (time.perf_counter() - start_time) * 1000, status, error=not signed_in)
+    return signed_in
+
+
+async def virtual_user(index, options, paths, weights, stats, deadline):
+    rng = random.Random(options.seed + index)
+    client = HTTPClient(timeout=options.timeout)
+    try:
+        await asyncio.sleep(options.ramp_up * index / max(options.users, 1))
+        try:
+            if not await sign_in(client, stats, options.base_url):
+                return
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, KeyError):
+            stats.record('login flow', 0.0, error=True)
+            return
+        while time.monotonic() < deadline:
+            path = rng.choices(paths, weights)[0]
+            await timed_request(client, stats, path, urljoin(options.base_url, path))
+            if options.think_time:
+                await asyncio.sleep(rng.expovariate(1 / options.think_time))
+    finally:
+        await client.close()
+
+
+async def run(options):
+    paths, weights = load_mix(options.mix)
+    stats = Stats()
+    start_time = time.monotonic()
+    deadline = start_time + options.ramp_up + options.duration
+    await asyncio.gather(*(
+        virtual_user(i, options, paths, weights, stats, deadline) for i in range(options.users)
+    ))
+    return stats.summary(time.monotonic() - start_time)
+
+
+def print_report(summary):
+    header = f"{'request':<40} {'count':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, row in summary.items():
+        print(f"{name[:40]:<40} {row['requests']:>7} {row['throughput_rps']:>8.1f} {row['error_rate'] * 100:>6.2f} "
+              f"{row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of steady load after ramp-up')
+    parser.add_argument('--ramp-up', type=float, default=5, help='seconds over which users start')
+    parser.add_argument('--think-time', type=float, default=0, help='mean seconds between a user\'s requests')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='JSON file of path -> weight')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--start-stub', type=int, metavar='PORT', help='also serve the stub OAuth provider on PORT')
+    parser.add_argument('--json', metavar='FILE', help='write the report as JSON')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args(sys.argv[1:])
+    if options.start_stub:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from oauth_stub import start_stub
+        start_stub(options.start_stub)
+
+    print(f"Load test: {options.users} users, {options.duration}s after {options.ramp_up}s ramp-up against {options.base_url}")
+    summary = asyncio.run(run(options))
+    print_report(summary)
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measure peak memory of rendering one 10,000-item category page and fail above a budget.
+
+Seeds synthetic items first until `category` holds at least `page_size` items
+(default cars, 10000). It then loads one page of that size with tracemalloc
+running, and renders it the way the listing route does:
+
+- load: paginate_items with CARD_LOAD_OPTIONS (what the route loads)
+- load, all columns: the same page with description/specifications loaded too
+- load + render: card load plus render_template of the category page
+
+Exits with status 1 when the load + render peak exceeds `budget_mb`
+(default 64), so it can gate a change in CI.
+
+Usage:
+    python benchmarks/memory.py [category] [page_size] [budget_mb]
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import db, application, Item, CARD_LOAD_OPTIONS, paginate_items
+from flask import render_template
+from migrations.seed_data import seed_large_catalog
+
+
+def ensure_category(category, count):
+    while True:
+        with application.app_context():
+            existing = Item.query.filter_by(category=category).count()
+        if existing >= count:
+            return
+        # Synthetic items are spread over the three categories
+        seed_large_catalog((count - existing) * 3 + 100)
+
+
+def measure(func):
+    """Run func() in a fresh app context and return its peak traced memory in bytes."""
+    gc.collect()
+    with application.test_request_context(f'/{func.__name__}'):
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            db.session.remove()
+
+
+def run_benchmark(category, page_size, budget_mb):
+    def load():
+        items, _ = paginate_items(category, limit=page_size, options=CARD_LOAD_OPTIONS)
+        assert len(items) == page_size, len(items)
+
+    def load_all_columns():
+        paginate_items(category, limit=page_size)
+
+    def load_and_render():
+        items, next_cursor = paginate_items(category, limit=page_size, options=CARD_LOAD_OPTIONS)
+        html = render_template(f'{category}.html', items=items, sort='newest', next_cursor=next_cursor,
+                               favorites=set())
+        assert html.count('Save to favorites') == page_size
+
+    # Untimed pass, so template compilation and connection setup are not measured
+    measure(load_and_render)
+    results = [
+        ('load', measure(load)),
+        ('load, all columns', measure(load_all_columns)),
+        ('load + render', measure(load_and_render)),
+    ]
+
+    print(f"\nPeak memory for one {page_size}-item {category} page:")
+    for label, peak in results:
+        print(f"  {label:<20}{peak / 1e6:>8.1f}MB  {peak / page_size:>8.0f} bytes/item")
+    peak = results[-1][1]
+    within = peak <= budget_mb * 1e6
+    print(f"\nBudget {budget_mb}MB for load + render: {'met' if within else 'EXCEEDED'}")
+    return within
+
+
+if __name__ == "__main__":
+    category = sys.argv[1] if len(sys.argv) > 1 else 'cars'
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    budget_mb = float(sys.argv[3]) if len(sys.argv) > 3 else 64
+    ensure_category(category, page_size)
+    sys.exit(0 if run_benchmark(category, page_size, budget_mb) else 1)
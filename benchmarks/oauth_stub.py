@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Stub Google OAuth provider for load tests.
+
+Every authorization request is approved immediately and mints a new synthetic
+account, so each virtual user of benchmarks/loadtest.py gets its own User row
+and session without talking to Google.
+
+Usage:
+    python benchmarks/oauth_stub.py [port]
+
+Then start the application with the printed environment variables.
+"""
+
+import itertools
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class OAuthStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    accounts = itertools.count(1)
+    accounts_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, payload):
+        self._send(200, json.dumps(payload).encode(), [('Content-Type', 'application/json')])
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        base = f'http://{self.headers["Host"]}'
+        if url.path == '/.well-known/openid-configuration':
+            self._send_json({
+                'issuer': base,
+                'authorization_endpoint': f'{base}/authorize',
+                'token_endpoint': f'{base}/token',
+                'userinfo_endpoint': f'{base}/userinfo',
+                'jwks_uri': f'{base}/jwks',
+            })
+        elif url.path == '/authorize':
+            query = parse_qs(url.query)
+            with self.accounts_lock:
+                account = next(self.accounts)
+            params = urlencode({'code': f'loadtest-{account}', 'state': query.get('state', [''])[0]})
+            self._send(302, headers=[('Location', f"{query['redirect_uri'][0]}?{params}")])
+        elif url.path == '/userinfo':
+            account = self.headers.get('Authorization', '').removeprefix('Bearer ')
+            self._send_json({'id': account, 'email': f'{account}@loadtest.invalid', 'name': f'Load Test {account}'})
+        elif url.path == '/jwks':
+            self._send_json({'keys': []})
+        else:
+            self._send(404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if urlparse(self.path).path != '/token':
+            self._send(404)
+            return
+        # The authorization code doubles as the access token naming the account
+        self._send_json({'access_token': form.get('code', [''])[0], 'token_type': 'Bearer', 'expires_in': 3600})
+
+
+def environment(port, host='127.0.0.1'):
+    """Environment variables pointing the application at the stub."""
+    base = f'http://{host}:{port}'
+    return {
+        'GOOGLE_CLIENT_ID': 'loadtest',
+        'GOOGLE_CLIENT_SECRET': 'loadtest',
+        'GOOGLE_DISCOVERY_URL': f'{base}/.well-known/openid-configuration',
+        'GOOGLE_AUTHORIZE_URL': f'{base}/authorize',
+        'GOOGLE_TOKEN_URL': f'{base}/token',
+        'GOOGLE_API_BASE_URL': f'{base}/',
+    }
+
+
+def start_stub(port=0, host='127.0.0.1'):
+    """Serve the stub on a background thread and return the server."""
+    server = ThreadingHTTPServer((host, port), OAuthStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = ThreadingHTTPServer(('127.0.0.1', port), OAuthStubHandler)
+    print(f"Stub OAuth provider listening on http://127.0.0.1:{port}")
+    print("Start the application with:")
+    for name, value in environment(port).items():
+        print(f"  export {name}={value}")
+    server.serve_forever()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark the category list partitioning of the item table (migration 0007).
+
+Seeds `seed_count` synthetic items first when the catalog is smaller than that
+(default 3000000) and measures the current layout. If item is not partitioned
+yet, it then applies the migrations up to 0007 and measures again.
+
+For each layout it reports:
+- the plan and timing of a category listing page and a category count, with
+  the relations each one touches (partition pruning)
+- heap and index sizes per relation
+- how long VACUUM takes after churning 5% of the cars rows, since only the
+  churned partition needs vacuuming once item is partitioned
+
+Usage:
+    python benchmarks/partitioned_catalog.py [seed_count]
+
+Needs PostgreSQL.
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import db, application, Item, CATEGORIES, PAGE_SIZE
+from migrations.runner import MigrationRunner
+from migrations.seed_data import seed_large_catalog
+from sqlalchemy import text
+
+CHURN_CATEGORY = 'cars'
+CHURN_FRACTION = 0.05
+
+LISTING_SQL = "SELECT * FROM item WHERE category = :category ORDER BY price, id LIMIT :limit"
+COUNT_SQL = "SELECT count(*) FROM item WHERE category = :category"
+
+
+def is_partitioned():
+    return db.session.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('item')")).scalar() == 'p'
+
+
+def relations():
+    """The item table, or each partition when it is partitioned."""
+    if not is_partitioned():
+        return ['item']
+    return db.session.execute(text(
+        "SELECT relid::regclass::text FROM pg_partition_tree('item') WHERE isleaf ORDER BY 1"
+    )).scalars().all()
+
+
+def explain(sql, **params):
+    """Return (execution ms, scanned relations, plan lines) of an EXPLAIN ANALYZE."""
+    plan = db.session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()[0]
+    scanned = []
+
+    def walk(node):
+        if 'Relation Name' in node:
+            scanned.append(node['Relation Name'])
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan['Plan'])
+    lines = db.session.execute(text(f"EXPLAIN (COSTS OFF) {sql}"), params).scalars().all()
+    return plan['Execution Time'], sorted(set(scanned)), lines
+
+
+def print_sizes():
+    print("  Relation sizes:")
+    for relation in relations():
+        heap, indexes = db.session.execute(text(
+            "SELECT pg_relation_size(:r), pg_indexes_size(:r)"
+        ), {'r': relation}).one()
+        print(f"    {relation:<20} heap {heap / 2 ** 20:>8.1f} MiB   indexes {indexes / 2 ** 20:>8.1f} MiB")
+
+
+def churn_and_vacuum():
+    """Update a slice of one category, then time VACUUM of the smallest relation holding it."""
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE item SET price = price + 1 WHERE category = :category AND random() < :fraction"
+        ), {'category': CHURN_CATEGORY, 'fraction': CHURN_FRACTION})
+    target = f'item_{CHURN_CATEGORY}' if is_partitioned() else 'item'
+    db.session.rollback()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        start_time = time.perf_counter()
+        connection.execute(text(f"VACUUM (ANALYZE) {target}"))
+        elapsed = (time.perf_counter() - start_time) * 1000
+    print(f"  VACUUM {target} after churning {CHURN_FRACTION:.0%} of {CHURN_CATEGORY}: {elapsed:.0f}ms")
+
+
+def measure(label):
+    with application.app_context():
+        print(f"\n=== {label} ===")
+        for category in CATEGORIES:
+            listing_ms, listing_scanned, lines = explain(LISTING_SQL, category=category, limit=PAGE_SIZE)
+            count_ms, count_scanned, _ = explain(COUNT_SQL, category=category)
+            print(f"\n  {category}")
+            print(f"    Listing page: {listing_ms:.2f}ms, scans {', '.join(listing_scanned)}")
+            print(f"    Count:        {count_ms:.2f}ms, scans {', '.join(count_scanned)}")
+            for line in lines:
+                print(f"      {line}")
+        print()
+        print_sizes()
+        churn_and_vacuum()
+
+
+def ensure_catalog(count):
+    with application.app_context():
+        existing = Item.query.count()
+    if existing < count:
+        seed_large_catalog(count - existing)
+    with application.app_context():
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text("VACUUM (ANALYZE) item"))
+
+
+if __name__ == "__main__":
+    seed_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000000
+    with application.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            sys.exit("This benchmark needs PostgreSQL")
+    ensure_catalog(seed_count)
+
+    with application.app_context():
+        partitioned = is_partitioned()
+    measure("partitioned" if partitioned else "unpartitioned")
+    if not partitioned:
+        print("\nApplying migrations up to 0007...")
+        with application.app_context():
+            MigrationRunner(db.engine).upgrade('0007')
+        measure("partitioned")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark the similar-items job (similarity.py) on a synthetic catalog,
+without a database: rows come from the same generator as
+`seed_data.py large`, so the numbers isolate feature building and the
+windowed top-k search. The database load and store phases are reported by
+migrations/compute_similar_items.py itself.
+
+Usage:
+    python benchmarks/similar_items.py [item_count] [window]
+
+Defaults to 1000000 items and the default window.
+"""
+
+import sys
+import os
+import random
+import time
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import CATEGORIES
+from migrations.seed_data import generate_large_item
+from similarity import DEFAULT_TOP_K, DEFAULT_WINDOW, build_features, top_k_neighbours
+
+
+def synthetic_rows(count, seed=42):
+    rng = random.Random(seed)
+    rows = {category: [] for category in CATEGORIES}
+    for index in range(count):
+        item = generate_large_item(index, rng)
+        rows[item['category']].append((index + 1, item['price'], item['specifications'],
+                                       item['latitude'], item['longitude']))
+    return rows
+
+
+def run_benchmark(count, window):
+    start_time = time.perf_counter()
+    rows = synthetic_rows(count)
+    print(f"Generated {count} synthetic items in {time.perf_counter() - start_time:.1f}s")
+
+    total = 0.0
+    for category, category_rows in rows.items():
+        start_time = time.perf_counter()
+        ids, features, sort_keys = build_features(category_rows, category)
+        features = features[sort_keys]
+        featured = time.perf_counter()
+        neighbours, scores = top_k_neighbours(features, DEFAULT_TOP_K, window)
+        searched = time.perf_counter()
+        elapsed = searched - start_time
+        total += elapsed
+        print(f"\n{category}: {len(category_rows)} items, {features.shape[1]} features")
+        print(f"  Features:  {featured - start_time:.2f}s")
+        print(f"  Top-{DEFAULT_TOP_K}:     {searched - featured:.2f}s (window {window})")
+        print(f"  Mean score of nearest neighbour: {scores[:, 0].mean():.3f}")
+        print(f"  Throughput: {len(category_rows) / elapsed:,.0f} items/s")
+    print(f"\nTotal: {count} items in {total:.1f}s ({count / total:,.0f} items/s)")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WINDOW
+    run_benchmark(count, window)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compare catalog reads from the main database against a SQLite snapshot.
+
+Seeds `seed_count` synthetic items first when the catalog is smaller than that
+(default 100000), exports a snapshot to a temporary file and runs the same
+operations through both paths, with the item and suggestion caches cleared so
+every call queries:
+
+- listing: first and second keyset page of a random category and sort order
+- detail: one item by primary key
+- suggest: a typeahead query of 3-6 characters from a real item name
+
+Usage:
+    python benchmarks/snapshot.py [seed_count] [iterations]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import application as app_module
+import snapshot
+from application import (db, application, Item, CATEGORIES, SORT_OPTIONS, CARD_LOAD_OPTIONS, paginate_items,
+                         get_item_detail, suggest, item_cache, suggest_cache)
+from migrations.seed_data import seed_large_catalog
+from sqlalchemy import func, select
+
+
+def ensure_catalog(count):
+    with application.app_context():
+        existing = Item.query.count()
+    if existing < count:
+        seed_large_catalog(count - existing)
+
+
+def sample_inputs(iterations, seed=11):
+    rng = random.Random(seed)
+    with application.app_context():
+        ids = db.session.execute(select(Item.id).order_by(func.random()).limit(iterations)).scalars().all()
+        names = db.session.execute(
+            select(Item.name).where(Item.name.is_not(None)).order_by(func.random()).limit(iterations)
+        ).scalars().all()
+    queries = []
+    for name in names:
+        start = rng.randrange(max(1, len(name) - 3))
+        queries.append(name[start:start + rng.randint(3, 6)])
+    listings = [(rng.choice(CATEGORIES), rng.choice(list(SORT_OPTIONS))) for _ in range(iterations)]
+    return listings, ids, queries
+
+
+def listing(category, sort):
+    items, cursor = paginate_items(category, sort, options=CARD_LOAD_OPTIONS)
+    if cursor:
+        paginate_items(category, sort, cursor, options=CARD_LOAD_OPTIONS)
+
+
+def detail(item_id):
+    item_cache.clear()
+    get_item_detail(item_id)
+
+
+def typeahead(query):
+    suggest_cache.clear()
+    suggest(query)
+
+
+def time_calls(func, arguments):
+    timings = []
+    for args in arguments:
+        with application.app_context():
+            start_time = time.perf_counter()
+            func(*args)
+            timings.append((time.perf_counter() - start_time) * 1000)
+    return timings
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    pick = lambda pct: timings[min(len(timings) - 1, int(pct / 100 * len(timings)))]
+    return pick(50), pick(95), pick(99)
+
+
+def run_benchmark(iterations):
+    listings, ids, queries = sample_inputs(iterations)
+    operations = [
+        ('listing', listing, listings),
+        ('detail', detail, [(item_id,) for item_id in ids]),
+        ('suggest', typeahead, [(query,) for query in queries]),
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'catalog.db')
+        print("Exporting snapshot...")
+        with application.app_context():
+            snapshot.export(db.engine, Item.__table__, path)
+            database = db.engine.dialect.name
+        reader = snapshot.SnapshotReader(path)
+        paths = [(database, None), ('snapshot', reader)]
+
+        results = {}
+        for label, catalog in paths:
+            app_module.catalog_snapshot = catalog
+            for name, operation, arguments in operations:
+                # Untimed pass so both paths start with open connections and warm pages
+                time_calls(operation, arguments[:20])
+                results[(name, label)] = time_calls(operation, arguments)
+        app_module.catalog_snapshot = None
+        reader.dispose()
+
+    print(f"\n{'':<22}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, _, _ in operations:
+        for label, _ in paths:
+            p50, p95, p99 = percentiles(results[(name, label)])
+            print(f"{name + ' (' + label + ')':<22}{p50:>7.2f}ms{p95:>7.2f}ms{p99:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    seed_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    ensure_catalog(seed_count)
+    run_benchmark(iterations)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark sorted category listings: keyset pagination over the composite
+category indexes versus OFFSET pagination at the same depth.
+
+Usage:
+    python benchmarks/sorted_listing.py [seed_count] [depth]
+
+Seeds `seed_count` synthetic items first when the catalog is smaller than that
+(default 1000000), then walks `depth` pages (default 200) for every sort order.
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import db, application, Item, CATEGORIES, SORT_OPTIONS, PAGE_SIZE, paginate_items
+from migrations.seed_data import seed_large_catalog
+from sqlalchemy import text
+
+
+def ensure_catalog(count):
+    with application.app_context():
+        existing = Item.query.count()
+    if existing < count:
+        seed_large_catalog(count - existing)
+    with application.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text("ANALYZE item"))
+            db.session.commit()
+
+
+def walk_keyset(category, sort, depth):
+    """Follow next cursors for `depth` pages and return per-page timings in ms."""
+    timings = []
+    cursor = None
+    for _ in range(depth):
+        start_time = time.perf_counter()
+        items, cursor = paginate_items(category, sort, cursor)
+        timings.append((time.perf_counter() - start_time) * 1000)
+        if cursor is None:
+            break
+    return timings
+
+
+def offset_page(category, sort, page):
+    """Time the equivalent OFFSET query for the same page."""
+    column, descending = SORT_OPTIONS[sort]
+    order = (column.desc(), Item.id.desc()) if descending else (column.asc(), Item.id.asc())
+    start_time = time.perf_counter()
+    Item.query.filter(Item.category == category).order_by(*order).offset(page * PAGE_SIZE).limit(PAGE_SIZE).all()
+    return (time.perf_counter() - start_time) * 1000
+
+
+def explain_first_page(category, sort):
+    """Print the plan of the first keyset page to confirm it is an index scan."""
+    column, descending = SORT_OPTIONS[sort]
+    order = (column.desc(), Item.id.desc()) if descending else (column.asc(), Item.id.asc())
+    query = (Item.query.filter(Item.category == category, column.isnot(None))
+             .order_by(*order).limit(PAGE_SIZE + 1))
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    for row in db.session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")):
+        print(f"    {row[0]}")
+
+
+def run_benchmark(depth):
+    with application.app_context():
+        print(f"Total items: {Item.query.count()}")
+        for category in CATEGORIES:
+            for sort in SORT_OPTIONS:
+                timings = walk_keyset(category, sort, depth)
+                db.session.rollback()
+                deepest = len(timings) - 1
+                offset_ms = offset_page(category, sort, deepest)
+                db.session.rollback()
+                print(f"\n{category} / {sort}")
+                print(f"  First keyset page:       {timings[0]:.2f}ms")
+                print(f"  Mean keyset page:        {sum(timings) / len(timings):.2f}ms over {len(timings)} pages")
+                print(f"  Keyset page {deepest:>4}:        {timings[-1]:.2f}ms")
+                print(f"  OFFSET page {deepest:>4}:        {offset_ms:.2f}ms")
+                if db.engine.dialect.name == 'postgresql':
+                    explain_first_page(category, sort)
+                    db.session.rollback()
+
+
+if __name__ == "__main__":
+    seed_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print("Sorted Listing Benchmark")
+    print("=" * 60)
+    ensure_catalog(seed_count)
+    run_benchmark(depth)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Count the listing queries a burst of concurrent cold requests runs, with and without coalescing.
+
+Seeds `seed_count` synthetic items first when the catalog is smaller than that
+(default 100000). Then `concurrency` threads (default 50) ask at the same
+moment for the first card page of a category, the way visitors arrive right
+after a deploy or when the cached page expires:
+
+- uncoalesced: every thread runs paginate_items itself
+- coalesced: every thread goes through listing_cache, which is cleared first
+
+It prints the item queries each burst ran, its wall time, and the
+listing_cache_events_total counts.
+
+Usage:
+    python benchmarks/stampede.py [seed_count] [concurrency] [category]
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import (db, application, Item, CARD_LOAD_OPTIONS, DEFAULT_SORT, PAGE_SIZE, paginate_items,
+                         listing_cache, listing_cache_events, load_first_page_cards)
+from migrations.seed_data import seed_large_catalog
+from sqlalchemy import event
+from singleflight import REQUEST_EVENTS
+
+
+def ensure_catalog(count):
+    with application.app_context():
+        existing = Item.query.count()
+    if existing < count:
+        seed_large_catalog(count - existing)
+
+
+def uncoalesced(category):
+    with application.app_context():
+        paginate_items(category, DEFAULT_SORT, None, PAGE_SIZE, CARD_LOAD_OPTIONS)
+
+
+def coalesced(category):
+    listing_cache.get((category, DEFAULT_SORT, PAGE_SIZE),
+                      lambda: load_first_page_cards(category, DEFAULT_SORT, PAGE_SIZE))
+
+
+def burst(func, category, concurrency):
+    """Release `concurrency` threads calling func at once; returns (item queries, seconds)."""
+    queries = []
+    with application.app_context():
+        engine = db.engine
+
+    def count(conn, cursor, statement, *args):
+        if 'FROM item' in statement:
+            queries.append(statement)
+
+    barrier = threading.Barrier(concurrency)
+
+    def worker():
+        barrier.wait()
+        func(category)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    event.listen(engine, 'before_cursor_execute', count)
+    start_time = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        elapsed = time.perf_counter() - start_time
+        event.remove(engine, 'before_cursor_execute', count)
+    return len(queries), elapsed
+
+
+def run_benchmark(concurrency, category):
+    # Untimed pass so both bursts start with open connections and warm pages
+    burst(uncoalesced, category, min(concurrency, 5))
+
+    print(f"\n{concurrency} concurrent cold requests for the first {category} page:")
+    listing_cache.clear()
+    before = {name: listing_cache_events.value(event=name) for name in REQUEST_EVENTS}
+    for label, func in (('uncoalesced', uncoalesced), ('coalesced', coalesced)):
+        queries, elapsed = burst(func, category, concurrency)
+        print(f"  {label:<14}{queries:>5} item queries {elapsed * 1000:>9.1f}ms")
+    events = {name: listing_cache_events.value(event=name) - before[name] for name in REQUEST_EVENTS}
+    print("  listing_cache_events_total: " + ', '.join(f"{name}={count}" for name, count in events.items()))
+
+
+if __name__ == "__main__":
+    seed_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    category = sys.argv[3] if len(sys.argv) > 3 else 'cars'
+    ensure_catalog(seed_count)
+    run_benchmark(concurrency, category)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/suggest typeahead latency against the p99 < 20ms target.
+
+Seeds `seed_count` synthetic items first when the catalog is smaller than that
+(default 1000000). Queries are 3-8 character substrings of real item names,
+typed out one keystroke at a time like the debounced client sends them after
+a pause, so common short queries and rare long ones are both represented.
+
+Each query is timed through the test client twice:
+- cold: suggestion cache cleared, so every request hits the database
+- warm: the same query mix replayed, as the most frequent queries are served
+
+Usage:
+    python benchmarks/suggest.py [seed_count] [queries]
+"""
+
+import random
+import sys
+import os
+import time
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import db, application, Item, User, suggest_cache, SUGGEST_MIN_LENGTH
+from migrations.seed_data import seed_large_catalog
+from sqlalchemy import func, select, text
+
+USER_ID = 'suggest-benchmark'
+TARGET_P99_MS = 20.0
+
+
+def ensure_catalog(count):
+    with application.app_context():
+        existing = Item.query.count()
+    if existing < count:
+        seed_large_catalog(count - existing)
+    with application.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text("ANALYZE item"))
+            db.session.commit()
+
+
+def sample_queries(count, seed=7):
+    """Keystroke sequences: every prefix (from the minimum length) of a substring of a random name."""
+    rng = random.Random(seed)
+    with application.app_context():
+        names = db.session.execute(
+            select(Item.name).where(Item.name.is_not(None)).order_by(func.random()).limit(count)
+        ).scalars().all()
+    queries = []
+    for name in names:
+        start = rng.randrange(max(1, len(name) - SUGGEST_MIN_LENGTH))
+        typed = name[start:start + rng.randint(SUGGEST_MIN_LENGTH, 8)].strip()
+        queries.extend(typed[:length] for length in range(SUGGEST_MIN_LENGTH, len(typed) + 1))
+    return queries[:count]
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    pick = lambda pct: timings[min(len(timings) - 1, int(pct / 100 * len(timings)))]
+    return pick(50), pick(95), pick(99)
+
+
+def run_queries(client, queries, clear_cache):
+    timings = []
+    for query in queries:
+        if clear_cache:
+            suggest_cache.clear()
+        start_time = time.perf_counter()
+        response = client.get('/api/suggest', query_string={'q': query})
+        timings.append((time.perf_counter() - start_time) * 1000)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+def explain(query):
+    if db.engine.dialect.name != 'postgresql':
+        return
+    plan = db.session.execute(text(
+        "EXPLAIN (ANALYZE, COSTS OFF) SELECT id, name, category FROM item WHERE name ILIKE :pattern LIMIT 100"
+    ), {'pattern': f'%{query}%'}).scalars().all()
+    print(f"\nPlan for {query!r}:")
+    for line in plan:
+        print(f"  {line}")
+
+
+def run_benchmark(query_count):
+    application.config['RATE_LIMIT_ENABLED'] = False
+    with application.app_context():
+        if db.session.get(User, USER_ID) is None:
+            db.session.add(User(id=USER_ID, name='Benchmark', email='benchmark@example.invalid'))
+            db.session.commit()
+    queries = sample_queries(query_count)
+    print(f"{len(queries)} queries, e.g. {', '.join(repr(q) for q in queries[:5])}")
+
+    with application.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['_user_id'] = USER_ID
+        # One untimed pass, so connections are open and the index pages are cached
+        run_queries(client, queries[:50], clear_cache=True)
+        results = {
+            'cold (database)': run_queries(client, queries, clear_cache=True),
+            'warm (cache)': run_queries(client, queries, clear_cache=False),
+        }
+
+    print(f"\n{'':<18}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for label, timings in results.items():
+        p50, p95, p99 = percentiles(timings)
+        print(f"{label:<18}{p50:>7.2f}ms{p95:>7.2f}ms{p99:>7.2f}ms")
+    p99 = percentiles(results['cold (database)'])[2]
+    print(f"\nTarget p99 < {TARGET_P99_MS:.0f}ms uncached: {'met' if p99 < TARGET_P99_MS else 'MISSED'}")
+    with application.app_context():
+        explain(queries[0])
+
+
+if __name__ == "__main__":
+    seed_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    ensure_catalog(seed_count)
+    run_benchmark(query_count)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Shared (CDN) caching of listing pages: surrogate keys, purges, and a local stand-in cache.
+
+With PUBLIC_LISTINGS on, category pages and their card batches are the same
+for every visitor, so a reverse proxy may store them. They are tagged with
+surrogate keys: `listings` on all of them, and `listings-<category>` on each
+category. Item commits send the touched categories' keys to CDN_PURGE_URL, as
+a POST carrying a `Surrogate-Key: key1 key2` header. Purges are merged and
+sent from a background thread, so they never hold up a request. If a purge is
+lost, the page expires after s-maxage anyway.
+
+SharedCache is a small stand-in for the CDN. It is WSGI middleware that
+caches public responses for their s-maxage and drops them when a purge for
+one of their keys is posted to PURGE_PATH. `serve` runs the app behind it:
+
+Usage:
+    python cdn.py serve [port]     # app behind the stand-in cache, purged by the app
+    python cdn.py purge <key>...   # send a purge to CDN_PURGE_URL
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+
+import requests
+
+SURROGATE_KEY = 'Surrogate-Key'
+ALL_LISTINGS = 'listings'
+PURGE_PATH = '/__purge'
+
+logger = logging.getLogger(__name__)
+
+
+def category_key(category):
+    return f'{ALL_LISTINGS}-{category}'
+
+
+def listing_keys(category):
+    """Surrogate keys of a category's listing pages."""
+    return (ALL_LISTINGS, category_key(category))
+
+
+def shared_cache_control(max_age, stale_seconds):
+    """Cache-Control letting shared caches keep a page max_age seconds while browsers always revalidate."""
+    return f'public, max-age=0, s-maxage={max_age}, stale-while-revalidate={stale_seconds}'
+
+
+class Purger:
+    """Sends purge-by-surrogate-key requests from one background thread, merging keys that pile up meanwhile."""
+
+    def __init__(self, url, token=None, timeout=5, post=requests.post):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.post = post
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def purge(self, keys):
+        with self.lock:
+            self.pending.update(keys)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='cdn-purger', daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def flush(self):
+        """Send the pending keys now; returns the keys sent."""
+        with self.lock:
+            keys, self.pending = self.pending, set()
+        if keys:
+            headers = {SURROGATE_KEY: ' '.join(sorted(keys))}
+            if self.token:
+                headers['Authorization'] = f'Bearer {self.token}'
+            self.post(self.url, headers=headers, timeout=self.timeout).raise_for_status()
+        return keys
+
+    def _run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            try:
+                self.flush()
+            except requests.RequestException:
+                # The pages expire after s-maxage regardless
+                logger.exception("CDN purge failed")
+
+
+class SharedCache:
+    """WSGI middleware standing in for a CDN: caches public s-maxage responses by URL, purged by surrogate key.
+
+    Like a CDN configured for these pages, it ignores cookies in the cache key and
+    never stores a response that sets one. Responses carry X-Cache: HIT or MISS.
+    """
+
+    def __init__(self, app, clock=time.monotonic):
+        self.app = app
+        self.clock = clock
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] == 'POST' and environ.get('PATH_INFO') == PURGE_PATH:
+            keys = set(environ.get('HTTP_SURROGATE_KEY', '').split())
+            with self.lock:
+                for url in [url for url, entry in self.entries.items() if entry[3] & keys]:
+                    del self.entries[url]
+            start_response('204 No Content', [])
+            return [b'']
+        if environ['REQUEST_METHOD'] != 'GET':
+            return self.app(environ, start_response)
+
+        url = environ.get('PATH_INFO', '') + ('?' + environ['QUERY_STRING'] if environ.get('QUERY_STRING') else '')
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is not None and entry[4] > self.clock():
+            status, headers, body = entry[:3]
+            start_response(status, headers + [('X-Cache', 'HIT')])
+            return [body]
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'], captured['headers'] = status, headers
+            return lambda data: None
+
+        result = self.app(environ, capture)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        status, headers = captured['status'], captured['headers']
+        # Surrogate headers are for the cache only
+        client_headers = [(name, value) for name, value in headers if name.lower() != SURROGATE_KEY.lower()]
+        max_age = self._shared_max_age(status, headers)
+        if max_age:
+            keys = {key for name, value in headers if name.lower() == SURROGATE_KEY.lower() for key in value.split()}
+            with self.lock:
+                self.entries[url] = (status, client_headers, body, keys, self.clock() + max_age)
+        start_response(status, client_headers + [('X-Cache', 'MISS')])
+        return [body]
+
+    @staticmethod
+    def _shared_max_age(status, headers):
+        if not status.startswith('200'):
+            return 0
+        names = {name.lower(): value for name, value in headers}
+        if 'set-cookie' in names or 'cookie' in names.get('vary', '').lower():
+            return 0
+        directives = [part.strip() for part in names.get('cache-control', '').split(',')]
+        if 'public' not in directives:
+            return 0
+        for directive in directives:
+            if directive.startswith('s-maxage='):
+                return int(directive.split('=', 1)[1])
+        return 0
+
+
+def serve(port):
+    """Run the app behind SharedCache, with item commits purging it."""
+    os.environ.setdefault('PUBLIC_LISTINGS', '1')
+    os.environ.setdefault('CDN_PURGE_URL', f'http://127.0.0.1:{port}{PURGE_PATH}')
+    from waitress import serve as waitress_serve
+    from application import application
+    print(f"Serving the app behind the stand-in shared cache on http://127.0.0.1:{port}")
+    waitress_serve(SharedCache(application), port=port)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'serve':
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else 8080)
+    elif command == 'purge' and len(sys.argv) > 2:
+        if not os.environ.get('CDN_PURGE_URL'):
+            sys.exit("CDN_PURGE_URL is not set")
+        purger = Purger(os.environ['CDN_PURGE_URL'], os.environ.get('CDN_PURGE_TOKEN'))
+        purger.pending.update(sys.argv[2:])
+        print(f"Purged {' '.join(sorted(purger.flush()))}")
+    else:
+        print(__doc__)
+        sys.exit(1)
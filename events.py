@@ -0,0 +1,150 @@
+"""
+Live item changes for server-sent event streams.
+
+PostgreSQL sends a NOTIFY on the item_changes channel whenever an item is
+inserted or updated (triggers from migration 0012). Each process keeps one
+listener thread on its own connection, outside the pool. That thread fans
+every event out to the streams subscribed to the item's category, so open
+streams never hold a database connection.
+
+Under waitress every open stream occupies a worker thread, so:
+
+- a process serves at most `max_streams` streams and refuses more
+- each stream has a bounded queue, and a client too slow to drain it is
+  disconnected (EventSource reconnects on its own)
+- streams end after a while (see the application's SSE_MAX_STREAM_SECONDS),
+  so threads go back to waitress and clients spread across processes again
+"""
+
+import json
+import logging
+import queue
+import select
+import threading
+
+CHANNEL = 'item_changes'
+
+logger = logging.getLogger(__name__)
+
+
+class TooManyStreams(Exception):
+    """Raised when a process already serves its maximum number of streams."""
+
+
+class Subscription:
+    """Queue of events for one open stream."""
+
+    def __init__(self, category, queue_size):
+        self.category = category
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broadcaster:
+    """Per-category fan-out of events to the streams of this process."""
+
+    def __init__(self, max_streams=16, queue_size=100):
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    @property
+    def stream_count(self):
+        with self.lock:
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+    def subscribe(self, category):
+        with self.lock:
+            count = sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+            if count >= self.max_streams:
+                raise TooManyStreams(f"{count} streams open")
+            subscription = Subscription(category, self.queue_size)
+            self.subscriptions.setdefault(category, set()).add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.get(subscription.category, set()).discard(subscription)
+
+    def publish(self, category, event):
+        """Queue an event for every stream of its category; returns how many got it."""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(category, ()))
+        delivered = 0
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(event)
+                delivered += 1
+            except queue.Full:
+                # Never block the listener on one slow client; its stream ends instead
+                subscription.overflowed = True
+        return delivered
+
+
+class Listener(threading.Thread):
+    """Daemon thread holding this process's LISTEN connection, reconnecting after errors."""
+
+    def __init__(self, engine, broadcaster, channel=CHANNEL, poll_interval=5.0, retry_seconds=5.0):
+        super().__init__(name='item-events-listener', daemon=True)
+        self.engine = engine
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.retry_seconds = retry_seconds
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                self.listen()
+            except Exception:
+                logger.exception("Item event listener failed, reconnecting in %ss", self.retry_seconds)
+                self.stopping.wait(self.retry_seconds)
+
+    def listen(self):
+        connection = self.engine.raw_connection()
+        # Held for the life of the thread, so it must not count against the pool
+        connection.detach()
+        try:
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+            logger.info("Listening for item events on %s", self.channel)
+            while not self.stopping.is_set():
+                if select.select([dbapi_connection], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    self.dispatch(dbapi_connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+    def dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+            category = event['category']
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed item event %r", payload)
+            return
+        self.broadcaster.publish(category, event)
+
+    def stop(self):
+        self.stopping.set()
+
+
+def format_event(name, data, event_id=None):
+    """One text/event-stream message."""
+    lines = [f'event: {name}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,71 @@
+"""
+Offline geocoder for house locations.
+
+Resolves free-text places such as 'Seattle, WA' to (latitude, longitude)
+using the gazetteer bundled in data/gazetteer.csv, so geocoding never needs
+the network. The gazetteer is loaded once, on first use.
+"""
+
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, 'data', 'gazetteer.csv')
+
+EARTH_RADIUS_KM = 6371.0
+# Mean length of one degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(place):
+    """Normalize a place string for lookup: 'seattle,  wa ' -> ('seattle', 'wa')."""
+    city, _, state = (place or '').partition(',')
+    return _SPACES.sub(' ', city).strip().lower(), state.strip().lower()
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Return ({(city, state): (lat, lon)}, {city: [(lat, lon), ...]}) from a gazetteer CSV."""
+    by_city_state = {}
+    by_city = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            city, state = normalize(f"{row['city']}, {row['state']}")
+            point = (float(row['latitude']), float(row['longitude']))
+            by_city_state[(city, state)] = point
+            by_city.setdefault(city, []).append(point)
+    return by_city_state, by_city
+
+
+def geocode(place, path=GAZETTEER_PATH):
+    """Return (latitude, longitude) for a place, or None when it is unknown or ambiguous."""
+    city, state = normalize(place)
+    if not city:
+        return None
+    by_city_state, by_city = load_gazetteer(path)
+    if state:
+        return by_city_state.get((city, state))
+    # Without a state, only a city name that is unique in the gazetteer resolves
+    points = by_city.get(city, [])
+    return points[0] if len(points) == 1 else None
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing a radius around a point."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    # Near the poles every longitude is within the radius
+    lon_delta = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
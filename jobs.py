@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Durable background job queue backed by the job table.
+
+enqueue_job() (application.py) writes a job on the caller's connection, so a
+job exists exactly when the item write that caused it commits. Workers claim
+the oldest due job with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+worker threads and processes share the queue without blocking each other, run
+the registered handler and record the outcome. A failed job is retried with
+exponential backoff and jitter until max_attempts, then left as 'failed' with
+its last error. Jobs stuck in 'running' after JOB_TIMEOUT_SECONDS (their worker
+died) count as failed attempts and are retried or failed the same way.
+
+Workers run either as threads inside each web process (JOB_WORKER_THREADS) or
+as a separate process:
+
+Usage:
+    python jobs.py work              # one worker thread per CPU until interrupted
+    python jobs.py work 4            # 4 worker threads
+    python jobs.py stats             # queue depth and latency as JSON
+    python jobs.py purge [days]      # delete jobs finished more than 7 (or days) days ago, and old item deletions
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+import analytics
+import thumbnails
+from application import (
+    db, application, Item, ItemDeletion, Job, CATEGORIES, get_item_detail, refresh_category_summary,
+    thumbnail_store,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+IDLE_POLL_SECONDS = 1.0
+STATS_SAMPLE_SIZE = 1000
+
+handlers = {}
+
+
+def handler(kind):
+    """Register a function(payload) as the handler of a job kind."""
+    def register(func):
+        handlers[kind] = func
+        return func
+    return register
+
+
+@handler('refresh_summary')
+def refresh_summary(payload):
+    with db.engine.begin() as connection:
+        refresh_category_summary(connection, payload['category'])
+
+
+@handler('compute_similar_items')
+def compute_similar_items(payload):
+    from migrations.compute_similar_items import compute_category
+    from similarity import DEFAULT_TOP_K
+
+    categories = [payload['category']] if payload and payload.get('category') else CATEGORIES
+    for category in categories:
+        compute_category(category, (payload or {}).get('k', DEFAULT_TOP_K))
+
+
+@handler('thumbnail')
+def thumbnail(payload):
+    """Download an item's icon, shrink it to THUMBNAIL_SIZE and point thumbnail_url at the stored copy."""
+    item = db.session.get(Item, payload['item_id'])
+    if item is None or not item.icon_url:
+        return
+    try:
+        data = thumbnails.make_thumbnail(thumbnails.fetch_icon(item.icon_url))
+    except thumbnails.IconRejected as e:
+        # Retrying cannot make an unsafe or oversized icon acceptable; cards keep showing icon_url
+        logger.warning("not making a thumbnail of item %s: %s", item.id, e)
+        return
+    item.thumbnail_url = thumbnail_store.save(thumbnails.thumbnail_name(item.id, data), data)
+    db.session.commit()
+
+
+@handler('warm_item_cache')
+def warm_item_cache(payload):
+    for item_id in payload['item_ids']:
+        get_item_detail(item_id)
+
+
+def backoff_seconds(attempts, base=None):
+    """Delay before retry number `attempts`: exponential, capped, with full jitter."""
+    base = base if base is not None else application.config['JOB_RETRY_BASE_SECONDS']
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, base * 2 ** (attempts - 1)))
+
+
+def claim(worker_id):
+    """Mark the oldest due queued job as running and return it as a dict, or None."""
+    job = Job.__table__
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        job_id = connection.execute(
+            select(job.c.id)
+            .where(job.c.status == 'queued', job.c.run_at <= now)
+            .order_by(job.c.run_at, job.c.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if job_id is None:
+            return None
+        # The status condition keeps the claim exclusive where SKIP LOCKED is not available (SQLite)
+        claimed = connection.execute(
+            job.update()
+            .where(job.c.id == job_id, job.c.status == 'queued')
+            .values(status='running', attempts=job.c.attempts + 1, started_at=now, locked_by=worker_id)
+        ).rowcount
+        if not claimed:
+            return None
+        return dict(connection.execute(select(job).where(job.c.id == job_id)).mappings().one())
+
+
+def _finish(job_id, **values):
+    job = Job.__table__
+    with db.engine.begin() as connection:
+        connection.execute(job.update().where(job.c.id == job_id).values(locked_by=None, **values))
+
+
+def run_one(worker_id='inline'):
+    """Claim and run one job; returns the job's final status, or None if nothing was due."""
+    with application.app_context():
+        job = claim(worker_id)
+        if job is None:
+            return None
+        try:
+            func = handlers.get(job['kind'])
+            if func is None:
+                raise LookupError(f"no handler for job kind {job['kind']!r}")
+            func(job['payload'])
+        except Exception:
+            db.session.rollback()
+            error = traceback.format_exc(limit=5)
+            if job['attempts'] >= job['max_attempts']:
+                logger.error("Job %s (%s) failed permanently:\n%s", job['id'], job['kind'], error)
+                _finish(job['id'], status='failed', finished_at=datetime.utcnow(), last_error=error)
+                return 'failed'
+            delay = backoff_seconds(job['attempts'])
+            logger.warning("Job %s (%s) failed, retrying in %.0fs", job['id'], job['kind'], delay)
+            _finish(job['id'], status='queued', run_at=datetime.utcnow() + timedelta(seconds=delay),
+                    last_error=error)
+            return 'queued'
+        finally:
+            db.session.remove()
+        _finish(job['id'], status='done', finished_at=datetime.utcnow())
+        return 'done'
+
+
+def requeue_stale(timeout=None):
+    """Retry running jobs whose worker stopped reporting, like jobs that raised; returns how many.
+
+    A job that already used max_attempts (it keeps crashing its worker) is failed instead.
+    """
+    job = Job.__table__
+    timeout = timeout if timeout is not None else application.config['JOB_TIMEOUT_SECONDS']
+    now = datetime.utcnow()
+    with application.app_context(), db.engine.begin() as connection:
+        stale = connection.execute(
+            select(job.c.id, job.c.attempts, job.c.max_attempts)
+            .where(job.c.status == 'running', job.c.started_at < now - timedelta(seconds=timeout))
+            .with_for_update(skip_locked=True)
+        ).all()
+        for job_id, attempts, max_attempts in stale:
+            if attempts >= max_attempts:
+                logger.error("Job %s timed out on its last attempt, failing it", job_id)
+                values = {'status': 'failed', 'finished_at': now}
+            else:
+                values = {'status': 'queued', 'run_at': now + timedelta(seconds=backoff_seconds(attempts))}
+            connection.execute(
+                job.update()
+                .where(job.c.id == job_id, job.c.status == 'running')
+                .values(locked_by=None, last_error='worker timed out', **values)
+            )
+        return len(stale)
+
+
+def purge_finished(days=7):
+    """Delete done and failed jobs that finished more than `days` days ago; returns how many."""
+    job = Job.__table__
+    with application.app_context(), db.engine.begin() as connection:
+        return connection.execute(
+            job.delete().where(job.c.status.in_(('done', 'failed')),
+                               job.c.finished_at < datetime.utcnow() - timedelta(days=days))
+        ).rowcount
+
+
+def purge_item_deletions():
+    """Delete item_deletion rows older than analytics.DELETION_RETENTION; returns how many."""
+    deletion = ItemDeletion.__table__
+    with application.app_context(), db.engine.begin() as connection:
+        return connection.execute(
+            deletion.delete().where(deletion.c.deleted_at < datetime.utcnow() - analytics.DELETION_RETENTION)
+        ).rowcount
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(fraction * len(values)))], 3)
+
+
+def queue_stats():
+    """Queue depth per kind and status, age of the oldest due job, and wait/run latency percentiles."""
+    job = Job.__table__
+    now = datetime.utcnow()
+    with application.app_context(), db.engine.connect() as connection:
+        depth = {}
+        for kind, status, count in connection.execute(
+            select(job.c.kind, job.c.status, func.count()).group_by(job.c.kind, job.c.status)
+        ):
+            depth.setdefault(kind, {})[status] = count
+        oldest = connection.execute(
+            select(func.min(job.c.run_at)).where(job.c.status == 'queued', job.c.run_at <= now)
+        ).scalar()
+        # Latency of recently finished jobs: queue wait from due to started, run time from started to finished
+        recent = connection.execute(
+            select(job.c.run_at, job.c.started_at, job.c.finished_at)
+            .where(job.c.status == 'done')
+            .order_by(job.c.finished_at.desc())
+            .limit(STATS_SAMPLE_SIZE)
+        ).all()
+    waits = [max(0.0, (started - run_at).total_seconds()) for run_at, started, _ in recent]
+    runs = [(finished - started).total_seconds() for _, started, finished in recent]
+    return {
+        'depth': depth,
+        'oldest_queued_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+        'wait_seconds': {'p50': _percentile(waits, 0.5), 'p95': _percentile(waits, 0.95)},
+        'run_seconds': {'p50': _percentile(runs, 0.5), 'p95': _percentile(runs, 0.95)},
+        'sample_size': len(recent),
+    }
+
+
+class Worker:
+    """A pool of daemon threads that poll the queue until stop() is called."""
+
+    def __init__(self, threads=1, poll_interval=IDLE_POLL_SECONDS):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self.pool = []
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        for number in range(self.threads):
+            thread = threading.Thread(target=self._loop, args=(f"{self.name}:{number}",),
+                                      name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self.pool.append(thread)
+        return self
+
+    def _loop(self, worker_id):
+        last_requeue = 0.0
+        while not self.stopping.is_set():
+            try:
+                if time.monotonic() - last_requeue > self.poll_interval * 60:
+                    requeue_stale()
+                    last_requeue = time.monotonic()
+                if run_one(worker_id) is None:
+                    self.stopping.wait(self.poll_interval)
+            except Exception:
+                # The database is unreachable or the job table is missing; back off and keep polling
+                logger.exception("Job worker %s error", worker_id)
+                self.stopping.wait(self.poll_interval * 5)
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        for thread in self.pool:
+            thread.join(timeout)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'work'
+    if command == 'work':
+        threads = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+        print(f"Starting {threads} job worker thread(s); Ctrl-C to stop")
+        worker = Worker(threads).start()
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            print("Stopping workers after their current job...")
+            worker.stop()
+    elif command == 'stats':
+        print(json.dumps(queue_stats(), indent=2))
+    elif command == 'purge':
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+        print(f"✓ Deleted {purge_finished(days)} finished jobs older than {days} days")
+        print(f"✓ Deleted {purge_item_deletions()} item deletions older than {analytics.DELETION_RETENTION.days} days")
+    else:
+        sys.exit(__doc__)
@@ -0,0 +1,102 @@
+"""
+Overload signals for readiness checks and load shedding.
+
+Two signals are tracked per process:
+
+- how long requests wait to check out a database connection, as an average
+  that decays with time (TimedQueuePool records every checkout), so one slow
+  burst stops counting a few seconds after the pool recovers
+- how many requests are currently inside the application
+
+When either crosses its threshold, new requests are answered with a quick 503
+instead of queueing behind the ones already waiting for a connection.
+"""
+
+import math
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+class DecayingAverage:
+    """Exponentially weighted average whose weight halves every `half_life` seconds, also while idle."""
+
+    def __init__(self, half_life=5.0, clock=time.monotonic):
+        self.half_life = half_life
+        self.clock = clock
+        self.total = 0.0
+        self.weight = 0.0
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _decay(self, now):
+        factor = math.pow(0.5, (now - self.updated) / self.half_life)
+        self.total *= factor
+        self.weight *= factor
+        self.updated = now
+
+    def observe(self, value):
+        with self.lock:
+            self._decay(self.clock())
+            self.total += value
+            self.weight += 1.0
+
+    def value(self):
+        """The current average, fading towards 0 while nothing is observed."""
+        with self.lock:
+            self._decay(self.clock())
+            # An idle stretch leaves little weight; divide by at least 1 so the average fades out
+            return self.total / max(self.weight, 1.0)
+
+
+checkout_wait = DecayingAverage()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_wait.observe(time.perf_counter() - start)
+
+
+class InFlight:
+    """Count of requests currently being handled by this process."""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def enter(self):
+        with self.lock:
+            self.count += 1
+            return self.count
+
+    def leave(self):
+        with self.lock:
+            self.count -= 1
+
+
+in_flight = InFlight()
+
+
+def pool_status(pool):
+    """Connections in use and capacity of a pool; capacity is None for pools without a limit."""
+    if not isinstance(pool, QueuePool):
+        return {'checked_out': None, 'capacity': None}
+    capacity = pool.size() + pool._max_overflow if pool._max_overflow >= 0 else None
+    return {'checked_out': pool.checkedout(), 'capacity': capacity}
+
+
+def overload_reason(max_in_flight, max_checkout_wait, current_in_flight=None):
+    """Why this process should shed the request, or None when it is healthy."""
+    current_in_flight = in_flight.count if current_in_flight is None else current_in_flight
+    if max_in_flight and current_in_flight > max_in_flight:
+        return 'in_flight'
+    if max_checkout_wait and checkout_wait.value() > max_checkout_wait:
+        return 'pool_wait'
+    return None
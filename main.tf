@@ -55,6 +55,18 @@ resource "aws_elastic_beanstalk_environment" "marketplace_env" {
     value     = "true"
   }
 
+  # Probe the cheap readiness endpoint instead of / (which redirects to login)
+  setting {
+    namespace = "aws:elasticbeanstalk:application"
+    name      = "Application Healthcheck URL"
+    value     = "/readyz"
+  }
+
+  setting {
+    namespace = "aws:elasticbeanstalk:healthreporting:system"
+    name      = "SystemType"
+    value     = "enhanced"
+  }
 
 }
 
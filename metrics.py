@@ -0,0 +1,69 @@
+"""
+In-process metrics registry rendered in the Prometheus text format.
+
+Values are kept per worker process; the scraper sums them across processes.
+Only the metric types the app needs are implemented, so there is no client
+library dependency.
+"""
+
+import threading
+
+
+class Counter:
+    """A monotonically increasing value per combination of label values."""
+
+    type_name = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        """Return the counter called `name`, creating it on first use."""
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = Counter(name, help_text, labelnames)
+            return self.metrics[name]
+
+    def render(self):
+        """The whole registry in the Prometheus text exposition format."""
+        lines = []
+        for metric in sorted(self.metrics.values(), key=lambda metric: metric.name):
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for name, labels, value in metric.samples():
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+render = REGISTRY.render
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Seed price_history with the current price of every item that has no history yet.
+
+Item writes through the ORM record their own price changes; run this once after
+migration 0014, and after bulk Core loads such as `seed_data.py large`, which
+skip the ORM hooks. Items are copied in primary-key batches with one
+INSERT ... SELECT each, committing and pausing between batches so the item
+table is never locked for long. Running it again only adds items that are
+still missing.
+
+Usage:
+    python migrations/backfill_price_history.py [batch_size]
+"""
+
+import sys
+import os
+import time
+from datetime import datetime
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import db, application, Item, PriceHistory
+from sqlalchemy import exists, func, insert, literal, select
+
+DEFAULT_BATCH_SIZE = 10000
+PAUSE_SECONDS = 0.05
+
+
+def backfill_price_history(batch_size=DEFAULT_BATCH_SIZE, pause=PAUSE_SECONDS, recorded_at=None):
+    """Insert a row for each item without history; returns how many were inserted."""
+    recorded_at = recorded_at or datetime.utcnow()
+    inserted = 0
+    with application.app_context():
+        low, high = db.session.execute(select(func.min(Item.id), func.max(Item.id))).one()
+        db.session.rollback()
+        if low is None:
+            return 0
+        start_time = time.time()
+        for batch_start in range(low, high + 1, batch_size):
+            missing = (
+                select(Item.id, Item.category, Item.price, literal(recorded_at))
+                .where(Item.id >= batch_start, Item.id < batch_start + batch_size,
+                       Item.category.is_not(None), Item.price.is_not(None),
+                       ~exists().where(PriceHistory.item_id == Item.id))
+                .order_by(Item.id)
+            )
+            statement = insert(PriceHistory).from_select(
+                ['item_id', 'category', 'price', 'recorded_at'], missing)
+            with db.engine.begin() as connection:
+                inserted += connection.execute(statement).rowcount
+            print(f"  items {batch_start}-{batch_start + batch_size - 1}: {inserted} rows so far")
+            time.sleep(pause)
+        print(f"✓ Backfilled {inserted} price history rows in {time.time() - start_time:.1f}s")
+    return inserted
+
+
+if __name__ == "__main__":
+    backfill_price_history(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH_SIZE)
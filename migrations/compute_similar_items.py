@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Recompute the similar_item table: the top-k most similar listings of every
+item within its category (see similarity.py).
+
+Each category is loaded in one streamed query, scored in memory-bounded
+vectorized chunks and written back in a single transaction, so the item pages
+keep reading the previous neighbours until the new ones commit. Prints the
+throughput of each phase.
+
+Usage:
+    python migrations/compute_similar_items.py
+    python migrations/compute_similar_items.py 12       # top 12 instead of 8
+"""
+
+import sys
+import os
+import time
+from itertools import islice
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import db, application, Item, SimilarItem, CATEGORIES
+from similarity import DEFAULT_TOP_K, similar_items
+from sqlalchemy import select
+
+LOAD_BATCH_SIZE = 20000
+INSERT_BATCH_SIZE = 20000
+
+
+def load_category(connection, category):
+    item = Item.__table__
+    result = connection.execution_options(stream_results=True, yield_per=LOAD_BATCH_SIZE).execute(
+        select(item.c.id, item.c.price, item.c.specifications, item.c.latitude, item.c.longitude)
+        .where(item.c.category == category)
+    )
+    return [tuple(row) for row in result]
+
+
+def store_category(connection, category, neighbours):
+    """Replace a category's rows; returns the number of rows written."""
+    table = SimilarItem.__table__
+    connection.execute(table.delete().where(table.c.category == category))
+    written = 0
+    while True:
+        batch = [
+            {'item_id': item_id, 'rank': rank, 'similar_item_id': similar_id, 'score': score, 'category': category}
+            for item_id, rank, similar_id, score in islice(neighbours, INSERT_BATCH_SIZE)
+        ]
+        if not batch:
+            return written
+        connection.execute(table.insert(), batch)
+        written += len(batch)
+
+
+def compute_category(category, k=DEFAULT_TOP_K):
+    """Recompute one category's similar items; returns (items, neighbours written, phase timings)."""
+    start_time = time.perf_counter()
+    with db.engine.connect() as connection:
+        rows = load_category(connection, category)
+    loaded = time.perf_counter()
+
+    # Materialize the neighbours so scoring and storing are timed separately
+    neighbours = list(similar_items(rows, category, k))
+    scored = time.perf_counter()
+
+    with db.engine.begin() as connection:
+        written = store_category(connection, category, iter(neighbours))
+    stored = time.perf_counter()
+    return len(rows), written, (loaded - start_time, scored - loaded, stored - scored)
+
+
+def compute_all(k=DEFAULT_TOP_K):
+    """Recompute similar items for every category and print per-phase throughput."""
+    with application.app_context():
+        total_items = 0
+        total_start = time.perf_counter()
+        for category in CATEGORIES:
+            try:
+                count, written, (load, score, store) = compute_category(category, k)
+            except Exception as e:
+                print(f"Failed to compute similar items for {category}: {e}")
+                raise
+
+            total_items += count
+            elapsed = load + score + store
+            rate = count / elapsed if elapsed else 0
+            print(f"✓ {category}: {count} items, {written} neighbours "
+                  f"(load {load:.1f}s, score {score:.1f}s, store {store:.1f}s, "
+                  f"{rate:,.0f} items/s)")
+        elapsed = time.perf_counter() - total_start
+        print(f"Similar items computed for {total_items} items in {elapsed:.1f}s "
+              f"({total_items / elapsed if elapsed else 0:,.0f} items/s)")
+
+if __name__ == "__main__":
+    compute_all(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TOP_K)
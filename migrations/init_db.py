@@ -31,6 +31,7 @@ def init_database():
             
             print("✓ User table created")
             print("✓ Item table created")
+            print("✓ CategorySummary table created")
             
             print("")
             print("========================================")
@@ -40,6 +41,7 @@ def init_database():
             print("Next steps:")
             print("  1. Run migrations: python3 migrations/migrate_db.py")
             print("  2. Seed data (optional): python3 migrations/seed_data.py")
+            print("  3. Refresh summaries: python3 migrations/refresh_category_summaries.py")
             print("")
             
         except Exception as e:
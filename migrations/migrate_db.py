@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """
-Database migration script to add icon_url and specifications columns to Item table.
-This script can be run independently or imported as a module.
+Apply versioned database migrations from migrations/versions/.
+Applied versions are tracked in the schema_migrations table, indexes are built
+concurrently and backfills run in throttled batches (see migrations/runner.py),
+so this can be run against the live database.
 
 Usage:
-    python migrations/migrate_db.py
+    python migrations/migrate_db.py                  # apply all pending migrations
+    python migrations/migrate_db.py upgrade 0004     # apply up to a version
+    python migrations/migrate_db.py status           # list applied and pending versions
+    python migrations/migrate_db.py rollback         # roll back the latest version
+    python migrations/migrate_db.py downgrade 0002   # roll back everything newer than a version
 """
 
 import sys
@@ -14,77 +20,56 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from application import db, application
-from sqlalchemy import text
+from migrations.runner import MigrationRunner
 
 
-def run_migration():
-    """Execute the database migration to add new columns."""
+def run_migration(target=None):
+    """Apply pending migrations up to `target` (default: all)."""
     with application.app_context():
         try:
             print("Starting database migration...")
-            
-            # Add icon_url column
-            print("Adding icon_url column...")
-            db.session.execute(text(
-                "ALTER TABLE item ADD COLUMN IF NOT EXISTS icon_url VARCHAR(500)"
-            ))
-            
-            # Add specifications column (JSONB for PostgreSQL)
-            print("Adding specifications column...")
-            db.session.execute(text(
-                "ALTER TABLE item ADD COLUMN IF NOT EXISTS specifications JSONB"
-            ))
-            
-            # Create index on category column for better query performance
-            print("Creating index on category column...")
-            db.session.execute(text(
-                "CREATE INDEX IF NOT EXISTS idx_item_category ON item(category)"
-            ))
-            
-            # Commit the changes
-            db.session.commit()
-            print("Migration completed successfully!")
-            
+            applied = MigrationRunner(db.engine).upgrade(target)
+            if applied:
+                print(f"Migration completed successfully! Applied {len(applied)} version(s).")
+            else:
+                print("Database is already up to date.")
         except Exception as e:
             print(f"Migration failed: {e}")
-            db.session.rollback()
             raise
 
 
-def rollback_migration():
-    """Rollback the migration (remove added columns)."""
+def rollback_migration(target=None):
+    """Roll back the latest migration, or every migration newer than `target`."""
     with application.app_context():
         try:
             print("Starting migration rollback...")
-            
-            # Drop columns
-            print("Dropping icon_url column...")
-            db.session.execute(text(
-                "ALTER TABLE item DROP COLUMN IF EXISTS icon_url"
-            ))
-            
-            print("Dropping specifications column...")
-            db.session.execute(text(
-                "ALTER TABLE item DROP COLUMN IF EXISTS specifications"
-            ))
-            
-            print("Dropping category index...")
-            db.session.execute(text(
-                "DROP INDEX IF EXISTS idx_item_category"
-            ))
-            
-            # Commit the changes
-            db.session.commit()
-            print("Rollback completed successfully!")
-            
+            rolled_back = MigrationRunner(db.engine).downgrade(target)
+            print(f"Rollback completed successfully! Rolled back {len(rolled_back)} version(s).")
         except Exception as e:
             print(f"Rollback failed: {e}")
-            db.session.rollback()
             raise
 
 
+def show_status():
+    """Print every known migration and when it was applied."""
+    with application.app_context():
+        for migration, applied in MigrationRunner(db.engine).status():
+            if applied:
+                print(f"✓ {migration.version} {migration.name} "
+                      f"(applied {applied.applied_at:%Y-%m-%d %H:%M}, {applied.duration_ms:.0f}ms, "
+                      f"lock wait {applied.lock_wait_ms:.0f}ms)")
+            else:
+                print(f"  {migration.version} {migration.name} (pending)")
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "rollback":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    if command == "rollback":
         rollback_migration()
+    elif command == "downgrade":
+        rollback_migration(target)
+    elif command == "status":
+        show_status()
     else:
-        run_migration()
+        run_migration(target)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized category_summary rows from the item table.
+Each category is refreshed in its own short transaction, so readers keep
+seeing the previous row until the new one commits.
+
+Run it after bulk loads (with CATEGORY_SUMMARY_SYNC=0) or on a schedule.
+
+Usage:
+    python migrations/refresh_category_summaries.py
+    python migrations/refresh_category_summaries.py loop 300
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path to import application modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from application import db, application, CategorySummary, CATEGORIES, refresh_category_summary
+
+
+def refresh_all():
+    """Refresh the summary of every known category and every category already summarized."""
+    with application.app_context():
+        summarized = [summary.category for summary in CategorySummary.query.all()]
+        db.session.rollback()
+        categories = sorted(set(CATEGORIES) | set(summarized))
+
+        for category in categories:
+            start_time = time.time()
+            try:
+                with db.engine.begin() as connection:
+                    refresh_category_summary(connection, category)
+            except Exception as e:
+                print(f"Failed to refresh {category}: {e}")
+                raise
+            print(f"✓ {category} refreshed in {(time.time() - start_time) * 1000:.2f}ms")
+
+
+def refresh_forever(interval):
+    """Refresh all summaries every `interval` seconds."""
+    while True:
+        refresh_all()
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "loop":
+        refresh_forever(int(sys.argv[2]) if len(sys.argv) > 2 else 300)
+    else:
+        refresh_all()
@@ -0,0 +1,358 @@
+"""
+Versioned, online migration runner.
+
+Migrations live in migrations/versions/ as NNNN_description.py modules with
+upgrade(ctx) and downgrade(ctx) functions. Applied versions are recorded in the
+schema_migrations table, so each version runs exactly once per database.
+
+The MigrationContext passed to each migration keeps schema changes safe to run
+against a live catalog on PostgreSQL:
+
+- every statement runs in its own short transaction with a lock_timeout and is
+  retried with backoff, so a blocked ALTER never queues writers behind it
+- indexes are built with CREATE INDEX CONCURRENTLY outside a transaction, and an
+  INVALID index left by an interrupted build is dropped and rebuilt; on a
+  partitioned table each partition's index is built concurrently and attached
+- backfills walk the table by primary key in small committed batches with a
+  pause between them
+- time spent waiting on locks is sampled from pg_stat_activity and reported per step
+
+On SQLite (used by the tests) the same migrations run as plain statements.
+"""
+
+import glob
+import importlib.util
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, MetaData, String, Table, inspect, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'versions')
+
+metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', String(32), primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+    Column('duration_ms', Float, nullable=False),
+    Column('lock_wait_ms', Float, nullable=False),
+)
+
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+class Migration:
+    """One versioned migration module."""
+
+    def __init__(self, path):
+        filename = os.path.basename(path)
+        self.version, _, rest = filename[:-3].partition('_')
+        self.name = rest.replace('_', ' ')
+        self.path = path
+        spec = importlib.util.spec_from_file_location(f'migration_{self.version}', path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+
+    @property
+    def description(self):
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+    def __repr__(self):
+        return f'<Migration {self.version} {self.name}>'
+
+
+def discover_migrations(directory=VERSIONS_DIR):
+    """Load all migration modules in version order."""
+    return [Migration(path) for path in sorted(glob.glob(os.path.join(directory, '[0-9]*_*.py')))]
+
+
+class LockWaitMonitor:
+    """Sample pg_stat_activity for one backend and accumulate time spent waiting on locks."""
+
+    def __init__(self, engine, pid, interval=0.05):
+        self.engine = engine
+        self.pid = pid
+        self.interval = interval
+        self.waited = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        with self.engine.connect() as connection:
+            while not self._stop.wait(self.interval):
+                wait_type = connection.execute(
+                    text("SELECT wait_event_type FROM pg_stat_activity WHERE pid = :pid"),
+                    {'pid': self.pid},
+                ).scalar()
+                connection.rollback()
+                if wait_type == 'Lock':
+                    self.waited += self.interval
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return the accumulated lock wait in seconds."""
+        self._stop.set()
+        self._thread.join()
+        return self.waited
+
+
+class MigrationContext:
+    """Helpers handed to upgrade()/downgrade() for running online schema changes."""
+
+    def __init__(self, engine, lock_timeout_ms=2000, lock_retries=10, retry_backoff=0.5, log=print):
+        self.engine = engine
+        self.lock_timeout_ms = lock_timeout_ms
+        self.lock_retries = lock_retries
+        self.retry_backoff = retry_backoff
+        self.log = log
+        self.lock_wait_ms = 0.0
+
+    @property
+    def is_postgresql(self):
+        return self.engine.dialect.name == 'postgresql'
+
+    def _step(self, description, func, autocommit=False):
+        """Run func(connection) with lock_timeout and retries, reporting duration and lock waits.
+
+        Transactional steps commit when func returns; autocommit steps run outside a
+        transaction, as CREATE INDEX CONCURRENTLY requires.
+        """
+        for attempt in range(1, self.lock_retries + 1):
+            start_time = time.perf_counter()
+            connection = self.engine.connect()
+            if autocommit:
+                connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+            monitor = None
+            try:
+                if self.is_postgresql:
+                    connection.execute(text(f"SET lock_timeout = {int(self.lock_timeout_ms)}"))
+                    pid = connection.execute(text("SELECT pg_backend_pid()")).scalar()
+                    connection.commit()
+                    monitor = LockWaitMonitor(self.engine, pid).start()
+                if autocommit:
+                    return func(connection)
+                with connection.begin():
+                    return func(connection)
+            except OperationalError as e:
+                if getattr(e.orig, 'pgcode', None) != LOCK_NOT_AVAILABLE or attempt == self.lock_retries:
+                    raise
+                self.log(f"    lock not available for {description!r}, retry {attempt}/{self.lock_retries}")
+                time.sleep(self.retry_backoff * attempt)
+            finally:
+                waited = monitor.stop() * 1000 if monitor is not None else 0.0
+                self.lock_wait_ms += waited
+                if self.is_postgresql and not connection.invalidated:
+                    # Pooled connections keep session settings, so restore the default timeout
+                    try:
+                        connection.rollback()
+                        connection.execute(text("RESET lock_timeout"))
+                        connection.commit()
+                    except DBAPIError:
+                        connection.invalidate()
+                connection.close()
+                elapsed = (time.perf_counter() - start_time) * 1000
+                self.log(f"    {description}: {elapsed:.1f}ms (lock wait {waited:.1f}ms)")
+
+    def execute(self, sql, description=None, **params):
+        """Run one statement in its own short transaction; returns its rows or rowcount."""
+        def statement(connection):
+            result = connection.execute(text(sql), params)
+            return result.all() if result.returns_rows else result.rowcount
+        return self._step(description or ' '.join(sql.split())[:80], statement)
+
+    def run(self, func, description):
+        """Run func(connection) inside one short transaction."""
+        return self._step(description, func)
+
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.engine).get_columns(table))
+
+    def has_index(self, table, name):
+        return any(i['name'] == name for i in inspect(self.engine).get_indexes(table))
+
+    def create_table(self, table):
+        """Create a SQLAlchemy Table if it does not exist."""
+        self._step(f"create table {table.name}", lambda connection: table.create(connection, checkfirst=True))
+
+    def drop_table(self, table):
+        self._step(f"drop table {table.name}", lambda connection: table.drop(connection, checkfirst=True))
+
+    def add_column(self, table, column, type_sql):
+        """Add a nullable column; a metadata-only change on PostgreSQL."""
+        if self.has_column(table, column):
+            return
+        self.execute(f'ALTER TABLE "{table}" ADD COLUMN {column} {type_sql}', f"add column {table}.{column}")
+
+    def drop_column(self, table, column):
+        if not self.has_column(table, column):
+            return
+        self.execute(f'ALTER TABLE "{table}" DROP COLUMN {column}', f"drop column {table}.{column}")
+
+    def _relkind(self, name):
+        rows = self.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)", f"read {name} kind", name=name)
+        return rows[0][0] if rows else None
+
+    def is_partitioned(self, table):
+        return self.is_postgresql and self._relkind(f'"{table}"') == 'p'
+
+    def partitions(self, table):
+        """Names of the partitions directly attached to a partitioned table."""
+        rows = self.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = to_regclass(:table) ORDER BY 1",
+            f"list partitions of {table}", table=f'"{table}"',
+        )
+        return [row[0] for row in rows]
+
+    def create_index(self, name, table, columns, using=None, where=None, unique=False):
+        """Build an index without blocking writes (CONCURRENTLY on PostgreSQL)."""
+        unique_sql = 'UNIQUE ' if unique else ''
+        where_sql = f' WHERE {where}' if where else ''
+        if not self.is_postgresql:
+            if not self.has_index(table, name):
+                self.execute(f'CREATE {unique_sql}INDEX {name} ON "{table}" ({columns}){where_sql}', f"create index {name}")
+            return
+        using_sql = f' USING {using}' if using else ''
+        if self.is_partitioned(table):
+            # CONCURRENTLY is not supported on partitioned tables: create the parent index ON ONLY
+            # the parent (invalid until complete), then build each partition's index concurrently
+            # and attach it
+            self.execute(f'CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON ONLY "{table}"{using_sql} ({columns}){where_sql}',
+                         f"create partitioned index {name}")
+            for partition in self.partitions(table):
+                partition_index = f'{partition}_{name}'[:63]
+                self.create_index(partition_index, partition, columns, using, where, unique)
+                self.execute(f'ALTER INDEX {name} ATTACH PARTITION {partition_index}', f"attach {partition_index}")
+            return
+        # An interrupted concurrent build leaves an INVALID index behind that IF NOT EXISTS would keep
+        invalid = self.execute(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid",
+            f"check index {name}", name=name,
+        )
+        if invalid:
+            self.drop_index(name)
+        sql = f'CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}"{using_sql} ({columns}){where_sql}'
+        self._step(f"create index concurrently {name}", lambda connection: connection.execute(text(sql)), autocommit=True)
+
+    def drop_index(self, name):
+        if not self.is_postgresql:
+            self.execute(f"DROP INDEX IF EXISTS {name}", f"drop index {name}")
+            return
+        if self._relkind(name) == 'I':
+            # Partitioned indexes cannot be dropped concurrently; this also drops the partitions' indexes
+            self.execute(f"DROP INDEX IF EXISTS {name}", f"drop partitioned index {name}")
+            return
+        sql = f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+        self._step(f"drop index concurrently {name}", lambda connection: connection.execute(text(sql)), autocommit=True)
+
+    def vacuum_analyze(self, table):
+        """Set the visibility map and planner statistics of a freshly written table.
+
+        A bulk copy leaves every page unmarked in the visibility map, so count queries
+        cannot use index-only scans until autovacuum reaches the table. VACUUM cannot
+        run inside a transaction, so this is an autocommit step.
+        """
+        sql = f'VACUUM (ANALYZE) "{table}"' if self.is_postgresql else f'ANALYZE "{table}"'
+        self._step(f"vacuum analyze {table}", lambda connection: connection.execute(text(sql)), autocommit=True)
+
+    def backfill(self, table, set_sql, where_sql='1 = 1', batch_size=5000, pause=0.05, **params):
+        """Update a table in primary-key ordered batches, committing and pausing between batches."""
+        last_id = None
+        updated = 0
+        while True:
+            def batch(connection):
+                ids = connection.execute(text(
+                    f'SELECT id FROM "{table}" WHERE ({where_sql})'
+                    + (' AND id > :last_id' if last_id is not None else '')
+                    + ' ORDER BY id LIMIT :batch_size'
+                ), {'last_id': last_id, 'batch_size': batch_size, **params}).scalars().all()
+                if not ids:
+                    return ids, 0
+                result = connection.execute(text(
+                    f'UPDATE "{table}" SET {set_sql} WHERE id >= :low AND id <= :high AND ({where_sql})'
+                ), {'low': ids[0], 'high': ids[-1], **params})
+                return ids, result.rowcount
+
+            ids, rowcount = self._step(f"backfill {table} after id {last_id}", batch)
+            updated += rowcount
+            if len(ids) < batch_size:
+                return updated
+            last_id = ids[-1]
+            time.sleep(pause)
+
+
+class MigrationRunner:
+    """Apply and roll back versioned migrations, recording them in schema_migrations."""
+
+    def __init__(self, engine, migrations=None, log=print, **context_options):
+        self.engine = engine
+        self.migrations = discover_migrations() if migrations is None else migrations
+        self.log = log
+        self.context_options = context_options
+
+    def applied_versions(self):
+        schema_migrations.create(self.engine, checkfirst=True)
+        with self.engine.connect() as connection:
+            return {row.version: row for row in connection.execute(schema_migrations.select())}
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [m for m in self.migrations if m.version not in applied]
+
+    def upgrade(self, target=None):
+        """Apply pending migrations up to and including `target` (default: all)."""
+        applied = []
+        for migration in self.pending():
+            if target is not None and migration.version > target:
+                break
+            self.log(f"Applying {migration.version}: {migration.description}")
+            context = MigrationContext(self.engine, log=self.log, **self.context_options)
+            start_time = time.perf_counter()
+            migration.module.upgrade(context)
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            with self.engine.begin() as connection:
+                connection.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    name=migration.name,
+                    applied_at=datetime.utcnow(),
+                    duration_ms=duration_ms,
+                    lock_wait_ms=context.lock_wait_ms,
+                ))
+            self.log(f"✓ {migration.version} applied in {duration_ms:.1f}ms (lock wait {context.lock_wait_ms:.1f}ms)")
+            applied.append(migration)
+        return applied
+
+    def downgrade(self, target=None):
+        """Roll back applied migrations newer than `target` (default: only the latest one)."""
+        applied = self.applied_versions()
+        rolled_back = []
+        for migration in reversed(self.migrations):
+            if migration.version not in applied:
+                continue
+            if target is not None and migration.version <= target:
+                break
+            self.log(f"Rolling back {migration.version}: {migration.description}")
+            context = MigrationContext(self.engine, log=self.log, **self.context_options)
+            migration.module.downgrade(context)
+            with self.engine.begin() as connection:
+                connection.execute(schema_migrations.delete().where(schema_migrations.c.version == migration.version))
+            self.log(f"✓ {migration.version} rolled back")
+            rolled_back.append(migration)
+            if target is None:
+                break
+        return rolled_back
+
+    def status(self):
+        """Return (migration, applied row or None) pairs in version order."""
+        applied = self.applied_versions()
+        return [(m, applied.get(m.version)) for m in self.migrations]
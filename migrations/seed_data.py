@@ -5,15 +5,18 @@ This script creates sample furniture, cars, and houses with specifications and i
 
 Usage:
     python migrations/seed_data.py
+    python migrations/seed_data.py large 1000000
 """
 
 import sys
 import os
+import random
 
 # Add parent directory to path to import application modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from application import db, application, Item
+from application import db, application, Item, CATEGORIES, refresh_category_summary
+from geocoder import geocode
 
 
 def clear_existing_items():
@@ -300,8 +303,80 @@ def seed_all():
             raise
 
 
+LARGE_CATALOG_BATCH_SIZE = 10000
+CAR_MAKES = ['Toyota', 'Honda', 'Ford', 'Tesla', 'Jeep', 'BMW', 'Subaru', 'Mazda']
+FURNITURE_MATERIALS = ['Oak', 'Pine', 'Walnut', 'Leather', 'Steel', 'Glass', 'Fabric']
+HOUSE_LOCATIONS = ['Austin, TX', 'Seattle, WA', 'Portland, OR', 'Boise, ID', 'Denver, CO', 'Aspen, CO', 'San Diego, CA']
+CONDITIONS = ['new', 'used', 'refurbished', 'certified']
+
+
+def generate_large_item(index, rng):
+    """Build one synthetic item row for benchmark catalogs."""
+    category = CATEGORIES[index % len(CATEGORIES)]
+    latitude = longitude = None
+    if category == 'cars':
+        make = rng.choice(CAR_MAKES)
+        year = rng.randint(2000, 2025)
+        price = round(rng.uniform(3000, 90000), 2)
+        specifications = {'year': year, 'make': make, 'model': f'Model {index % 50}',
+                          'mileage': rng.randint(0, 200000), 'condition': rng.choice(CONDITIONS)}
+        name = f'{year} {make} #{index}'
+    elif category == 'houses':
+        bedrooms = rng.randint(1, 6)
+        price = round(rng.uniform(90000, 2500000), 2)
+        specifications = {'bedrooms': bedrooms, 'bathrooms': rng.choice([1, 1.5, 2, 2.5, 3, 3.5]),
+                          'square_footage': rng.randint(500, 6000), 'location': rng.choice(HOUSE_LOCATIONS)}
+        name = f'{bedrooms} Bedroom Home #{index}'
+        # Core inserts skip the geocoding hook; scatter houses around their city centre
+        latitude, longitude = geocode(specifications['location'])
+        latitude += rng.uniform(-0.25, 0.25)
+        longitude += rng.uniform(-0.25, 0.25)
+    else:
+        material = rng.choice(FURNITURE_MATERIALS)
+        price = round(rng.uniform(20, 5000), 2)
+        specifications = {'material': material, 'dimensions': f'{rng.randint(10, 96)}x{rng.randint(10, 48)}x{rng.randint(10, 80)} inches',
+                          'condition': rng.choice(CONDITIONS)}
+        name = f'{material} Piece #{index}'
+    return {
+        'name': name,
+        'description': f'Synthetic {category} listing {index}',
+        'price': price,
+        'category': category,
+        'icon_url': None,
+        'specifications': specifications,
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+
+
+def seed_large_catalog(count, seed=42):
+    """Bulk insert `count` synthetic items in batches for benchmarks."""
+    with application.app_context():
+        rng = random.Random(seed)
+        start = Item.query.count()
+        print(f"Seeding {count} synthetic items in batches of {LARGE_CATALOG_BATCH_SIZE}...")
+        try:
+            for offset in range(0, count, LARGE_CATALOG_BATCH_SIZE):
+                rows = [generate_large_item(start + i, rng)
+                        for i in range(offset, min(offset + LARGE_CATALOG_BATCH_SIZE, count))]
+                # Core executemany skips the ORM flush hooks, so summaries are rebuilt once at the end
+                db.session.execute(Item.__table__.insert(), rows)
+                db.session.commit()
+                print(f"  {offset + len(rows)} / {count}")
+            with db.engine.begin() as connection:
+                for category in CATEGORIES:
+                    refresh_category_summary(connection, category)
+            print(f"Large catalog seeded! Total items: {Item.query.count()}")
+        except Exception as e:
+            print(f"Seeding failed: {e}")
+            db.session.rollback()
+            raise
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "clear":
         clear_existing_items()
+    elif len(sys.argv) > 1 and sys.argv[1] == "large":
+        seed_large_catalog(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
     else:
         seed_all()
@@ -0,0 +1,31 @@
+"""Create the user and item tables as they were first deployed."""
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+user = Table(
+    'user', metadata,
+    Column('id', String(255), primary_key=True),
+    Column('email', String(100), unique=True),
+    Column('name', String(100)),
+)
+
+item = Table(
+    'item', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100)),
+    Column('description', Text),
+    Column('price', Float),
+    Column('category', String(50)),
+)
+
+
+def upgrade(ctx):
+    ctx.create_table(user)
+    ctx.create_table(item)
+
+
+def downgrade(ctx):
+    ctx.drop_table(item)
+    ctx.drop_table(user)
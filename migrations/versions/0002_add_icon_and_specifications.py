@@ -0,0 +1,14 @@
+"""Add icon_url and specifications to item and index the category column."""
+
+
+def upgrade(ctx):
+    # Nullable columns without defaults are catalog-only changes, no table rewrite
+    ctx.add_column('item', 'icon_url', 'VARCHAR(500)')
+    ctx.add_column('item', 'specifications', 'JSONB' if ctx.is_postgresql else 'JSON')
+    ctx.create_index('idx_item_category', 'item', 'category')
+
+
+def downgrade(ctx):
+    ctx.drop_index('idx_item_category')
+    ctx.drop_column('item', 'specifications')
+    ctx.drop_column('item', 'icon_url')
@@ -0,0 +1,25 @@
+"""Store user ids as VARCHAR(255) so large Google account ids fit.
+
+Replaces the old fix_user_id.py script, which dropped and recreated the user
+table. The column type is altered in place, keeping every existing account.
+"""
+
+
+def _user_id_type(ctx):
+    rows = ctx.execute(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = 'user' AND column_name = 'id'",
+        "read user.id type",
+    )
+    return rows[0][0] if rows else None
+
+
+def upgrade(ctx):
+    # SQLite columns are dynamically typed, so only PostgreSQL needs the change
+    if ctx.is_postgresql and _user_id_type(ctx) != 'character varying':
+        ctx.execute('ALTER TABLE "user" ALTER COLUMN id TYPE VARCHAR(255) USING id::text', "alter user.id to varchar")
+
+
+def downgrade(ctx):
+    # Google ids overflow BIGINT, so converting back would lose accounts
+    pass
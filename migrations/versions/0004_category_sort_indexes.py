@@ -0,0 +1,17 @@
+"""Add category-prefixed composite indexes backing each listing sort order."""
+
+INDEXES = [
+    ('idx_item_category_id', 'category, id'),
+    ('idx_item_category_price', 'category, price, id'),
+    ('idx_item_category_name', 'category, name, id'),
+]
+
+
+def upgrade(ctx):
+    for name, columns in INDEXES:
+        ctx.create_index(name, 'item', columns)
+
+
+def downgrade(ctx):
+    for name, _ in reversed(INDEXES):
+        ctx.drop_index(name)
@@ -0,0 +1,30 @@
+"""Create the category_summary table and populate it from the item table."""
+
+from sqlalchemy import JSON, Column, DateTime, Float, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+category_summary = Table(
+    'category_summary', metadata,
+    Column('category', String(50), primary_key=True),
+    Column('item_count', Integer, nullable=False, default=0),
+    Column('min_price', Float, nullable=True),
+    Column('median_price', Float, nullable=True),
+    Column('max_price', Float, nullable=True),
+    Column('newest_items', JSON, nullable=True),
+    Column('version', Integer, nullable=False, default=0),
+    Column('refreshed_at', DateTime, nullable=True),
+)
+
+
+def upgrade(ctx):
+    from application import CATEGORIES, refresh_category_summary
+
+    ctx.create_table(category_summary)
+    # One short transaction per category, so readers are never blocked for long
+    for category in CATEGORIES:
+        ctx.run(lambda connection: refresh_category_summary(connection, category), f"summarize {category}")
+
+
+def downgrade(ctx):
+    ctx.drop_table(category_summary)
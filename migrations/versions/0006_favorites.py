@@ -0,0 +1,25 @@
+"""Create the favorite table linking users to saved items."""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+# Stand-ins so the foreign keys resolve within this migration's metadata
+Table('user', metadata, Column('id', String(255), primary_key=True))
+Table('item', metadata, Column('id', Integer, primary_key=True))
+
+favorite = Table(
+    'favorite', metadata,
+    Column('user_id', String(255), ForeignKey('user.id', ondelete='CASCADE'), primary_key=True),
+    Column('item_id', Integer, ForeignKey('item.id', ondelete='CASCADE'), primary_key=True),
+    Column('created_at', DateTime, nullable=False),
+)
+
+
+def upgrade(ctx):
+    ctx.create_table(favorite)
+    ctx.create_index('idx_favorite_user_created', 'favorite', 'user_id, created_at, item_id')
+
+
+def downgrade(ctx):
+    ctx.drop_table(favorite)
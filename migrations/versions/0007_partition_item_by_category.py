@@ -0,0 +1,191 @@
+"""List-partition the item table by category, one partition per category plus a default.
+
+The conversion runs online: a trigger logs every id written to item while the
+rows are copied into the new partitioned table in id-ordered batches, and a
+final short transaction replays the logged ids and swaps the tables.
+
+PostgreSQL requires primary keys and unique constraints on a partitioned table
+to include the partition key, and category is nullable. Each partition therefore
+gets its own primary key on id (ids stay unique through the shared item_id_seq).
+For the same reason favorite.item_id can no longer be a foreign key. Triggers
+keep the same guarantees: they reject favorites of missing items and delete
+favorites together with their item.
+
+Only PostgreSQL supports partitioning; on SQLite this migration does nothing.
+"""
+
+import time
+
+from sqlalchemy import text
+
+INDEXES = [
+    ('idx_item_category', 'category'),
+    ('idx_item_category_id', 'category, id'),
+    ('idx_item_category_price', 'category, price, id'),
+    ('idx_item_category_name', 'category, name, id'),
+]
+DEFAULT_PARTITION = 'item_default'
+
+CREATE_CHANGE_LOG = """
+CREATE TABLE IF NOT EXISTS item_partition_changes (id INTEGER NOT NULL);
+
+CREATE OR REPLACE FUNCTION log_item_partition_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO item_partition_changes VALUES (OLD.id);
+    ELSE
+        INSERT INTO item_partition_changes VALUES (NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS item_partition_changes ON item;
+CREATE TRIGGER item_partition_changes AFTER INSERT OR UPDATE OR DELETE ON item
+    FOR EACH ROW EXECUTE FUNCTION log_item_partition_change();
+"""
+
+DROP_CHANGE_LOG = """
+DROP TRIGGER IF EXISTS item_partition_changes ON item;
+DROP FUNCTION IF EXISTS log_item_partition_change();
+DROP TABLE IF EXISTS item_partition_changes;
+"""
+
+CREATE_FAVORITE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION check_favorite_item() RETURNS trigger AS $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM item WHERE id = NEW.item_id) THEN
+        RAISE EXCEPTION 'item % does not exist', NEW.item_id USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION delete_item_favorites() RETURNS trigger AS $$
+BEGIN
+    -- An UPDATE that moves a row to another partition is a delete plus an insert of the same id
+    IF NOT EXISTS (SELECT 1 FROM item WHERE id = OLD.id) THEN
+        DELETE FROM favorite WHERE item_id = OLD.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER favorite_item_exists BEFORE INSERT OR UPDATE OF item_id ON favorite
+    FOR EACH ROW EXECUTE FUNCTION check_favorite_item();
+CREATE TRIGGER item_delete_favorites AFTER DELETE ON item
+    FOR EACH ROW EXECUTE FUNCTION delete_item_favorites();
+"""
+
+DROP_FAVORITE_TRIGGERS = """
+DROP TRIGGER IF EXISTS favorite_item_exists ON favorite;
+DROP TRIGGER IF EXISTS item_delete_favorites ON item;
+DROP FUNCTION IF EXISTS check_favorite_item();
+DROP FUNCTION IF EXISTS delete_item_favorites();
+"""
+
+
+def _is_partitioned(ctx):
+    rows = ctx.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('item')", "read item table kind")
+    return bool(rows) and rows[0][0] == 'p'
+
+
+def _copy_batches(ctx, source, target, batch_size=20000, pause=0.05):
+    """Copy rows in id-ordered batches, each in its own short transaction."""
+    last_id = 0
+    copied = 0
+    while True:
+        high = ctx.execute(
+            f"SELECT max(id) FROM (SELECT id FROM {source} WHERE id > :last_id ORDER BY id LIMIT :batch_size) batch",
+            f"next batch of {source} after id {last_id}", last_id=last_id, batch_size=batch_size,
+        )[0][0]
+        if high is None:
+            return copied
+        copied += ctx.execute(
+            f"INSERT INTO {target} SELECT * FROM {source} WHERE id > :last_id AND id <= :high",
+            f"copy {source} ids {last_id + 1}..{high}", last_id=last_id, high=high,
+        )
+        last_id = high
+        time.sleep(pause)
+
+
+def upgrade(ctx):
+    from application import CATEGORIES
+
+    if not ctx.is_postgresql:
+        ctx.log("    item partitioning needs PostgreSQL, skipping")
+        return
+    if _is_partitioned(ctx):
+        return
+
+    ctx.execute("DROP TABLE IF EXISTS item_partitioned CASCADE", "drop leftover item_partitioned")
+    ctx.execute("""
+        CREATE TABLE item_partitioned (LIKE item INCLUDING DEFAULTS INCLUDING STORAGE)
+        PARTITION BY LIST (category)
+    """, "create partitioned item table")
+    for category in CATEGORIES:
+        ctx.execute(f"CREATE TABLE item_{category} PARTITION OF item_partitioned FOR VALUES IN ('{category}')",
+                    f"create partition item_{category}")
+    ctx.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF item_partitioned DEFAULT",
+                f"create partition {DEFAULT_PARTITION}")
+
+    # Log writes from here on, so rows changed while copying are replayed at the swap
+    ctx.execute(CREATE_CHANGE_LOG, "log item writes during the copy")
+    _copy_batches(ctx, 'item', 'item_partitioned')
+
+    # Nothing reads the new table yet, so its indexes are built after the copy and without CONCURRENTLY
+    for partition in [f'item_{category}' for category in CATEGORIES] + [DEFAULT_PARTITION]:
+        ctx.execute(f"ALTER TABLE {partition} ADD PRIMARY KEY (id)", f"primary key on {partition}")
+    for name, columns in INDEXES:
+        ctx.execute(f"CREATE INDEX {name}_partitioned ON item_partitioned ({columns})", f"create index {name}")
+
+    def swap(connection):
+        # EXCLUSIVE still lets listings read item while the logged changes are replayed
+        connection.execute(text("LOCK TABLE item IN EXCLUSIVE MODE"))
+        connection.execute(text(
+            "DELETE FROM item_partitioned WHERE id IN (SELECT id FROM item_partition_changes)"))
+        connection.execute(text(
+            "INSERT INTO item_partitioned SELECT * FROM item WHERE id IN (SELECT DISTINCT id FROM item_partition_changes)"))
+        connection.execute(text(DROP_CHANGE_LOG))
+        connection.execute(text("ALTER TABLE favorite DROP CONSTRAINT IF EXISTS favorite_item_id_fkey"))
+        connection.execute(text("ALTER TABLE item RENAME TO item_unpartitioned"))
+        connection.execute(text("ALTER TABLE item_partitioned RENAME TO item"))
+        # Keep item_id_seq when the old table is dropped
+        connection.execute(text("ALTER SEQUENCE item_id_seq OWNED BY item.id"))
+        connection.execute(text(CREATE_FAVORITE_TRIGGERS))
+
+    ctx.run(swap, "replay logged changes and swap in the partitioned table")
+    ctx.execute("DROP TABLE item_unpartitioned", "drop unpartitioned item table")
+    for name, _ in INDEXES:
+        ctx.execute(f"ALTER INDEX {name}_partitioned RENAME TO {name}", f"rename index {name}")
+    ctx.vacuum_analyze('item')
+
+
+def downgrade(ctx):
+    if not ctx.is_postgresql or not _is_partitioned(ctx):
+        return
+
+    ctx.execute("DROP TABLE IF EXISTS item_unpartitioned", "drop leftover item_unpartitioned")
+    ctx.execute("CREATE TABLE item_unpartitioned (LIKE item INCLUDING DEFAULTS INCLUDING STORAGE)",
+                "create unpartitioned item table")
+
+    def swap(connection):
+        connection.execute(text("LOCK TABLE item IN EXCLUSIVE MODE"))
+        connection.execute(text("INSERT INTO item_unpartitioned SELECT * FROM item"))
+        connection.execute(text("ALTER TABLE item_unpartitioned ADD CONSTRAINT item_pkey PRIMARY KEY (id)"))
+        connection.execute(text(DROP_FAVORITE_TRIGGERS))
+        connection.execute(text("ALTER TABLE item RENAME TO item_partitioned"))
+        connection.execute(text("ALTER TABLE item_unpartitioned RENAME TO item"))
+        connection.execute(text("ALTER SEQUENCE item_id_seq OWNED BY item.id"))
+
+    ctx.run(swap, "copy rows back and swap in the unpartitioned table")
+    ctx.execute("DROP TABLE item_partitioned", "drop partitioned item table")
+    for name, columns in INDEXES:
+        ctx.create_index(name, 'item', columns)
+    ctx.execute(
+        "ALTER TABLE favorite ADD CONSTRAINT favorite_item_id_fkey FOREIGN KEY (item_id) "
+        "REFERENCES item (id) ON DELETE CASCADE NOT VALID",
+        "restore favorite.item_id foreign key",
+    )
+    ctx.execute("ALTER TABLE favorite VALIDATE CONSTRAINT favorite_item_id_fkey", "validate favorite.item_id foreign key")
+    ctx.vacuum_analyze('item')
@@ -0,0 +1,53 @@
+"""Add geocoded coordinates to houses and a GiST index for radius searches.
+
+latitude and longitude are filled from specifications.location with the
+offline gazetteer (geocoder.py), one throttled backfill per distinct location.
+On PostgreSQL the cube and earthdistance extensions back a partial GiST index
+on ll_to_earth(latitude, longitude), which serves both the earth_box radius
+filter and nearest-first ordering with the <-> operator.
+"""
+
+INDEX_NAME = 'idx_item_house_location'
+EXTENSIONS = ('cube', 'earthdistance')
+
+
+def _house_locations(ctx):
+    location_sql = ("specifications->>'location'" if ctx.is_postgresql
+                    else "json_extract(specifications, '$.location')")
+    rows = ctx.execute(
+        f"SELECT DISTINCT {location_sql} FROM item WHERE category = 'houses' AND {location_sql} IS NOT NULL",
+        "read distinct house locations",
+    )
+    return location_sql, [row[0] for row in rows]
+
+
+def upgrade(ctx):
+    from geocoder import geocode
+
+    ctx.add_column('item', 'latitude', 'DOUBLE PRECISION')
+    ctx.add_column('item', 'longitude', 'DOUBLE PRECISION')
+
+    location_sql, locations = _house_locations(ctx)
+    for location in locations:
+        point = geocode(location)
+        if point is None:
+            ctx.log(f"    no gazetteer entry for {location!r}, leaving those houses without coordinates")
+            continue
+        ctx.backfill(
+            'item', "latitude = :latitude, longitude = :longitude",
+            f"category = 'houses' AND latitude IS NULL AND {location_sql} = :location",
+            latitude=point[0], longitude=point[1], location=location,
+        )
+
+    if ctx.is_postgresql:
+        for extension in EXTENSIONS:
+            ctx.execute(f"CREATE EXTENSION IF NOT EXISTS {extension}", f"create extension {extension}")
+        ctx.create_index(INDEX_NAME, 'item', 'll_to_earth(latitude, longitude)', using='gist',
+                         where="category = 'houses'")
+
+
+def downgrade(ctx):
+    if ctx.is_postgresql:
+        ctx.drop_index(INDEX_NAME)
+    ctx.drop_column('item', 'longitude')
+    ctx.drop_column('item', 'latitude')
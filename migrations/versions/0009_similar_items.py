@@ -0,0 +1,28 @@
+"""Create the similar_item table of precomputed per-item recommendations.
+
+Rows are written by migrations/compute_similar_items.py. There is no foreign
+key to item: item is partitioned since 0007, so it has no table-wide primary
+key to reference. Rows of deleted items simply stop joining.
+"""
+
+from sqlalchemy import Column, Float, Integer, MetaData, SmallInteger, String, Table
+
+metadata = MetaData()
+
+similar_item = Table(
+    'similar_item', metadata,
+    Column('item_id', Integer, primary_key=True, autoincrement=False),
+    Column('rank', SmallInteger, primary_key=True, autoincrement=False),
+    Column('similar_item_id', Integer, nullable=False),
+    Column('score', Float, nullable=False),
+    Column('category', String(50), nullable=False),
+)
+
+
+def upgrade(ctx):
+    ctx.create_table(similar_item)
+    ctx.create_index('idx_similar_item_category', 'similar_item', 'category')
+
+
+def downgrade(ctx):
+    ctx.drop_table(similar_item)
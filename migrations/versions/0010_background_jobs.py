@@ -0,0 +1,40 @@
+"""Create the job table behind the background job queue and add item.thumbnail_url.
+
+Jobs are written in the same transaction as the item writes that cause them
+and claimed by workers (jobs.py) with SELECT ... FOR UPDATE SKIP LOCKED. Workers
+only ever scan queued jobs, so the ready index is partial and stays small no
+matter how many finished jobs are kept.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, JSON, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+job = Table(
+    'job', metadata,
+    Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True),
+    Column('kind', String(100), nullable=False),
+    Column('payload', JSON, nullable=True),
+    Column('status', String(20), nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('max_attempts', Integer, nullable=False),
+    Column('dedupe_key', String(200), nullable=True),
+    Column('run_at', DateTime, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    Column('started_at', DateTime, nullable=True),
+    Column('finished_at', DateTime, nullable=True),
+    Column('locked_by', String(100), nullable=True),
+    Column('last_error', Text, nullable=True),
+)
+
+
+def upgrade(ctx):
+    ctx.create_table(job)
+    ctx.create_index('idx_job_ready', 'job', 'run_at, id', where="status = 'queued'")
+    ctx.create_index('idx_job_dedupe', 'job', 'dedupe_key', where="status = 'queued'")
+    ctx.add_column('item', 'thumbnail_url', 'VARCHAR(500)')
+
+
+def downgrade(ctx):
+    ctx.drop_column('item', 'thumbnail_url')
+    ctx.drop_table(job)
@@ -0,0 +1,22 @@
+"""Add a pg_trgm GIN index on item.name for substring typeahead suggestions.
+
+GIN over trigrams answers name ILIKE '%query%' from the index for queries of
+three or more characters, where a B-tree could only serve prefixes. On the
+partitioned item table the runner builds it concurrently per partition.
+SQLite has no trigram indexes, so it keeps scanning.
+"""
+
+INDEX_NAME = 'idx_item_name_trgm'
+
+
+def upgrade(ctx):
+    if not ctx.is_postgresql:
+        ctx.log("    trigram index needs PostgreSQL, skipping")
+        return
+    ctx.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm", "create extension pg_trgm")
+    ctx.create_index(INDEX_NAME, 'item', 'name gin_trgm_ops', using='gin')
+
+
+def downgrade(ctx):
+    if ctx.is_postgresql:
+        ctx.drop_index(INDEX_NAME)
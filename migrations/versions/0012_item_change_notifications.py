@@ -0,0 +1,42 @@
+"""NOTIFY item_changes on item inserts and updates, for the live /events streams.
+
+Each row change sends {"op", "id", "category"} on the item_changes channel
+when its transaction commits; one listener thread per web process (events.py)
+fans it out to that category's streams. Updates that change nothing are not
+announced. Triggers on the partitioned item table apply to every partition.
+Bulk loads send one notification per row, which listeners drop quickly when
+no stream is open for the category. SQLite has no NOTIFY; there the app
+announces its own commits.
+"""
+
+FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_item_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('item_changes', CAST(json_build_object(
+        'op', lower(TG_OP), 'id', NEW.id, 'category', NEW.category) AS text));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade(ctx):
+    if not ctx.is_postgresql:
+        ctx.log("    NOTIFY triggers need PostgreSQL, skipping")
+        return
+    ctx.execute(FUNCTION, "create function notify_item_change")
+    ctx.execute("DROP TRIGGER IF EXISTS item_insert_notify ON item", "drop trigger item_insert_notify")
+    ctx.execute("CREATE TRIGGER item_insert_notify AFTER INSERT ON item "
+                "FOR EACH ROW EXECUTE FUNCTION notify_item_change()", "create trigger item_insert_notify")
+    ctx.execute("DROP TRIGGER IF EXISTS item_update_notify ON item", "drop trigger item_update_notify")
+    ctx.execute("CREATE TRIGGER item_update_notify AFTER UPDATE ON item "
+                "FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION notify_item_change()",
+                "create trigger item_update_notify")
+
+
+def downgrade(ctx):
+    if not ctx.is_postgresql:
+        return
+    ctx.execute("DROP TRIGGER IF EXISTS item_update_notify ON item", "drop trigger item_update_notify")
+    ctx.execute("DROP TRIGGER IF EXISTS item_insert_notify ON item", "drop trigger item_insert_notify")
+    ctx.execute("DROP FUNCTION IF EXISTS notify_item_change()", "drop function notify_item_change")
@@ -0,0 +1,19 @@
+"""Add item.updated_at, indexed, for incremental refreshes of the price analytics snapshot.
+
+The ORM and Core inserts/updates set it (column default and onupdate on the
+model). Existing rows are backfilled in batches with the migration time, so
+the first refresh after the deploy still reads them once.
+"""
+
+from datetime import datetime
+
+
+def upgrade(ctx):
+    ctx.add_column('item', 'updated_at', 'TIMESTAMP')
+    ctx.backfill('item', 'updated_at = :now', 'updated_at IS NULL', now=datetime.utcnow())
+    ctx.create_index('idx_item_updated_at', 'item', 'updated_at')
+
+
+def downgrade(ctx):
+    ctx.drop_index('idx_item_updated_at')
+    ctx.drop_column('item', 'updated_at')
@@ -0,0 +1,36 @@
+"""Create the append-only price_history table with a BRIN index on recorded_at.
+
+The application writes a row whenever an item's price changes;
+migrations/backfill_price_history.py seeds one row per existing item. Rows
+are only ever appended, in time order, so on PostgreSQL a BRIN index keeps
+one min/max summary per 128 pages. That is a few kilobytes where a B-tree
+would hold an entry per row, yet time-range trend queries skip every block
+range outside the window. Per-item charts use a B-tree on (item_id,
+recorded_at). There is no foreign key to the partitioned item table (see
+0009).
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+price_history = Table(
+    'price_history', metadata,
+    Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True),
+    Column('item_id', Integer, nullable=False),
+    Column('category', String(50), nullable=False),
+    Column('price', Float, nullable=True),
+    Column('recorded_at', DateTime, nullable=False),
+)
+
+
+def upgrade(ctx):
+    ctx.create_table(price_history)
+    # SQLite has no BRIN and builds a B-tree instead
+    ctx.create_index('idx_price_history_recorded', 'price_history', 'recorded_at',
+                     using='brin' if ctx.is_postgresql else None)
+    ctx.create_index('idx_price_history_item', 'price_history', 'item_id, recorded_at')
+
+
+def downgrade(ctx):
+    ctx.drop_table(price_history)
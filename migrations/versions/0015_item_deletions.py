@@ -0,0 +1,29 @@
+"""Create the item_deletion table of deleted item ids for incremental price analytics refreshes.
+
+The application appends a row whenever an item is deleted through the ORM,
+in the same transaction. analytics.py drops the ids deleted since its last
+refresh instead of comparing the item count and rereading every id. Rows are
+only needed for DELETION_RETENTION (analytics.py); `python jobs.py purge`
+removes older ones. Deletes outside the ORM are picked up by the periodic
+full reload.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, Table
+
+metadata = MetaData()
+
+item_deletion = Table(
+    'item_deletion', metadata,
+    Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True),
+    Column('item_id', Integer, nullable=False),
+    Column('deleted_at', DateTime, nullable=False),
+)
+
+
+def upgrade(ctx):
+    ctx.create_table(item_deletion)
+    ctx.create_index('idx_item_deletion_deleted_at', 'item_deletion', 'deleted_at')
+
+
+def downgrade(ctx):
+    ctx.drop_table(item_deletion)
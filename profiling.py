@@ -0,0 +1,148 @@
+"""
+Opt-in per-request memory and CPU profiling.
+
+With PROFILING_ENABLED on, a request is profiled when it carries
+`X-Profile: <PROFILING_TOKEN>`, or at random with PROFILING_SAMPLE_RATE. Each
+profiled request runs under:
+
+- tracemalloc: the peak traced memory during the request, and the allocation
+  sites (file:line) of the memory still held when it ends, e.g. loaded rows
+  and the rendered page
+- cProfile: own and cumulative time per function
+
+Results are summed per endpoint and served by /api/admin/profiles. tracemalloc
+traces every thread and cProfile slows the request it runs in, so a process
+profiles one request at a time; requests selected while one runs are skipped.
+"""
+
+import cProfile
+import hmac
+import linecache
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+HEADER = 'X-Profile'
+DEFAULT_FRAMES = 10
+# Entries kept per endpoint between reports; the tail only ever holds small sites
+MAX_ENTRIES = 200
+
+_profiling = threading.Lock()
+_ignored_files = (tracemalloc.__file__, __file__, linecache.__file__)
+
+
+def selected(header_value, token, sample_rate):
+    """Whether to profile a request, from its X-Profile header or the sample rate."""
+    if header_value and token and hmac.compare_digest(header_value, token):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def _site(filename, lineno):
+    # Paths relative to the working directory keep application sites short
+    return f"{os.path.relpath(filename) if filename.startswith(os.getcwd()) else filename}:{lineno}"
+
+
+class RequestProfile:
+    """Profile of one request; start() returns None while another request is being profiled."""
+
+    def __init__(self, frames=DEFAULT_FRAMES):
+        self.frames = frames
+        self.profiler = cProfile.Profile()
+        self.traced_before = False
+        self.started = None
+
+    @classmethod
+    def start(cls, frames=DEFAULT_FRAMES):
+        if not _profiling.acquire(blocking=False):
+            return None
+        profile = cls(frames)
+        # Leave tracing on afterwards if it was already on (e.g. PYTHONTRACEMALLOC)
+        profile.traced_before = tracemalloc.is_tracing()
+        if profile.traced_before:
+            tracemalloc.clear_traces()
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start(frames)
+        profile.started = time.perf_counter()
+        profile.profiler.enable()
+        return profile
+
+    def stop(self):
+        """Stop profiling and return {'seconds', 'peak_bytes', 'allocations', 'functions'}."""
+        try:
+            self.profiler.disable()
+            seconds = time.perf_counter() - self.started
+            peak = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, filename) for filename in _ignored_files])
+            if not self.traced_before:
+                tracemalloc.stop()
+        finally:
+            _profiling.release()
+
+        allocations = Counter()
+        for statistic in snapshot.statistics('lineno'):
+            frame = statistic.traceback[0]
+            allocations[_site(frame.filename, frame.lineno)] += statistic.size
+        functions = {}
+        for (filename, lineno, name), (_, calls, own, cumulative, _) in pstats.Stats(self.profiler).stats.items():
+            functions[f"{_site(filename, lineno)}({name})"] = (calls, own, cumulative)
+        return {'seconds': seconds, 'peak_bytes': peak, 'allocations': allocations, 'functions': functions}
+
+
+class ProfileStore:
+    """Profiles summed per endpoint."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.routes = {}
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, result):
+        with self.lock:
+            route = self.routes.setdefault(endpoint, {
+                'count': 0, 'seconds': 0.0, 'peak_bytes': 0, 'max_peak_bytes': 0,
+                'allocations': Counter(), 'functions': {},
+            })
+            route['count'] += 1
+            route['seconds'] += result['seconds']
+            route['peak_bytes'] += result['peak_bytes']
+            route['max_peak_bytes'] = max(route['max_peak_bytes'], result['peak_bytes'])
+            route['allocations'].update(result['allocations'])
+            route['allocations'] = Counter(dict(route['allocations'].most_common(self.max_entries)))
+            functions = route['functions']
+            for function, (calls, own, cumulative) in result['functions'].items():
+                total = functions.get(function, (0, 0.0, 0.0))
+                functions[function] = (total[0] + calls, total[1] + own, total[2] + cumulative)
+            if len(functions) > self.max_entries:
+                kept = sorted(functions.items(), key=lambda entry: entry[1][2], reverse=True)[:self.max_entries]
+                route['functions'] = dict(kept)
+
+    def report(self, top=20):
+        """Per endpoint: averages per profiled request, top allocation sites and hottest functions."""
+        with self.lock:
+            report = {}
+            for endpoint, route in self.routes.items():
+                count = route['count']
+                hottest = sorted(route['functions'].items(), key=lambda entry: entry[1][2], reverse=True)[:top]
+                report[endpoint] = {
+                    'profiled_requests': count,
+                    'avg_seconds': route['seconds'] / count,
+                    'avg_peak_bytes': route['peak_bytes'] // count,
+                    'max_peak_bytes': route['max_peak_bytes'],
+                    'allocations': [{'site': site, 'avg_bytes': size // count}
+                                    for site, size in route['allocations'].most_common(top)],
+                    'functions': [{'function': function, 'calls': calls,
+                                   'avg_own_seconds': own / count, 'avg_cumulative_seconds': cumulative / count}
+                                  for function, (calls, own, cumulative) in hottest],
+                }
+            return report
+
+    def clear(self):
+        with self.lock:
+            self.routes.clear()
@@ -0,0 +1,132 @@
+"""
+Token-bucket rate limiting.
+
+A limit such as '120/minute' is a bucket holding up to 120 tokens that refills
+at 120 tokens per minute; each request takes one token and is rejected while
+the bucket is empty. Bursts up to the bucket size are allowed, sustained
+traffic is held to the refill rate.
+
+Buckets live in a store selected by URL:
+
+- memory://     per-process buckets, for a single node (and tests)
+- redis://...   buckets shared by every node, updated atomically by a Lua script
+                (needs the optional `redis` package, requirements-redis.txt; the
+                tests run the script on fakeredis from requirements-dev.txt)
+"""
+
+import math
+import threading
+import time
+from collections import namedtuple
+
+from cachetools import LRUCache
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+DEFAULT_MAX_BUCKETS = 100000
+
+Limit = namedtuple('Limit', ['burst', 'rate'])
+Decision = namedtuple('Decision', ['allowed', 'remaining', 'retry_after'])
+
+
+def parse_limit(text):
+    """Parse '10/minute' into Limit(burst=10, rate=10 / 60 tokens per second)."""
+    count, _, period = text.strip().partition('/')
+    period = period.strip().rstrip('s')
+    if period not in PERIODS or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f"invalid rate limit {text!r}, expected e.g. '10/minute'")
+    return Limit(burst=int(count), rate=int(count) / PERIODS[period])
+
+
+def parse_limits(text):
+    """Parse 'login=10/minute,listing=120/minute' into {'login': Limit, ...}."""
+    limits = {}
+    for rule in filter(None, (part.strip() for part in text.split(','))):
+        name, _, limit = rule.partition('=')
+        if not limit:
+            raise ValueError(f"invalid rate limit rule {rule!r}, expected name=count/period")
+        limits[name.strip()] = parse_limit(limit)
+    return limits
+
+
+class MemoryStore:
+    """Buckets of this process only, least recently used evicted beyond max_buckets.
+
+    An evicted bucket comes back full, which only ever errs towards allowing a request.
+    """
+
+    def __init__(self, max_buckets=DEFAULT_MAX_BUCKETS, clock=time.monotonic):
+        self.buckets = LRUCache(maxsize=max_buckets)
+        self.lock = threading.Lock()
+        self.clock = clock
+
+    def take(self, key, limit, cost=1):
+        with self.lock:
+            now = self.clock()
+            tokens, updated = self.buckets.get(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now)
+        retry_after = 0.0 if allowed else (cost - tokens) / limit.rate
+        return Decision(allowed, int(tokens), retry_after)
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class RedisStore:
+    """Buckets shared through Redis; each take is one atomic script call using the server clock."""
+
+    SCRIPT = """
+    local burst, rate, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    -- A bucket left alone until it is full again is the same as no bucket
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url=None, prefix='ratelimit:', client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url, socket_timeout=0.1)
+        self.client = client
+        self.script = self.client.register_script(self.SCRIPT)
+        self.prefix = prefix
+
+    def take(self, key, limit, cost=1):
+        allowed, tokens = self.script(keys=[self.prefix + key], args=[limit.burst, limit.rate, cost])
+        tokens = float(tokens)
+        retry_after = 0.0 if allowed else (cost - tokens) / limit.rate
+        return Decision(bool(allowed), int(tokens), retry_after)
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+
+def create_store(url):
+    """Return the bucket store for a RATE_LIMIT_STORAGE_URL."""
+    if url.startswith('memory://'):
+        return MemoryStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url)
+    raise ValueError(f"unsupported rate limit storage {url!r}")
+
+
+def retry_after_header(seconds):
+    """Whole seconds for a Retry-After header, at least 1."""
+    return str(max(1, math.ceil(seconds)))
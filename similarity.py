@@ -0,0 +1,136 @@
+"""
+Vectorized "similar items" computation.
+
+Each item of a category becomes a feature vector: log price plus that
+category's specification fields (numeric fields z-scored, categorical fields
+one-hot encoded), L2-normalized so a dot product is the cosine similarity.
+
+Comparing every pair is quadratic, so neighbours are searched with sorted
+neighbourhood windows: items are sorted by the category's blocking field and
+price, and each chunk of items is scored against a fixed-size window of rows
+around it with one matrix product. Work and memory grow linearly with the
+number of items (chunk_size x window floats per step).
+"""
+
+import math
+import re
+
+import numpy as np
+
+# Per category: (specification field, kind). 'log' and 'linear' fields are numeric,
+# 'category' fields are one-hot encoded, 'volume' parses "WxDxH" dimensions.
+# latitude/longitude are read from the item columns.
+FEATURES = {
+    'cars': [('make', 'category'), ('year', 'linear'), ('mileage', 'log'), ('condition', 'category')],
+    'houses': [('location', 'category'), ('bedrooms', 'linear'), ('bathrooms', 'linear'),
+               ('square_footage', 'log'), ('latitude', 'linear'), ('longitude', 'linear')],
+    'furniture': [('material', 'category'), ('dimensions', 'volume'), ('condition', 'category')],
+}
+PRICE_WEIGHT = 1.5
+DEFAULT_TOP_K = 8
+DEFAULT_WINDOW = 2048
+DEFAULT_CHUNK_SIZE = 512
+
+_DIMENSIONS = re.compile(r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)')
+
+
+def _number(value, kind):
+    if kind == 'volume':
+        match = _DIMENSIONS.search(value) if isinstance(value, str) else None
+        if not match:
+            return math.nan
+        value = float(match.group(1)) * float(match.group(2)) * float(match.group(3))
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    if kind in ('log', 'volume'):
+        return math.log1p(value) if value >= 0 else math.nan
+    return float(value)
+
+
+def _standardize(column):
+    """z-score a column, mapping missing values to the mean (0)."""
+    present = ~np.isnan(column)
+    if not present.any():
+        return np.zeros_like(column)
+    mean = column[present].mean()
+    std = column[present].std() or 1.0
+    return np.where(present, (column - mean) / std, 0.0)
+
+
+def build_features(rows, category):
+    """Turn (id, price, specifications, latitude, longitude) rows into (ids, features, sort_keys).
+
+    features is a float32 matrix with unit-length rows; sort_keys orders rows so
+    that likely neighbours (same blocking field, close price) are adjacent.
+    """
+    fields = FEATURES.get(category, [])
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    columns = [PRICE_WEIGHT * _standardize(np.array([_number(row[1], 'log') for row in rows], dtype=np.float64))]
+    block = np.zeros(len(rows), dtype=np.int64)
+
+    for position, (field, kind) in enumerate(fields):
+        if field in ('latitude', 'longitude'):
+            values = [row[3] if field == 'latitude' else row[4] for row in rows]
+        else:
+            values = [(row[2] or {}).get(field) for row in rows]
+        if kind == 'category':
+            labels, codes = np.unique(np.array([str(v) if v is not None else '' for v in values]), return_inverse=True)
+            one_hot = np.zeros((len(rows), len(labels)), dtype=np.float64)
+            one_hot[np.arange(len(rows)), codes] = 1.0
+            missing = labels == ''
+            one_hot[:, missing] = 0.0
+            columns.extend(one_hot.T)
+            if position == 0:
+                block = codes
+        else:
+            columns.append(_standardize(np.array([_number(v, kind) for v in values], dtype=np.float64)))
+
+    features = np.column_stack(columns).astype(np.float32) if rows else np.zeros((0, 1), dtype=np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    features /= np.where(norms == 0, 1, norms)
+    sort_keys = np.lexsort((columns[0], block)) if rows else np.zeros(0, dtype=np.int64)
+    return ids, features, sort_keys
+
+
+def top_k_neighbours(features, k=DEFAULT_TOP_K, window=DEFAULT_WINDOW, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return (neighbour positions, scores), each (n, k), best first; -1 pads short rows.
+
+    Rows must already be in sort-key order. Each chunk of chunk_size rows is scored
+    against the `window` rows centred on it, so memory stays at chunk_size x window.
+    """
+    n = len(features)
+    k = min(k, max(n - 1, 0))
+    neighbours = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbours, scores
+
+    window = max(window, chunk_size + k)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        low = max(0, min((start + stop - window) // 2, n - window))
+        high = min(n, low + window)
+        similarity = features[start:stop] @ features[low:high].T
+        # An item is not its own neighbour
+        rows = np.arange(stop - start)
+        similarity[rows, rows + start - low] = -np.inf
+
+        best = np.argpartition(similarity, -k, axis=1)[:, -k:]
+        best_scores = np.take_along_axis(similarity, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        neighbours[start:stop] = np.take_along_axis(best, order, axis=1) + low
+        scores[start:stop] = np.take_along_axis(best_scores, order, axis=1)
+    return neighbours, scores
+
+
+def similar_items(rows, category, k=DEFAULT_TOP_K, window=DEFAULT_WINDOW, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (item_id, rank, similar_item_id, score) for every item of one category."""
+    ids, features, sort_keys = build_features(rows, category)
+    ids, features = ids[sort_keys], features[sort_keys]
+    neighbours, scores = top_k_neighbours(features, k, window, chunk_size)
+    for position in range(len(ids)):
+        item_id = int(ids[position])
+        for rank in range(neighbours.shape[1]):
+            neighbour = neighbours[position, rank]
+            if neighbour >= 0:
+                yield item_id, rank + 1, int(ids[neighbour]), float(scores[position, rank])
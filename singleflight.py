@@ -0,0 +1,174 @@
+"""
+Request coalescing for hot reads: single flight, stale-while-revalidate and early refresh.
+
+When a cached answer expires, or right after a deploy, every request arriving
+before it is recomputed would run the same query. SingleFlight lets the first
+caller for a key compute it while the others wait for its result (or its
+exception).
+
+CoalescingCache puts a per-process cache in front of that:
+
+- an entry is fresh for `ttl` seconds, then served stale for up to
+  `stale_ttl` more while one background refresh replaces it
+- before expiry a request may start that refresh early, with a probability
+  that rises as expiry nears and with how long the value took to compute
+  (the XFetch rule: now - delta * beta * ln(random()) >= expiry), so hot keys
+  are usually replaced before anyone sees them stale
+- invalidate() drops entries, and loads that started before it do not store
+  their possibly outdated result
+
+Values are shared by every thread that reads them, so loaders should return
+immutable data (tuples, not ORM objects tied to one session).
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Events passed to CoalescingCache's record callback
+REQUEST_EVENTS = ('hit', 'stale', 'miss', 'coalesced')
+REFRESH_EVENTS = ('refresh_early', 'refresh_stale', 'refresh_failed')
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one computation per key; callers arriving meanwhile share its outcome."""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, function):
+        """Return (result, shared), where shared is True when another caller's computation was reused."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self, key):
+        with self.lock:
+            return key in self.calls
+
+
+def _start_thread(function):
+    threading.Thread(target=function, name='cache-refresh', daemon=True).start()
+
+
+class CoalescingCache:
+    """A TTL cache whose misses and refreshes go through SingleFlight.
+
+    `record`, if given, is called with one of REQUEST_EVENTS for every get()
+    and one of REFRESH_EVENTS for every background refresh. `spawn` runs a
+    refresh; by default in a new daemon thread, so loaders must not depend on
+    the calling thread's state (push their own app context, for instance).
+    """
+
+    def __init__(self, maxsize, ttl, stale_ttl=0, beta=1.0, record=None,
+                 clock=time.monotonic, rand=None, spawn=_start_thread):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+        self.record = record or (lambda event: None)
+        self.clock = clock
+        # In (0, 1], so its logarithm is finite
+        self.rand = rand or (lambda: 1.0 - random.random())
+        self.spawn = spawn
+        self.entries = LRUCache(maxsize=maxsize)
+        self.generation = 0
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.flight = SingleFlight()
+
+    def get(self, key, loader):
+        """The cached value for key, calling loader() (once across concurrent callers) when there is none."""
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None:
+            value, expires_at, delta = entry
+            if now < expires_at:
+                if self.beta and now - delta * self.beta * math.log(self.rand()) >= expires_at:
+                    self._revalidate(key, loader, 'refresh_early')
+                self.record('hit')
+                return value
+            if now < expires_at + self.stale_ttl:
+                self._revalidate(key, loader, 'refresh_stale')
+                self.record('stale')
+                return value
+
+        value, shared = self.flight.do(key, lambda: self._load(key, loader))
+        self.record('coalesced' if shared else 'miss')
+        return value
+
+    def _load(self, key, loader):
+        with self.lock:
+            generation = self.generation
+        started = self.clock()
+        value = loader()
+        finished = self.clock()
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = (value, finished + self.ttl, finished - started)
+        return value
+
+    def _revalidate(self, key, loader, event):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+        self.record(event)
+
+        def refresh():
+            try:
+                self.flight.do(key, lambda: self._load(key, loader))
+            except Exception:
+                self.record('refresh_failed')
+                logger.exception("Refreshing cached %r failed; serving the old value until it expires", key)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        self.spawn(refresh)
+
+    def invalidate(self, predicate=None):
+        """Drop the entries whose key matches predicate (all when None); in-flight loads will not be stored."""
+        with self.lock:
+            self.generation += 1
+            for key in [key for key in self.entries if predicate is None or predicate(key)]:
+                del self.entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
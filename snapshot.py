@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Read-only SQLite snapshots of the item catalog.
+
+`export` copies the item table, its listing indexes and an FTS5 trigram index
+on item names into one SQLite file. The file is built next to its destination
+and renamed over it, so a published snapshot is always complete. Processes
+serving from it (CATALOG_SNAPSHOT_PATH) notice the new file within
+CATALOG_SNAPSHOT_CHECK_SECONDS. Requests already reading keep the old file
+open until they finish.
+
+In snapshot serving mode listing pages, item details, radius search and
+suggestions read from the file, memory-mapped. Users, favorites, similar
+items and category summaries stay on the main database.
+
+Usage:
+    python snapshot.py export <path> [batch_size]
+    python snapshot.py info <path>
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import MetaData, create_engine, event, select, text
+from sqlalchemy.orm import Session
+
+FTS_TABLE = 'item_name_fts'
+INFO_TABLE = 'snapshot_info'
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+# Indexes beyond those declared on the Item model; the bounding-box radius search filters on these
+EXTRA_INDEXES = [
+    "CREATE INDEX idx_item_category_location ON item (category, latitude, longitude)",
+]
+
+
+def export(source, item_table, path, batch_size=DEFAULT_BATCH_SIZE, log=print):
+    """Copy item_table from the `source` engine into a snapshot at path, replacing it atomically.
+
+    Returns the number of items copied.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    building = os.path.join(directory, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    if os.path.exists(building):
+        os.remove(building)
+
+    start_time = time.perf_counter()
+    target = create_engine(f'sqlite:///{building}')
+
+    @event.listens_for(target, 'connect')
+    def bulk_load_pragmas(dbapi_connection, connection_record):
+        # The file is thrown away on any failure, so it needs no journal
+        dbapi_connection.execute('PRAGMA journal_mode = OFF')
+        dbapi_connection.execute('PRAGMA synchronous = OFF')
+
+    try:
+        table = item_table.to_metadata(MetaData())
+        table.create(target)
+        count = 0
+        with source.connect() as reader, target.begin() as writer:
+            rows = reader.execution_options(yield_per=batch_size).execute(select(item_table))
+            for batch in rows.mappings().partitions():
+                writer.execute(table.insert(), [dict(row) for row in batch])
+                count += len(batch)
+            log(f"  copied {count} items ({time.perf_counter() - start_time:.1f}s)")
+
+            for statement in EXTRA_INDEXES:
+                writer.execute(text(statement))
+            # External-content FTS5 table: the trigram index only, names stay in item
+            writer.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, content='item', content_rowid='id', "
+                "tokenize='trigram')"))
+            writer.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            writer.execute(text(f"CREATE TABLE {INFO_TABLE} (key TEXT PRIMARY KEY, value TEXT)"))
+            writer.execute(text(f"INSERT INTO {INFO_TABLE} VALUES (:key, :value)"), [
+                {'key': 'created_at', 'value': datetime.utcnow().isoformat()},
+                {'key': 'item_count', 'value': str(count)},
+            ])
+            writer.execute(text("ANALYZE"))
+        with target.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+        target.dispose()
+
+        with open(building, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(building, path)
+        log(f"  published {path} ({os.path.getsize(path) / 1e6:.1f}MB, "
+            f"{time.perf_counter() - start_time:.1f}s)")
+        return count
+    except BaseException:
+        target.dispose()
+        if os.path.exists(building):
+            os.remove(building)
+        raise
+
+
+def info(path):
+    """The snapshot's info table as a dict."""
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        return dict(connection.execute(f"SELECT key, value FROM {INFO_TABLE}").fetchall())
+    finally:
+        connection.close()
+
+
+def fts_phrase(query):
+    """An FTS5 phrase matching names that contain query anywhere (trigram tokenizer)."""
+    return '"' + query.replace('"', '""') + '"'
+
+
+class SnapshotReader:
+    """Read-only sessions on the current snapshot file, reopened when a new one is published."""
+
+    def __init__(self, path, mmap_size=DEFAULT_MMAP_SIZE, check_interval=5.0, clock=time.monotonic):
+        self.path = path
+        self.mmap_size = mmap_size
+        self.check_interval = check_interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.engine = None
+        self.signature = None
+        self.checked = None
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _open(self):
+        engine = create_engine(f'sqlite:///file:{self.path}?mode=ro&uri=true',
+                               connect_args={'check_same_thread': False})
+        mmap_size = int(self.mmap_size)
+
+        @event.listens_for(engine, 'connect')
+        def read_only_pragmas(dbapi_connection, connection_record):
+            dbapi_connection.execute(f'PRAGMA mmap_size = {mmap_size}')
+            dbapi_connection.execute('PRAGMA query_only = 1')
+
+        return engine
+
+    def current_engine(self):
+        """The engine for the newest published file; checks for a new one at most every check_interval."""
+        with self.lock:
+            now = self.clock()
+            if self.engine is not None and now - self.checked < self.check_interval:
+                return self.engine
+            self.checked = now
+            signature = self._signature()
+            if signature != self.signature:
+                previous, self.engine, self.signature = self.engine, self._open(), signature
+                if previous is not None:
+                    # Connections still checked out keep reading the old file until returned
+                    previous.dispose()
+            return self.engine
+
+    def session(self):
+        return Session(bind=self.current_engine(), autoflush=False)
+
+    def dispose(self):
+        with self.lock:
+            if self.engine is not None:
+                self.engine.dispose()
+            self.engine = self.signature = None
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'export' and len(sys.argv) > 2:
+        from application import application, db, Item
+
+        batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_BATCH_SIZE
+        with application.app_context():
+            export(db.engine, Item.__table__, sys.argv[2], batch_size)
+    elif command == 'info' and len(sys.argv) > 2:
+        for key, value in info(sys.argv[2]).items():
+            print(f"{key}: {value}")
+    else:
+        print(__doc__)
+        sys.exit(1)
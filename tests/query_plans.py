@@ -0,0 +1,112 @@
+"""
+Capture the SQL a request runs and read each statement's plan.
+
+QueryCapture records the statements, with their parameters, executed on an
+engine or connection while it is active. explain() asks the database's own
+planner about one SELECT and returns the table accesses in its plan:
+
+- PostgreSQL: EXPLAIN (ANALYZE, FORMAT JSON) with enable_seqscan off, so that
+  on a small test catalog the planner still takes any usable index and a
+  remaining Seq Scan means there is none. Scanned rows are what each scan
+  node read: actual rows plus rows its filters removed, over all loops.
+- SQLite: EXPLAIN QUERY PLAN. "SEARCH" reads a range of an index; "SCAN"
+  walks the whole table, or a whole index when one is named. SQLite reports
+  no row counts, so a full scan counts every row of the table and searches
+  are left unknown (None).
+
+Only SELECTs are explained; ANALYZE runs the statement, which must not write.
+"""
+
+import re
+from collections import Counter, namedtuple
+
+from sqlalchemy import event, func, select, table
+
+# One table access in a plan: `full` when it reads the whole table (or a whole index);
+# rows is None when the database does not say
+Scan = namedtuple('Scan', 'table index full rows')
+
+# Transaction control the tests' savepoints add around every commit
+_CONTROL = re.compile(r'^\s*(SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE)
+_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?\s+AS\s+"?(\w+)"?', re.IGNORECASE)
+_SQLITE_ACCESS = re.compile(
+    r'^(?P<kind>SCAN|SEARCH) (?:TABLE )?(?P<name>\w+)'
+    r'(?: USING (?:(?P<rowid>INTEGER PRIMARY KEY)|(?:COVERING )?INDEX (?P<index>\w+)))?'
+)
+
+
+class QueryCapture:
+    """Context manager recording (statement, parameters) for every query run on `bind` while active."""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.queries = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not _CONTROL.match(statement):
+            self.queries.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.bind, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.bind, 'before_cursor_execute', self._record)
+
+    @property
+    def selects(self):
+        return [(statement, parameters) for statement, parameters in self.queries
+                if statement.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+    def repeated(self):
+        """Statements run more than once, with their counts: the shape of an N+1 loop."""
+        return {statement: count for statement, count in Counter(s for s, _ in self.queries).items() if count > 1}
+
+
+def explain(connection, statement, parameters):
+    """The table accesses in the plan of one SELECT, as a list of Scan."""
+    if connection.dialect.name == 'postgresql':
+        return _explain_postgresql(connection, statement, parameters)
+    return _explain_sqlite(connection, statement, parameters)
+
+
+def _explain_postgresql(connection, statement, parameters):
+    connection.exec_driver_sql('SET enable_seqscan = off')
+    try:
+        document = connection.exec_driver_sql(
+            f'EXPLAIN (ANALYZE, FORMAT JSON) {statement}', parameters).scalar()
+    finally:
+        connection.exec_driver_sql('RESET enable_seqscan')
+    scans = []
+    _walk_postgresql(document[0]['Plan'], scans)
+    return scans
+
+
+def _walk_postgresql(node, scans, index=None):
+    node_type = node['Node Type']
+    # A bitmap heap scan reads the table through the bitmap index scan below it
+    if node_type == 'Bitmap Heap Scan':
+        index = ','.join(child['Index Name'] for child in node.get('Plans', ()) if 'Index Name' in child) or None
+    if 'Relation Name' in node:
+        loops = node.get('Actual Loops', 1)
+        rows = (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)
+                + node.get('Rows Removed by Index Recheck', 0)) * loops
+        scans.append(Scan(node['Relation Name'], node.get('Index Name', index), node_type == 'Seq Scan', rows))
+    for child in node.get('Plans', ()):
+        _walk_postgresql(child, scans)
+
+
+def _explain_sqlite(connection, statement, parameters):
+    tables = set(connection.dialect.get_table_names(connection))
+    aliases = {alias: name for name, alias in _ALIAS.findall(statement)}
+    scans = []
+    for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters):
+        match = _SQLITE_ACCESS.match(row[-1])
+        name = match and aliases.get(match['name'], match['name'])
+        if name not in tables:
+            continue  # Subqueries, constant rows, temporary b-trees
+        index = 'PRIMARY KEY' if match['rowid'] else match['index']
+        full = match['kind'] == 'SCAN'
+        rows = connection.execute(select(func.count()).select_from(table(name))).scalar() if full else None
+        scans.append(Scan(name, index, full, rows))
+    return scans
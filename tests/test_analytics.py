@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import analytics
+from sqlalchemy import event
+
+from application import application, db, Item, ItemDeletion, User, price_analytics, rate_limit_store
+from analytics import PriceSnapshot
+
+LOADED_AT = datetime(2025, 1, 1)
+
+
+class TestPriceAnalytics(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        self.client = application.test_client()
+        rate_limit_store.clear()
+        self.directory = tempfile.mkdtemp(prefix='analytics-test-')
+        with application.app_context():
+            db.session.add(User(id='analytics-user', email='analytics@example.com', name='Analytics User'))
+            for i, (year, price) in enumerate([(2019, 10000), (2019, 14000), (2020, 20000), (2020, 22000), (2021, 30000)]):
+                db.session.add(Item(category='cars', name=f'Car {i}', price=price,
+                                    updated_at=LOADED_AT - timedelta(days=i),
+                                    specifications={'year': year, 'make': 'Toyota' if i % 2 else 'Honda'}))
+            db.session.add(Item(category='houses', name='House', price=250000,
+                                updated_at=LOADED_AT - timedelta(days=10),
+                                specifications={'bedrooms': 3}))
+            db.session.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        price_analytics.table = None
+
+    def refresh(self, snapshot):
+        with application.app_context():
+            return snapshot.refresh(db.session.connection(), Item.__table__, ItemDeletion.__table__)
+
+    def test_stats_and_facet_breakdown(self):
+        snapshot = PriceSnapshot()
+        self.assertEqual(self.refresh(snapshot), ('full', 6))
+        stats = snapshot.price_stats('cars', 'year', bins=4)
+        self.assertEqual((stats['count'], stats['min'], stats['max'], stats['mean']), (5, 10000, 30000, 19200))
+        self.assertEqual(stats['percentiles']['p50'], 20000)
+        self.assertEqual(stats['histogram']['edges'], [10000, 15000, 20000, 25000, 30000])
+        self.assertEqual(stats['histogram']['counts'], [2, 0, 2, 1])
+        self.assertEqual([(group['value'], group['count'], group['mean']) for group in stats['facets']],
+                         [('2019', 2, 12000), ('2020', 2, 21000), ('2021', 1, 30000)])
+        self.assertEqual(stats['facets'][2]['p50'], 30000)
+        # Answers are computed once per refresh
+        self.assertIs(snapshot.price_stats('cars', 'year', bins=4), stats)
+
+    def test_incremental_refresh_applies_inserts_updates_and_deletes(self):
+        with application.app_context():
+            # Enough unchanged rows that two changes stay under FULL_REFRESH_FRACTION
+            db.session.add_all([Item(category='furniture', name=f'Chair {i}', price=i,
+                                     updated_at=LOADED_AT - timedelta(days=20 + i)) for i in range(10)])
+            db.session.commit()
+        snapshot = PriceSnapshot(parquet_path=os.path.join(self.directory, 'items.parquet'))
+        self.refresh(snapshot)
+        with application.app_context():
+            cheapest = Item.query.filter_by(price=10000).one()
+            cheapest.price = 12000
+            db.session.delete(Item.query.filter_by(price=30000).one())
+            db.session.add(Item(category='cars', name='New Car', price=40000, specifications={'year': 2024}))
+            db.session.commit()
+
+        # Only the updated car and the new one; every other row is older than the overlap window
+        self.assertEqual(self.refresh(snapshot), ('incremental', 2))
+        stats = snapshot.price_stats('cars')
+        self.assertEqual((stats['count'], stats['min'], stats['max']), (5, 12000, 40000))
+        self.assertNotIn('facets', stats)
+
+        # A new process starts from the Parquet copy
+        restarted = PriceSnapshot(parquet_path=snapshot.parquet_path)
+        self.assertTrue(restarted.load_parquet())
+        self.assertEqual(restarted.price_stats('cars')['max'], 40000)
+        self.assertEqual(restarted.watermark, snapshot.watermark)
+
+    def test_deletes_applied_from_tombstones_without_reading_every_id(self):
+        with application.app_context():
+            db.session.add_all([Item(category='furniture', name=f'Chair {i}', price=i,
+                                     updated_at=LOADED_AT - timedelta(days=20 + i)) for i in range(10)])
+            db.session.commit()
+        snapshot = PriceSnapshot()
+        self.refresh(snapshot)
+        with application.app_context():
+            db.session.delete(Item.query.filter_by(price=30000).one())
+            # Written with an old updated_at, so only a full reload sees it; the row count is unchanged
+            db.session.add(Item(category='cars', name='Backdated Car', price=50000,
+                                updated_at=LOADED_AT - timedelta(days=30)))
+            db.session.commit()
+            self.assertEqual(Item.query.count(), snapshot.table.num_rows)
+
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                # Only the newest row, which is inside the overlap window
+                self.assertEqual(self.refresh(snapshot), ('incremental', 1))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        # Neither a count nor a read of every id
+        selects = [s for s in statements if s.startswith('SELECT')]
+        self.assertEqual([s for s in selects if 'count(' in s.lower() or 'WHERE' not in s], [])
+        stats = snapshot.price_stats('cars')
+        self.assertEqual((stats['count'], stats['max']), (4, 22000))
+
+    def test_parquet_copy_older_than_deletion_retention_not_loaded(self):
+        snapshot = PriceSnapshot(parquet_path=os.path.join(self.directory, 'items.parquet'))
+        self.refresh(snapshot)
+        # Every row was last updated in 2025, long before the retained deletions start
+        self.assertFalse(PriceSnapshot(parquet_path=snapshot.parquet_path).load_parquet())
+
+    def test_full_refresh_when_many_rows_changed(self):
+        snapshot = PriceSnapshot()
+        self.refresh(snapshot)
+        with application.app_context():
+            Item.query.filter_by(category='cars').update({'price': Item.price + 1, 'updated_at': datetime.utcnow()})
+            db.session.commit()
+        self.assertEqual(self.refresh(snapshot), ('full', 6))
+
+    def test_endpoint(self):
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['_user_id'] = 'analytics-user'
+            data = c.get('/api/analytics/prices/houses?facet=bedrooms').get_json()
+            self.assertEqual((data['count'], data['facets'][0]['value']), (1, '3'))
+            self.assertEqual(c.get('/api/analytics/prices/cars?facet=bedrooms').status_code, 400)
+            self.assertEqual(c.get('/api/analytics/prices/boats').status_code, 404)
+            self.assertEqual(len(c.get('/api/analytics/prices/cars?bins=1000').get_json()['histogram']['counts']),
+                             analytics.MAX_BINS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,29 +1,30 @@
+import html
+import re
 import unittest
+import weakref
 from unittest.mock import patch, MagicMock
-from application import application, db, Item, User
+from application import application, db, Item, Job, User, CategorySummary, Favorite, SimilarItem, SORT_OPTIONS, paginate_items, refresh_category_summary, paginate_favorites, warm_templates, item_cache, rate_limit_store, suggest_cache, listing_cache
 from flask import session
+from datetime import datetime
+from sqlalchemy import event
+from jinja2 import FileSystemBytecodeCache
 
 class TestApplication(unittest.TestCase):
     def setUp(self):
         application.config['TESTING'] = True
-        application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         application.config['SECRET_KEY'] = 'test_secret_key'
         self.client = application.test_client()
-        with application.app_context():
-            db.create_all()
-
-    def tearDown(self):
-        with application.app_context():
-            db.session.remove()
-            db.drop_all()
+        item_cache.clear()
+        rate_limit_store.clear()
+        suggest_cache.clear()
+        listing_cache.clear()
 
     def test_logout(self):
         with self.client as c:
-            with c.session_transaction() as sess:
-                sess['user'] = 'testuser'
+            self.login(c)
             response = c.get('/logout')
             self.assertEqual(response.status_code, 302)  # Check redirect
-            self.assertNotIn('user', session)  # Check session cleared
+            self.assertNotIn('_user_id', session)  # Check session cleared
 
     def test_cars_route_requires_login(self):
         response = self.client.get('/cars')
@@ -31,8 +32,7 @@ class TestApplication(unittest.TestCase):
 
     def test_cars_route_with_login(self):
         with self.client as c:
-            with c.session_transaction() as sess:
-                sess['user'] = 'testuser'
+            self.login(c)
             response = c.get('/cars')
             self.assertEqual(response.status_code, 200)
 
@@ -42,8 +42,7 @@ class TestApplication(unittest.TestCase):
 
     def test_houses_route_with_login(self):
         with self.client as c:
-            with c.session_transaction() as sess:
-                sess['user'] = 'testuser'
+            self.login(c)
             response = c.get('/houses')
             self.assertEqual(response.status_code, 200)
 
@@ -55,8 +54,7 @@ class TestApplication(unittest.TestCase):
             db.session.commit()
 
             with self.client as c:
-                with c.session_transaction() as sess:
-                    sess['user'] = 'testuser'
+                self.login(c)
                 response = c.get('/cars')
                 self.assertIn(b'Test Car', response.data)
 
@@ -68,8 +66,7 @@ class TestApplication(unittest.TestCase):
             db.session.commit()
 
             with self.client as c:
-                with c.session_transaction() as sess:
-                    sess['user'] = 'testuser'
+                self.login(c)
                 response = c.get('/houses')
                 self.assertIn(b'Test House', response.data)
 
@@ -197,7 +194,7 @@ class TestApplication(unittest.TestCase):
                 user = User.query.filter_by(email='newuser@example.com').first()
                 self.assertIsNotNone(user)
                 self.assertEqual(user.name, 'New User')
-                self.assertEqual(user.id, 123456789)
+                self.assertEqual(user.id, '123456789')
 
     @patch('application.oauth.google.authorize_access_token')
     @patch('application.google.get')
@@ -274,15 +271,17 @@ class TestApplication(unittest.TestCase):
             db.session.commit()
 
             with self.client as c:
-                with c.session_transaction() as sess:
-                    sess['user'] = 'testuser'
+                self.login(c)
                 response = c.get('/furniture')
                 
-                # Verify item name and price are rendered
+                # Verify item name and price are rendered on the summary card
                 self.assertIn(b'Modern Chair', response.data)
                 self.assertIn(b'299.99', response.data)
+                self.assertNotIn(b'Mesh', response.data)
                 
-                # Verify specifications are rendered
+                # Verify description and specifications are rendered on the detail page
+                response = c.get(f'/item/{furniture.id}')
+                self.assertIn(b'Comfortable office chair', response.data)
                 self.assertIn(b'Mesh', response.data)
                 self.assertIn(b'24x24x40 inches', response.data)
 
@@ -300,8 +299,7 @@ class TestApplication(unittest.TestCase):
             db.session.commit()
 
             with self.client as c:
-                with c.session_transaction() as sess:
-                    sess['user'] = 'testuser'
+                self.login(c)
                 response = c.get('/cars')
                 
                 # Verify item is rendered
@@ -322,8 +320,7 @@ class TestApplication(unittest.TestCase):
             db.session.commit()
 
             with self.client as c:
-                with c.session_transaction() as sess:
-                    sess['user'] = 'testuser'
+                self.login(c)
                 response = c.get('/houses')
                 
                 # Verify prices are formatted with 2 decimal places
@@ -359,24 +356,23 @@ class TestApplication(unittest.TestCase):
             db.session.commit()
 
             with self.client as c:
-                with c.session_transaction() as sess:
-                    sess['user'] = 'testuser'
+                self.login(c)
                 
-                # Test furniture page
-                furniture_response = c.get('/furniture')
+                # Test furniture detail page
+                furniture_response = c.get(f'/item/{furniture.id}')
                 self.assertIn(b'Walnut', furniture_response.data)
                 self.assertIn(b'60x36x30 inches', furniture_response.data)
                 
-                # Test cars page
-                cars_response = c.get('/cars')
+                # Test car detail page
+                cars_response = c.get(f'/item/{car.id}')
                 self.assertIn(b'Tesla', cars_response.data)
                 self.assertIn(b'2023', cars_response.data)
-                self.assertIn(b'5000', cars_response.data)
+                self.assertIn(b'5,000', cars_response.data)
                 
-                # Test houses page
-                houses_response = c.get('/houses')
+                # Test house detail page
+                houses_response = c.get(f'/item/{house.id}')
                 self.assertIn(b'2', houses_response.data)  # bedrooms
-                self.assertIn(b'1200', houses_response.data)  # square footage
+                self.assertIn(b'1,200', houses_response.data)  # square footage
                 self.assertIn(b'Seattle, WA', houses_response.data)
 
     # Task 10: Database index performance tests
@@ -454,5 +450,448 @@ class TestApplication(unittest.TestCase):
                 # This is a basic performance check
                 self.assertLess(query_time, 100, f"Query for {category} took {query_time:.2f}ms")
 
+    # Materialized category summaries
+    def login(self, c, user_id='summary-user'):
+        """Log a real user in through Flask-Login's session key"""
+        with application.app_context():
+            if not db.session.get(User, user_id):
+                db.session.add(User(id=user_id, email=f'{user_id}@example.com', name='Summary User'))
+                db.session.commit()
+        with c.session_transaction() as sess:
+            sess['_user_id'] = user_id
+
+    def test_category_summary_maintained_on_item_writes(self):
+        """Test that inserts, updates and deletes keep the summary row current"""
+        with application.app_context():
+            db.session.add_all([
+                Item(category='cars', name='Car A', price=10000),
+                Item(category='cars', name='Car B', price=30000),
+                Item(category='cars', name='Car C', price=20000),
+            ])
+            db.session.commit()
+
+            summary = db.session.get(CategorySummary, 'cars')
+            self.assertEqual(summary.item_count, 3)
+            self.assertEqual(summary.min_price, 10000)
+            self.assertEqual(summary.median_price, 20000)
+            self.assertEqual(summary.max_price, 30000)
+            self.assertEqual([i['name'] for i in summary.newest_items], ['Car C', 'Car B', 'Car A'])
+
+            car = Item.query.filter_by(name='Car B').first()
+            car.category = 'houses'
+            db.session.commit()
+
+            cars = db.session.get(CategorySummary, 'cars')
+            self.assertEqual(cars.item_count, 2)
+            self.assertEqual(cars.max_price, 20000)
+            self.assertEqual([i['name'] for i in cars.newest_items], ['Car C', 'Car A'])
+            self.assertEqual(db.session.get(CategorySummary, 'houses').item_count, 1)
+
+            # The median is left to the deduplicated refresh job
+            self.assertEqual(cars.median_price, 20000)
+            self.assertEqual(Job.query.filter_by(kind='refresh_summary', dedupe_key='refresh_summary:cars').count(), 1)
+
+            db.session.delete(Item.query.filter_by(name='Car A').first())
+            db.session.commit()
+            cars = db.session.get(CategorySummary, 'cars')
+            self.assertEqual(cars.item_count, 1)
+            self.assertEqual(cars.min_price, 20000)
+
+    def test_category_summary_write_does_not_aggregate_the_category(self):
+        """Test that an item write adjusts the summary in place instead of recomputing it"""
+        with application.app_context():
+            db.session.add_all([Item(category='furniture', name=f'Chair {i}', price=100 + i) for i in range(5)])
+            db.session.commit()
+            statements = []
+
+            def record(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                db.session.add(Item(category='furniture', name='Sofa', price=50))
+                db.session.commit()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+            # No read of the item table at all: the new price extends the bounds and newest items
+            self.assertEqual([s for s in statements if 'FROM item' in s], [])
+
+            summary = db.session.get(CategorySummary, 'furniture')
+            self.assertEqual((summary.item_count, summary.min_price, summary.max_price), (6, 50, 104))
+            self.assertEqual([i['name'] for i in summary.newest_items], ['Sofa', 'Chair 4', 'Chair 3'])
+
+    def test_home_page_and_api_show_category_summaries(self):
+        """Test that the home page and API serve the materialized summaries"""
+        with application.app_context():
+            db.session.add_all([
+                Item(category='furniture', name='Lamp', price=40),
+                Item(category='furniture', name='Armchair', price=460),
+            ])
+            db.session.commit()
+
+        with self.client as c:
+            self.login(c)
+            response = c.get('/')
+            self.assertIn(b'2</span> listings', response.data)
+            self.assertIn(b'$40.00', response.data)
+            self.assertIn(b'$460.00', response.data)
+
+            response = c.get('/api/categories')
+            self.assertEqual(response.status_code, 200)
+            furniture = next(s for s in response.get_json() if s['category'] == 'furniture')
+            self.assertEqual(furniture['item_count'], 2)
+            self.assertEqual(furniture['median_price'], 250)
+
+    def test_first_item_in_summarized_empty_category_renders(self):
+        """Test that a summary built while its category was empty gets a median from its first item"""
+        with application.app_context():
+            refresh_category_summary(db.session.connection(), 'cars')
+            db.session.commit()
+            self.assertIsNone(db.session.get(CategorySummary, 'cars').median_price)
+
+            db.session.add(Item(category='cars', name='First Car', price=100))
+            db.session.commit()
+            summary = db.session.get(CategorySummary, 'cars')
+            self.assertEqual((summary.item_count, summary.median_price), (1, 100))
+
+        with self.client as c:
+            self.login(c)
+            response = c.get('/')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'Median $100.00', response.data)
+
+    # Sorted listings with keyset pagination
+    def test_sorted_keyset_pagination_covers_every_item_once(self):
+        """Test that each sort order pages through a category without gaps or repeats"""
+        with application.app_context():
+            items = [Item(category='cars', name=f'Car {i:02d}', price=(i * 7) % 13 * 1000) for i in range(25)]
+            items.append(Item(category='cars', name='Unpriced Car', price=None))
+            items.append(Item(category='houses', name='Other Category', price=1))
+            db.session.add_all(items)
+            db.session.commit()
+
+            for sort, (column, descending) in SORT_OPTIONS.items():
+                seen, cursor = [], None
+                while True:
+                    page, cursor = paginate_items('cars', sort, cursor, limit=4)
+                    seen.extend(page)
+                    if cursor is None:
+                        break
+                self.assertEqual(len(seen), 26, sort)
+                self.assertEqual(len({item.id for item in seen}), 26, sort)
+                if column.key == 'price':
+                    self.assertEqual(seen[-1].name, 'Unpriced Car', sort)
+                keys = [(getattr(item, column.key), item.id) for item in seen if getattr(item, column.key) is not None]
+                self.assertEqual(keys, sorted(keys, reverse=descending), sort)
+
+    def test_category_view_and_api_sort_parameters(self):
+        """Test the sort and cursor parameters on category views and the API"""
+        with application.app_context():
+            db.session.add_all([
+                Item(category='furniture', name='Bench', price=300),
+                Item(category='furniture', name='Armchair', price=900),
+                Item(category='furniture', name='Cabinet', price=100),
+            ])
+            db.session.commit()
+
+        with self.client as c:
+            self.login(c)
+            response = c.get('/api/items/furniture?sort=price_asc&limit=2')
+            data = response.get_json()
+            self.assertEqual([i['name'] for i in data['items']], ['Cabinet', 'Bench'])
+            self.assertIsNotNone(data['next_cursor'])
+
+            response = c.get(f"/api/items/furniture?sort=price_asc&limit=2&cursor={data['next_cursor']}")
+            data = response.get_json()
+            self.assertEqual([i['name'] for i in data['items']], ['Armchair'])
+            self.assertIsNone(data['next_cursor'])
+
+            response = c.get('/furniture?sort=name')
+            text = response.data.decode('utf-8')
+            self.assertLess(text.index('Armchair'), text.index('Bench'))
+            self.assertLess(text.index('Bench'), text.index('Cabinet'))
+
+            self.assertEqual(c.get('/api/items/furniture?cursor=not-a-cursor').status_code, 400)
+            self.assertEqual(c.get('/api/items/boats').status_code, 404)
+
+    # Favorites
+    def count_queries(self, c, url):
+        """Return the response and number of SQL statements run for one request"""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with application.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = c.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        return response, len(statements)
+
+    def test_favorite_toggle_and_listing_marks(self):
+        """Test saving and removing a favorite and the marked card on the listing"""
+        with application.app_context():
+            db.session.add_all([Item(category='cars', name='Saved Car', price=1), Item(category='cars', name='Other Car', price=2)])
+            db.session.commit()
+            saved_id = Item.query.filter_by(name='Saved Car').first().id
+
+        with self.client as c:
+            self.login(c)
+            response = c.post(f'/favorites/{saved_id}', data={'action': 'add', 'next': '/cars'})
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(response.location.endswith('/cars'))
+
+            text = c.get('/cars').data.decode('utf-8')
+            self.assertEqual(text.count('Remove from favorites'), 1)
+            self.assertEqual(text.count('Save to favorites'), 1)
+
+            favorites_page = c.get('/favorites').data.decode('utf-8')
+            self.assertIn('Saved Car', favorites_page)
+            self.assertNotIn('Other Car', favorites_page)
+
+            c.post(f'/favorites/{saved_id}', data={'action': 'remove', 'next': '//evil.example'})
+            with application.app_context():
+                self.assertEqual(Favorite.query.count(), 0)
+            self.assertEqual(c.post('/favorites/999999').status_code, 404)
+
+    def test_listing_query_count_is_constant_per_page(self):
+        """Test that favorites are looked up once per page, not once per card"""
+        with self.client as c:
+            self.login(c)
+            listing_counts, favorites_counts = [], []
+            for total in (2, 20):
+                with application.app_context():
+                    Favorite.query.delete()
+                    Item.query.delete()
+                    items = [Item(category='houses', name=f'House {i}', price=i) for i in range(total)]
+                    db.session.add_all(items)
+                    db.session.commit()
+                    db.session.add_all([Favorite(user_id='summary-user', item_id=item.id) for item in items[::2]])
+                    db.session.commit()
+                response, statements = self.count_queries(c, '/houses')
+                self.assertEqual(response.data.decode('utf-8').count('Remove from favorites'), total // 2)
+                listing_counts.append(statements)
+                response, statements = self.count_queries(c, '/favorites')
+                self.assertEqual(response.data.decode('utf-8').count('Remove from favorites'), total // 2)
+                favorites_counts.append(statements)
+            self.assertEqual(listing_counts[0], listing_counts[1])
+            self.assertEqual(favorites_counts[0], favorites_counts[1])
+
+    def test_favorites_page_pagination(self):
+        """Test keyset pagination of the favorites page"""
+        with application.app_context():
+            items = [Item(category='furniture', name=f'Chair {i}', price=i) for i in range(5)]
+            db.session.add_all(items)
+            db.session.commit()
+            db.session.add(User(id='fav-user', email='fav@example.com', name='Fav'))
+            for i, item in enumerate(items):
+                db.session.add(Favorite(user_id='fav-user', item_id=item.id, created_at=datetime(2025, 1, 1, 0, i)))
+            db.session.commit()
+
+            seen, cursor = [], None
+            while True:
+                page, cursor = paginate_favorites('fav-user', cursor, limit=2)
+                seen.extend(item.name for item in page)
+                if cursor is None:
+                    break
+            self.assertEqual(seen, [f'Chair {i}' for i in reversed(range(5))])
+
+    def test_infinite_scroll_card_fragments(self):
+        """Test that listing pages link to card fragments that continue the same keyset pages"""
+        with application.app_context():
+            db.session.add_all([Item(category='cars', name=f'Scroll Car {i:02d}', price=i) for i in range(30)])
+            db.session.commit()
+
+        with self.client as c:
+            self.login(c)
+            page = c.get('/cars?sort=price_asc').data.decode('utf-8')
+            self.assertIn('data-card-grid', page)
+            self.assertIn('IntersectionObserver', page)
+            fragment_url = html.unescape(re.search(r'data-load-more="([^"]+)"', page).group(1))
+            self.assertTrue(fragment_url.startswith('/cars/cards?'))
+
+            fragment = c.get(fragment_url).data.decode('utf-8')
+            self.assertNotIn('<html', fragment)
+            self.assertEqual(sorted(set(re.findall(r'Scroll Car (\d+)', fragment))), [f'{i:02d}' for i in range(24, 30)])
+            # The last batch has no further marker, and favorite toggles return to the full page
+            self.assertNotIn('data-load-more', fragment)
+            self.assertIn('name="next" value="/cars?', fragment)
+
+            self.assertEqual(c.get('/boats/cards').status_code, 404)
+            self.assertEqual(c.get('/cars/cards?cursor=garbage').status_code, 400)
+
+    def test_houses_geocoded_and_radius_search_sorted_by_distance(self):
+        """Test write-time geocoding and the nearest-first radius search on /houses and the API"""
+        with application.app_context():
+            for name, location in [('Tacoma Home', 'Tacoma, WA'), ('Seattle Home', 'Seattle, WA'),
+                                   ('Portland Home', 'Portland, OR'), ('Austin Home', 'Austin, TX'),
+                                   ('Nowhere Home', 'Atlantis, ZZ')]:
+                db.session.add(Item(category='houses', name=name, price=100000, specifications={'location': location}))
+            db.session.commit()
+            seattle = Item.query.filter_by(name='Seattle Home').first()
+            self.assertAlmostEqual(seattle.latitude, 47.61, places=1)
+            self.assertIsNone(Item.query.filter_by(name='Nowhere Home').first().latitude)
+
+        with self.client as c:
+            self.login(c)
+            data = c.get('/api/items/houses?near=Seattle, WA&radius_km=300').get_json()
+            self.assertEqual(data['sort'], 'distance')
+            self.assertEqual([i['name'] for i in data['items']], ['Seattle Home', 'Tacoma Home', 'Portland Home'])
+            self.assertEqual(data['items'][0]['distance_km'], 0)
+
+            first = c.get('/api/items/houses?lat=47.6062&lon=-122.3321&radius_km=300&limit=2').get_json()
+            self.assertEqual(len(first['items']), 2)
+            rest = c.get(f"/api/items/houses?lat=47.6062&lon=-122.3321&radius_km=300&limit=2&cursor={first['next_cursor']}").get_json()
+            self.assertEqual([i['name'] for i in rest['items']], ['Portland Home'])
+            self.assertIsNone(rest['next_cursor'])
+
+            self.assertEqual(c.get('/api/items/houses?near=Atlantis, ZZ').status_code, 400)
+
+            page = c.get('/houses?near=Seattle, WA&radius_km=50').data.decode('utf-8')
+            self.assertIn('Seattle Home', page)
+            self.assertIn('km away', page)
+            self.assertNotIn('Portland Home', page)
+            self.assertIn('Unknown location', c.get('/houses?near=Atlantis').data.decode('utf-8'))
+
+    def test_similar_items_served_from_side_table(self):
+        """Test the similar listings page and API read precomputed neighbours in rank order"""
+        with application.app_context():
+            items = [Item(category='cars', name=f'Car {i}', price=1000 + i) for i in range(3)]
+            db.session.add_all(items)
+            db.session.commit()
+            source, first, second = [item.id for item in items]
+            db.session.add_all([
+                SimilarItem(item_id=source, rank=1, similar_item_id=second, score=0.99, category='cars'),
+                SimilarItem(item_id=source, rank=2, similar_item_id=first, score=0.5, category='cars'),
+            ])
+            db.session.commit()
+
+        with self.client as c:
+            self.login(c)
+            data = c.get(f'/api/items/{source}/similar').get_json()
+            self.assertEqual([i['id'] for i in data], [second, first])
+            self.assertEqual(data[0]['score'], 0.99)
+
+            page = c.get(f'/item/{source}/similar').data.decode('utf-8')
+            self.assertLess(page.index('Car 2'), page.index('Car 1'))
+            self.assertIn('No similar listings', c.get(f'/item/{second}/similar').data.decode('utf-8'))
+            self.assertEqual(c.get('/item/999999/similar').status_code, 404)
+            self.assertIn(f'/item/{source}/similar', c.get('/cars').data.decode('utf-8'))
+
+    def test_item_detail_cached_and_grid_cards_slimmed(self):
+        """Test the cached detail page, its eviction on commit, and summary-only listing queries"""
+        with application.app_context():
+            db.session.add_all([Item(category='cars', name=f'Car {i}', price=i, description=f'Long description {i}',
+                                     specifications={'make': 'Ford'}) for i in range(6)])
+            db.session.commit()
+            item_id = Item.query.filter_by(name='Car 0').first().id
+
+        with self.client as c:
+            self.login(c)
+            response = c.get('/cars')
+            text = response.data.decode('utf-8')
+            self.assertNotIn('Long description', text)
+            self.assertEqual(text.count('rel="prefetch"'), 4)
+            self.assertIn(f'href="/item/{item_id}"', text)
+
+            statements = []
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            # The first page is now cached; drop it to see the query
+            listing_cache.clear()
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                c.get('/cars')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            item_selects = [s for s in statements if 'FROM item' in s]
+            self.assertTrue(item_selects)
+            self.assertTrue(all('item.description' not in s and 'item.specifications' not in s for s in item_selects))
+
+            response = c.get(f'/item/{item_id}')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'Long description 0', response.data)
+            self.assertIn('max-age', response.headers['Cache-Control'])
+            self.assertIn(item_id, item_cache)
+
+            # A cache hit does not read the item row again
+            statements.clear()
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                c.get(f'/item/{item_id}')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            self.assertFalse([s for s in statements if 'FROM item' in s and 'similar_item' not in s])
+
+            with application.app_context():
+                item = db.session.get(Item, item_id)
+                item.description = 'Updated description'
+                db.session.commit()
+            self.assertNotIn(item_id, item_cache)
+            self.assertIn(b'Updated description', c.get(f'/item/{item_id}').data)
+            self.assertEqual(c.get('/item/999999').status_code, 404)
+
+    def test_templates_precompiled_with_bytecode_cache(self):
+        """Test that every template is compiled at boot and auto-reload checks are off"""
+        env = application.jinja_env
+        self.assertIsInstance(env.bytecode_cache, FileSystemBytecodeCache)
+        self.assertFalse(env.auto_reload)
+
+        names = warm_templates()
+        for name in ('base.html', 'macros.html', 'cars.html', 'houses.html', 'furniture.html', 'home.html'):
+            self.assertIn(name, names)
+        for name in names:
+            self.assertIsNotNone(env.cache.get((weakref.ref(env.loader), name)))
+
+    def test_suggest_ranks_substring_matches(self):
+        """Test that /api/suggest returns names containing the query, prefix matches first"""
+        with application.app_context():
+            db.session.add_all([
+                Item(category='cars', name='2020 Toyota Camry', price=1),
+                Item(category='cars', name='Camry Hybrid', price=1),
+                Item(category='cars', name='2021 Honda Civic', price=1),
+                Item(category='furniture', name='Camp Chair', price=1),
+                Item(category='furniture', name='100% Wool Rug', price=1),
+            ])
+            db.session.commit()
+
+        with self.client as c:
+            self.login(c)
+            names = [s['name'] for s in c.get('/api/suggest?q=CAM').get_json()]
+            self.assertEqual(names, ['Camp Chair', 'Camry Hybrid', '2020 Toyota Camry'])
+            suggestions = c.get('/api/suggest?q=cam&category=cars').get_json()
+            self.assertEqual([s['name'] for s in suggestions], ['Camry Hybrid', '2020 Toyota Camry'])
+            self.assertTrue(suggestions[0]['url'].startswith('/item/'))
+            # Too short for the trigram index, and LIKE wildcards are matched literally
+            self.assertEqual(c.get('/api/suggest?q=ca').get_json(), [])
+            self.assertEqual([s['name'] for s in c.get('/api/suggest?q=0%25 w').get_json()], ['100% Wool Rug'])
+            self.assertEqual(c.get('/api/suggest?q=x_y').get_json(), [])
+            self.assertEqual(c.get('/api/suggest?q=cam&category=boats').status_code, 404)
+
+    def test_suggest_reuses_complete_prefix_answers(self):
+        """Test that typing on from a cached, complete prefix is answered without a query"""
+        with application.app_context():
+            db.session.add_all([Item(category='cars', name=name, price=1)
+                                for name in ('Tesla Model 3', 'Tesla Model Y', 'Tesla Roadster')])
+            db.session.commit()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with self.client as c:
+            self.login(c)
+            self.assertEqual(len(c.get('/api/suggest?q=tes').get_json()), 3)
+            with application.app_context():
+                engine = db.engine
+            event.listen(engine, 'before_cursor_execute', listener)
+            try:
+                names = [s['name'] for s in c.get('/api/suggest?q=tesla%20mod').get_json()]
+            finally:
+                event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(names, ['Tesla Model 3', 'Tesla Model Y'])
+        self.assertFalse([s for s in statements if 'FROM item' in s])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
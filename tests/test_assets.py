@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import assets
+import application as app_module
+from application import application
+
+SAMPLE_CSS = (
+    '/*! tailwindcss v2.2.19 | MIT License */'
+    '*,::after,::before{box-sizing:border-box}'
+    '.bg-white{background-color:#fff}.bg-black{background-color:#000}'
+    '.hover\\:bg-gray-50:hover{background-color:#f9fafb}'
+    '.space-x-4>:not([hidden])~:not([hidden]){margin-left:1rem}'
+    '.w-1\\/2,.w-1\\/3{width:50%}'
+    '@keyframes spin{to{transform:rotate(360deg)}}'
+    '@media (min-width:768px){.md\\:grid-cols-3{grid-template-columns:repeat(3,minmax(0,1fr))}.md\\:flex{display:flex}}'
+)
+
+
+class TestAssetPipeline(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.templates = os.path.join(self.root, 'templates')
+        self.sources = os.path.join(self.root, 'assets')
+        self.static = os.path.join(self.root, 'static')
+        os.makedirs(self.templates)
+        os.makedirs(os.path.join(self.sources, 'js'))
+        with open(os.path.join(self.templates, 'page.html'), 'w') as f:
+            f.write('<div class="bg-white hover:bg-gray-50 space-x-4 md:grid-cols-3 w-1/2">'
+                    '{{ "x" if y else \'w-1/3\' }}</div>')
+        with open(os.path.join(self.sources, 'js', 'app.js'), 'w') as f:
+            f.write('console.log("hi");')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_purge_keeps_only_used_classes(self):
+        purged = assets.purge_css(SAMPLE_CSS, assets.used_class_names(self.templates))
+        self.assertIn('/*! tailwindcss', purged)
+        self.assertIn('box-sizing:border-box', purged)
+        self.assertIn('.bg-white{', purged)
+        self.assertNotIn('.bg-black', purged)
+        self.assertIn('.hover\\:bg-gray-50:hover', purged)
+        self.assertIn('.space-x-4>', purged)
+        self.assertIn('.w-1\\/2,.w-1\\/3{', purged)
+        self.assertIn('@keyframes spin', purged)
+        self.assertIn('@media (min-width:768px){.md\\:grid-cols-3{', purged)
+        self.assertNotIn('md\\:flex', purged)
+
+    def test_build_writes_fingerprinted_files_and_manifest(self):
+        manifest = assets.build(SAMPLE_CSS, self.static, self.sources, self.templates)
+        self.assertEqual(set(manifest), {'css/tailwind.css', 'js/app.js'})
+        for logical_name, hashed_name in manifest.items():
+            self.assertTrue(assets.is_fingerprinted(hashed_name), hashed_name)
+            self.assertTrue(os.path.exists(os.path.join(self.static, hashed_name)))
+        self.assertEqual(assets.load_manifest(self.static), manifest)
+
+        # Same content, same name; changed content, new name
+        self.assertEqual(assets.build(SAMPLE_CSS, self.static, self.sources, self.templates), manifest)
+        changed = assets.build(SAMPLE_CSS + '.bg-white{color:red}', self.static, self.sources, self.templates)
+        self.assertNotEqual(changed['css/tailwind.css'], manifest['css/tailwind.css'])
+
+    def test_asset_url_and_immutable_cache_headers(self):
+        manifest = assets.build(SAMPLE_CSS, self.static, self.sources, self.templates)
+        original_static_folder = application.static_folder
+        application.static_folder = self.static
+        try:
+            with patch.dict(app_module.asset_manifest, manifest, clear=True):
+                with application.test_request_context():
+                    url = app_module.asset_url('css/tailwind.css')
+                    self.assertEqual(url, f"/static/{manifest['css/tailwind.css']}")
+                    self.assertIsNone(app_module.asset_url('css/missing.css'))
+
+                response = application.test_client().get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers['Cache-Control'], assets.IMMUTABLE_CACHE_CONTROL)
+                response.close()
+        finally:
+            application.static_folder = original_static_folder
+
+    def test_missing_manifest_falls_back_to_empty(self):
+        self.assertEqual(assets.load_manifest(os.path.join(self.root, 'nowhere')), {})
+        with open(os.path.join(self.root, 'manifest.json'), 'w') as f:
+            f.write('{not json')
+        self.assertEqual(assets.load_manifest(self.root), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
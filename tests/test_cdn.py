@@ -0,0 +1,152 @@
+import time
+import unittest
+
+import requests
+from werkzeug.test import Client
+
+import application as app_module
+from application import application, db, Favorite, Item, User, listing_cache, rate_limit_store
+from cdn import Purger, SharedCache
+
+
+class TestPublicListings(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        application.config['PUBLIC_LISTINGS'] = True
+        self.client = application.test_client()
+        rate_limit_store.clear()
+        listing_cache.clear()
+        with application.app_context():
+            db.session.add(User(id='shared-user', email='shared@example.com', name='Shared User'))
+            cars = [Item(category='cars', name=f'Shared Car {i}', price=i) for i in range(3)]
+            db.session.add_all(cars)
+            db.session.flush()
+            db.session.add(Favorite(user_id='shared-user', item_id=cars[0].id))
+            db.session.commit()
+            self.car_ids = [car.id for car in cars]
+
+    def tearDown(self):
+        application.config['PUBLIC_LISTINGS'] = False
+        listing_cache.clear()
+
+    def login(self, c):
+        with c.session_transaction() as sess:
+            sess['_user_id'] = 'shared-user'
+            sess.permanent = True
+
+    def test_listing_is_the_same_shared_page_for_everyone(self):
+        anonymous = self.client.get('/cars')
+        self.assertEqual(anonymous.status_code, 200)
+        self.assertIn('s-maxage=300', anonymous.headers['Cache-Control'])
+        self.assertIn('public', anonymous.headers['Cache-Control'])
+        self.assertEqual(anonymous.headers['Surrogate-Key'], 'listings listings-cars')
+        self.assertNotIn(b'Logout', anonymous.data)
+        self.assertIn(b'data-account-nav', anonymous.data)
+
+        with application.test_client() as c:
+            self.login(c)
+            signed_in = c.get('/cars')
+            self.assertEqual(signed_in.data, anonymous.data)
+            # Nothing a shared cache would refuse to store, or store for one visitor only
+            self.assertNotIn('Set-Cookie', signed_in.headers)
+            self.assertNotIn('Cookie', signed_in.headers.get('Vary', ''))
+            cards = c.get('/cars/cards')
+            self.assertEqual(cards.headers['Surrogate-Key'], 'listings listings-cars')
+
+        revalidated = self.client.get('/cars', headers={'If-None-Match': anonymous.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_account_fragment(self):
+        items = ','.join(str(item_id) for item_id in self.car_ids)
+        with application.test_client() as c:
+            self.login(c)
+            response = c.get(f'/fragments/account?items={items}')
+            self.assertEqual(response.headers['Cache-Control'], 'private, no-store')
+            account = response.get_json()
+            self.assertEqual((account['authenticated'], account['favorites']), (True, [self.car_ids[0]]))
+            self.assertIn('Logout', account['nav'])
+
+        account = self.client.get(f'/fragments/account?items={items}').get_json()
+        self.assertEqual((account['authenticated'], account['favorites']), (False, []))
+        self.assertIn('Login', account['nav'])
+
+    def test_item_commits_purge_the_stand_in_cache(self):
+        proxy = Client(SharedCache(application))
+        sent = []
+
+        def post(url, headers, timeout):
+            sent.append(headers['Surrogate-Key'])
+            response = requests.Response()
+            response.status_code = proxy.post(url, headers=headers).status_code
+            return response
+
+        app_module.cdn_purger = Purger('/__purge', post=post)
+        try:
+            self.assertEqual(proxy.get('/cars').headers['X-Cache'], 'MISS')
+            hit = proxy.get('/cars')
+            self.assertEqual(hit.headers['X-Cache'], 'HIT')
+            self.assertNotIn('Surrogate-Key', hit.headers)
+            self.assertEqual(proxy.get('/houses').headers['X-Cache'], 'MISS')
+
+            with application.app_context():
+                db.session.add(Item(category='cars', name='Fresh Car', price=99))
+                db.session.commit()
+            deadline = time.monotonic() + 5
+            while not sent and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(sent, ['listings-cars'])
+
+            fresh = proxy.get('/cars')
+            self.assertEqual(fresh.headers['X-Cache'], 'MISS')
+            self.assertIn(b'Fresh Car', fresh.data)
+            self.assertEqual(proxy.get('/houses').headers['X-Cache'], 'HIT')
+        finally:
+            app_module.cdn_purger = None
+
+
+class TestSharedCache(unittest.TestCase):
+    def test_only_public_responses_without_cookies_are_stored(self):
+        responses = {
+            '/public': [('Cache-Control', 'public, s-maxage=60'), ('Surrogate-Key', 'a b')],
+            '/private': [('Cache-Control', 'private, max-age=60')],
+            '/cookie': [('Cache-Control', 'public, s-maxage=60'), ('Set-Cookie', 'session=1')],
+        }
+        calls = []
+
+        def app(environ, start_response):
+            calls.append(environ['PATH_INFO'])
+            start_response('200 OK', responses[environ['PATH_INFO']])
+            return [b'body']
+
+        now = [0]
+        proxy = Client(SharedCache(app, clock=lambda: now[0]))
+        for path in ('/public', '/private', '/cookie') * 2:
+            proxy.get(path)
+        self.assertEqual(calls, ['/public', '/private', '/cookie', '/private', '/cookie'])
+
+        proxy.post('/__purge', headers={'Surrogate-Key': 'c b'})
+        proxy.get('/public')
+        now[0] = 61
+        proxy.get('/public')
+        self.assertEqual(calls.count('/public'), 3)
+
+    def test_purger_sends_merged_keys(self):
+        sent = []
+
+        def post(url, headers, timeout):
+            sent.append((url, headers))
+            response = requests.Response()
+            response.status_code = 204
+            return response
+
+        purger = Purger('https://cdn.example.com/purge', token='secret', post=post)
+        purger.pending.update(['listings-cars', 'listings-houses', 'listings-cars'])
+        self.assertEqual(purger.flush(), {'listings-cars', 'listings-houses'})
+        self.assertEqual(sent, [('https://cdn.example.com/purge',
+                                 {'Surrogate-Key': 'listings-cars listings-houses', 'Authorization': 'Bearer secret'})])
+        self.assertEqual(purger.flush(), set())
+        self.assertEqual(len(sent), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import unittest
+
+import events
+import loadshed
+from application import application, db, Item, User, item_events, listing_cache
+from events import Broadcaster, TooManyStreams
+
+
+class TestBroadcaster(unittest.TestCase):
+    def test_events_reach_only_their_category(self):
+        broadcaster = Broadcaster(max_streams=4, queue_size=10)
+        cars, other_cars, houses = (broadcaster.subscribe(c) for c in ('cars', 'cars', 'houses'))
+        self.assertEqual(broadcaster.publish('cars', {'id': 1}), 2)
+        self.assertEqual((cars.get(0), other_cars.get(0), houses.get(0)), ({'id': 1}, {'id': 1}, None))
+
+        broadcaster.unsubscribe(other_cars)
+        self.assertEqual(broadcaster.publish('cars', {'id': 2}), 1)
+        self.assertEqual(broadcaster.stream_count, 2)
+
+    def test_stream_limit_and_slow_clients(self):
+        broadcaster = Broadcaster(max_streams=1, queue_size=2)
+        slow = broadcaster.subscribe('cars')
+        with self.assertRaises(TooManyStreams):
+            broadcaster.subscribe('houses')
+
+        for n in range(3):
+            broadcaster.publish('cars', {'id': n})
+        # The publisher never blocks; the client that fell behind is marked for disconnection
+        self.assertTrue(slow.overflowed)
+        self.assertEqual([slow.get(0), slow.get(0), slow.get(0)], [{'id': 0}, {'id': 1}, None])
+
+    def test_listener_dispatches_notify_payloads(self):
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe('cars')
+        listener = events.Listener(engine=None, broadcaster=broadcaster)
+        listener.dispatch('{"op": "insert", "id": 7, "category": "cars"}')
+        listener.dispatch('not json')
+        self.assertEqual(subscription.get(0), {'op': 'insert', 'id': 7, 'category': 'cars'})
+        self.assertIsNone(subscription.get(0))
+
+    def test_format_event(self):
+        self.assertEqual(events.format_event('insert', {'id': 7}, event_id=3), 'event: insert\nid: 3\ndata: {"id":7}\n\n')
+
+
+class TestEventStream(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        application.config['SSE_MAX_STREAM_SECONDS'] = 0.2
+        self.client = application.test_client()
+        with application.app_context():
+            db.session.add(User(id='stream-user', email='stream@example.com', name='Stream User'))
+            db.session.commit()
+
+    def tearDown(self):
+        application.config['SSE_MAX_STREAM_SECONDS'] = 300
+        item_events.max_streams = application.config['SSE_MAX_STREAMS']
+
+    def test_committed_items_streamed_to_category(self):
+        """Test that a stream receives inserts and updates of its category once they commit"""
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['_user_id'] = 'stream-user'
+            response = c.get('/events/cars', buffered=False)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+            # Open streams neither count as in flight nor hold a connection
+            self.assertEqual(loadshed.in_flight.count, 0)
+
+            with application.app_context():
+                car = Item(category='cars', name='Live Car', price=1)
+                db.session.add_all([car, Item(category='houses', name='Live House', price=1)])
+                db.session.commit()
+                car.price = 2
+                db.session.commit()
+                db.session.add(Item(category='cars', name='Rolled Back', price=1))
+                db.session.flush()
+                db.session.rollback()
+
+            body = response.get_data(as_text=True)
+            self.assertTrue(body.startswith('retry: 5000\n\n'))
+            messages = [line for line in body.split('\n') if line.startswith('data: ')]
+            self.assertEqual([json.loads(line[6:])['op'] for line in messages], ['insert', 'update'])
+            self.assertNotIn('Live House', body)
+            self.assertEqual(item_events.stream_count, 0)
+
+    def test_stream_limit_and_unknown_category(self):
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['_user_id'] = 'stream-user'
+            self.assertEqual(c.get('/events/boats').status_code, 404)
+            item_events.max_streams = 0
+            response = c.get('/events/cars')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '5')
+
+    def test_live_updates_script_only_for_signed_in_visitors(self):
+        """Test that pages never open a stream the visitor would be redirected away from"""
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['_user_id'] = 'stream-user'
+            page = c.get('/cars').get_data(as_text=True)
+            self.assertIn('new EventSource', page)
+            self.assertNotIn('marketplaceAccount', page)
+
+        # One copy for everyone: the stream waits for the account fragment to report a signed-in visitor
+        application.config['PUBLIC_LISTINGS'] = True
+        try:
+            page = application.test_client().get('/cars').get_data(as_text=True)
+        finally:
+            application.config['PUBLIC_LISTINGS'] = False
+            listing_cache.clear()
+        gated = page[page.index('window.marketplaceAccount.then'):]
+        self.assertIn('if (account && account.authenticated) {\n            connect();', gated)
+        self.assertEqual(page.count('connect();'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+import geocoder
+
+
+class TestGeocoder(unittest.TestCase):
+    def test_bundled_gazetteer_resolves_city_and_state(self):
+        latitude, longitude = geocoder.geocode('Seattle, WA')
+        self.assertAlmostEqual(latitude, 47.61, places=1)
+        self.assertAlmostEqual(longitude, -122.33, places=1)
+        self.assertEqual(geocoder.geocode('  seattle ,wa'), geocoder.geocode('Seattle, WA'))
+
+    def test_unknown_and_ambiguous_places(self):
+        self.assertIsNone(geocoder.geocode('Atlantis, ZZ'))
+        self.assertIsNone(geocoder.geocode(''))
+        self.assertIsNone(geocoder.geocode(None))
+        # Portland exists in both Oregon and Maine
+        self.assertIsNone(geocoder.geocode('Portland'))
+        self.assertIsNotNone(geocoder.geocode('Portland, ME'))
+        self.assertEqual(geocoder.geocode('Boise'), geocoder.geocode('Boise, ID'))
+
+    def test_custom_gazetteer(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as f:
+            f.write('city,state,latitude,longitude\nSpringfield,IL,39.78,-89.65\n')
+        try:
+            self.assertEqual(geocoder.geocode('Springfield, IL', path), (39.78, -89.65))
+        finally:
+            os.remove(path)
+
+    def test_distance_and_bounding_box(self):
+        seattle = geocoder.geocode('Seattle, WA')
+        portland = geocoder.geocode('Portland, OR')
+        self.assertAlmostEqual(geocoder.haversine_km(*seattle, *portland), 234, delta=5)
+
+        min_lat, max_lat, min_lon, max_lon = geocoder.bounding_box(*seattle, 250)
+        self.assertTrue(min_lat <= portland[0] <= max_lat and min_lon <= portland[1] <= max_lon)
+        self.assertEqual(geocoder.bounding_box(90, 0, 10)[2:], (-180.0, 180.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
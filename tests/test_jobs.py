@@ -0,0 +1,222 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+import jobs
+import thumbnails
+from application import application, db, Item, ItemDeletion, Job, User, CategorySummary, enqueue_job
+
+
+# Workers claim and finish jobs on their own connections
+@pytest.mark.commits
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        application.config['SECRET_KEY'] = 'test_secret_key'
+        self.client = application.test_client()
+
+    def tearDown(self):
+        application.config['CATEGORY_SUMMARY_SYNC'] = True
+        application.config['ADMIN_EMAILS'] = set()
+        jobs.handlers.pop('test', None)
+
+    def jobs_of(self, kind):
+        with application.app_context():
+            return Job.query.filter_by(kind=kind).order_by(Job.id).all()
+
+    def test_enqueue_commits_with_the_item_write(self):
+        """Test that a job exists only if the transaction that enqueued it commits"""
+        with application.app_context():
+            db.session.add(Item(category='cars', name='Icon Car', price=1, icon_url='http://example.com/a.png'))
+            db.session.rollback()
+            self.assertEqual(self.jobs_of('thumbnail'), [])
+
+            item = Item(category='cars', name='Icon Car', price=1, icon_url='http://example.com/a.png')
+            db.session.add(item)
+            db.session.commit()
+            [job] = self.jobs_of('thumbnail')
+            self.assertEqual(job.payload, {'item_id': item.id})
+            self.assertEqual(job.status, 'queued')
+
+            # Unrelated edits do not enqueue another thumbnail
+            item.price = 2
+            db.session.commit()
+            self.assertEqual(len(self.jobs_of('thumbnail')), 1)
+
+    def test_thumbnail_job_stores_resized_icon_and_skips_unsafe_ones(self):
+        """Test that the thumbnail handler saves through the store and gives up on rejected icons"""
+        static = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static)
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600)).save(buffer, 'PNG')
+        with application.app_context():
+            good = Item(category='cars', name='Good Icon', price=1, icon_url='http://93.184.216.34/car.png')
+            bad = Item(category='cars', name='Bad Icon', price=1, icon_url='http://169.254.169.254/latest/meta-data/')
+            db.session.add_all([good, bad])
+            db.session.commit()
+            good_id, bad_id = good.id, bad.id
+
+        with patch('jobs.thumbnail_store', thumbnails.LocalStore(static, '/static')), \
+                patch('thumbnails.fetch_icon', side_effect=lambda url: buffer.getvalue()) as fetch:
+            self.assertEqual(jobs.run_one(), 'done')
+            fetch.side_effect = thumbnails.IconRejected('private address')
+            # Not retried: nothing about a rejected icon changes between attempts
+            self.assertEqual(jobs.run_one(), 'done')
+
+        with application.app_context():
+            url = db.session.get(Item, good_id).thumbnail_url
+            self.assertTrue(url.startswith('/static/thumbnails/'))
+            self.assertTrue(os.path.isfile(os.path.join(static, 'thumbnails', os.path.basename(url))))
+            self.assertIsNone(db.session.get(Item, bad_id).thumbnail_url)
+
+    def test_summary_refresh_deferred_to_a_deduplicated_job(self):
+        """Test that with sync summaries off, item writes enqueue one refresh job per category"""
+        application.config['CATEGORY_SUMMARY_SYNC'] = False
+        with application.app_context():
+            db.session.add(Item(category='cars', name='Car 1', price=10))
+            db.session.commit()
+            db.session.add(Item(category='cars', name='Car 2', price=30))
+            db.session.commit()
+            self.assertIsNone(db.session.get(CategorySummary, 'cars'))
+        self.assertEqual(len(self.jobs_of('refresh_summary')), 1)
+
+        self.assertEqual(jobs.run_one(), 'done')
+        with application.app_context():
+            summary = db.session.get(CategorySummary, 'cars')
+            self.assertEqual(summary.item_count, 2)
+
+    def test_sync_summary_median_refreshed_by_job(self):
+        """Test that sync summaries adjust counts in place and leave the median to one refresh job"""
+        with application.app_context():
+            db.session.add_all([Item(category='cars', name=f'Car {i}', price=price)
+                                for i, price in enumerate((10, 20, 60))])
+            db.session.commit()
+            db.session.add(Item(category='cars', name='Car 3', price=70))
+            db.session.commit()
+            db.session.add(Item(category='cars', name='Car 4', price=80))
+            db.session.commit()
+            summary = db.session.get(CategorySummary, 'cars')
+            self.assertEqual((summary.item_count, summary.max_price, summary.median_price), (5, 80, 20))
+        self.assertEqual(len(self.jobs_of('refresh_summary')), 1)
+
+        self.assertEqual(jobs.run_one(), 'done')
+        with application.app_context():
+            self.assertEqual(db.session.get(CategorySummary, 'cars').median_price, 60)
+
+    def test_failed_job_retried_with_backoff_then_failed(self):
+        """Test that a failing job is requeued with a delay until max_attempts"""
+        calls = []
+
+        @jobs.handler('test')
+        def fail(payload):
+            calls.append(payload)
+            raise RuntimeError('boom')
+
+        with application.app_context():
+            enqueue_job('test', {'n': 1}, max_attempts=2)
+            db.session.commit()
+
+        self.assertEqual(jobs.run_one(), 'queued')
+        [job] = self.jobs_of('test')
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('boom', job.last_error)
+        # Not due again until the backoff has passed
+        self.assertIsNone(jobs.run_one())
+
+        with application.app_context():
+            Job.query.update({'run_at': datetime.utcnow()})
+            db.session.commit()
+        self.assertEqual(jobs.run_one(), 'failed')
+        [job] = self.jobs_of('test')
+        self.assertEqual((job.status, job.attempts, len(calls)), ('failed', 2, 2))
+
+    def test_backoff_is_capped_exponential(self):
+        with patch('jobs.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([jobs.backoff_seconds(n, base=5) for n in (1, 2, 3)], [5, 10, 20])
+            self.assertEqual(jobs.backoff_seconds(30, base=5), jobs.MAX_BACKOFF_SECONDS)
+
+    def test_purge_keeps_recent_item_deletions(self):
+        with application.app_context():
+            item = Item(category='cars', name='Sold Car', price=1)
+            db.session.add(item)
+            db.session.commit()
+            db.session.delete(item)
+            db.session.add(ItemDeletion(item_id=0, deleted_at=datetime.utcnow() - timedelta(days=30)))
+            db.session.commit()
+        self.assertEqual(jobs.purge_item_deletions(), 1)
+        with application.app_context():
+            self.assertEqual([row.item_id for row in ItemDeletion.query.all()], [item.id])
+
+    def test_stale_running_jobs_requeued(self):
+        with application.app_context():
+            enqueue_job('test')
+            db.session.commit()
+            self.assertIsNotNone(jobs.claim('dead-worker'))
+            Job.query.update({'started_at': datetime.utcnow() - timedelta(hours=1)})
+            db.session.commit()
+        with patch('jobs.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual(jobs.requeue_stale(timeout=600), 1)
+        [job] = self.jobs_of('test')
+        self.assertEqual((job.status, job.locked_by), ('queued', None))
+        # Retried after the same backoff as a job that raised
+        self.assertGreater(job.run_at, datetime.utcnow() + timedelta(seconds=1))
+        self.assertIsNone(jobs.run_one())
+
+    def test_job_timing_out_on_last_attempt_fails(self):
+        """Test that a job that keeps killing its worker is failed at max_attempts instead of requeued forever"""
+        with application.app_context():
+            enqueue_job('test', max_attempts=1)
+            db.session.commit()
+            self.assertIsNotNone(jobs.claim('dead-worker'))
+            Job.query.update({'started_at': datetime.utcnow() - timedelta(hours=1)})
+            db.session.commit()
+        self.assertEqual(jobs.requeue_stale(timeout=600), 1)
+        [job] = self.jobs_of('test')
+        self.assertEqual((job.status, job.attempts, job.last_error), ('failed', 1, 'worker timed out'))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(jobs.run_one())
+
+    def test_worker_threads_drain_queue_and_report_stats(self):
+        done = []
+        jobs.handler('test')(lambda payload: done.append(payload['n']))
+        with application.app_context():
+            for n in range(5):
+                enqueue_job('test', {'n': n})
+            db.session.commit()
+
+        worker = jobs.Worker(threads=1, poll_interval=0.01).start()
+        deadline = time.monotonic() + 5
+        while len(done) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        worker.stop(timeout=5)
+
+        self.assertEqual(sorted(done), [0, 1, 2, 3, 4])
+        stats = jobs.queue_stats()
+        self.assertEqual(stats['depth'], {'test': {'done': 5}})
+        self.assertEqual(stats['sample_size'], 5)
+        self.assertIsNotNone(stats['run_seconds']['p95'])
+
+    def test_admin_jobs_endpoint_requires_admin(self):
+        with application.app_context():
+            db.session.add(User(id='admin', email='admin@example.com', name='Admin'))
+            db.session.commit()
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['_user_id'] = 'admin'
+            self.assertEqual(c.get('/api/admin/jobs').status_code, 403)
+            application.config['ADMIN_EMAILS'] = {'admin@example.com'}
+            response = c.get('/api/admin/jobs')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('oldest_queued_seconds', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+import loadshed
+from application import application, load_shed_requests
+from loadshed import DecayingAverage, TimedQueuePool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestOverloadSignals(unittest.TestCase):
+    def test_average_decays_while_idle(self):
+        clock = FakeClock()
+        average = DecayingAverage(half_life=5.0, clock=clock)
+        self.assertEqual(average.value(), 0.0)
+        for value in (1.0, 3.0):
+            average.observe(value)
+        self.assertAlmostEqual(average.value(), 2.0)
+        clock.now += 10
+        # Two half-lives later the old samples weigh a quarter and the average fades towards 0
+        self.assertAlmostEqual(average.value(), 2.0 * 0.5 / 1.0)
+        clock.now += 60
+        self.assertLess(average.value(), 0.001)
+
+    def test_pool_records_checkout_wait(self):
+        engine = create_engine('sqlite://', poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2)
+        saved, loadshed.checkout_wait = loadshed.checkout_wait, DecayingAverage()
+        try:
+            with engine.connect():
+                self.assertEqual(loadshed.pool_status(engine.pool), {'checked_out': 1, 'capacity': 1})
+                with self.assertRaises(PoolTimeout):
+                    engine.connect()
+            self.assertGreater(loadshed.checkout_wait.value(), 0.05)
+        finally:
+            loadshed.checkout_wait = saved
+            engine.dispose()
+
+
+# Probes read pool state and connect through the engine itself
+@pytest.mark.commits
+class TestHealthEndpoints(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        self.client = application.test_client()
+        self.checkout_wait = loadshed.checkout_wait
+        loadshed.checkout_wait = DecayingAverage()
+
+    def tearDown(self):
+        loadshed.checkout_wait = self.checkout_wait
+
+    def test_health_and_ready(self):
+        response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], 'ok')
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], 'ready')
+
+    def test_slow_pool_checkouts_shed_requests(self):
+        """Test that requests get a quick 503 while connection checkouts are slow, but probes still answer"""
+        loadshed.checkout_wait.observe(2 * application.config['SHED_MAX_POOL_WAIT_MS'] / 1000)
+        shed = load_shed_requests.value(reason='pool_wait')
+
+        response = self.client.get('/api/categories')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(load_shed_requests.value(reason='pool_wait'), shed + 1)
+        self.assertEqual(self.client.get('/healthz').status_code, 200)
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['checks']['overloaded'], 'pool_wait')
+
+    def test_in_flight_limit(self):
+        self.assertEqual(loadshed.overload_reason(4, 0, current_in_flight=5), 'in_flight')
+        self.assertIsNone(loadshed.overload_reason(4, 0, current_in_flight=4))
+        self.assertEqual(loadshed.in_flight.count, 0)
+        self.client.get('/healthz')
+        self.assertEqual(loadshed.in_flight.count, 0)
+
+    def test_default_in_flight_limit_below_waitress_threads(self):
+        # Waitress never runs more requests than its threads, so a higher limit could never fire
+        self.assertLess(application.config['SHED_MAX_IN_FLIGHT'], application.config['WAITRESS_THREADS'])
+        self.assertEqual(loadshed.overload_reason(application.config['SHED_MAX_IN_FLIGHT'], 0,
+                                                  current_in_flight=application.config['WAITRESS_THREADS']),
+                         'in_flight')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.loadtest import DEFAULT_MIX, Stats, load_mix, percentile
+
+
+class TestLoadTestHarness(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_default_mix_covers_pages_and_api(self):
+        paths, weights = load_mix(DEFAULT_MIX)
+        self.assertEqual(len(paths), len(weights))
+        for path in ('/', '/cars', '/houses', '/furniture'):
+            self.assertIn(path, paths)
+        self.assertTrue(any(path.startswith('/api/') for path in paths))
+
+    def test_invalid_weights_are_rejected(self):
+        for mix in ({}, {'/cars': -1}, {'/cars': 0, '/houses': 0}, {'/cars': 'heavy'}, {'/cars': True}, ['/cars']):
+            with self.subTest(mix=mix):
+                handle, path = tempfile.mkstemp(suffix='.json')
+                with os.fdopen(handle, 'w') as f:
+                    json.dump(mix, f)
+                try:
+                    with self.assertRaises(ValueError):
+                        load_mix(path)
+                finally:
+                    os.remove(path)
+
+    def test_stats_summary_reports_throughput_and_errors(self):
+        stats = Stats()
+        for latency in (10, 20, 30, 40):
+            stats.record('/cars', latency, 200)
+        stats.record('/cars', 50, 500, error=True)
+        stats.record('/houses', 5, 200)
+
+        summary = stats.summary(elapsed=2.0)
+        self.assertEqual(summary['/cars']['requests'], 5)
+        self.assertAlmostEqual(summary['/cars']['error_rate'], 0.2)
+        self.assertEqual(summary['/cars']['p50_ms'], 30)
+        self.assertEqual(summary['/cars']['statuses'], {200: 4, 500: 1})
+        self.assertEqual(summary['TOTAL']['requests'], 6)
+        self.assertAlmostEqual(summary['TOTAL']['throughput_rps'], 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, inspect, text
+
+from migrations.runner import MigrationContext, MigrationRunner, discover_migrations
+
+
+class TestMigrationRunner(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.engine = create_engine(f'sqlite:///{self.path}')
+        self.log = []
+        self.runner = MigrationRunner(self.engine, log=self.log.append)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_versions_are_discovered_in_order(self):
+        versions = [m.version for m in discover_migrations()]
+        self.assertEqual(versions, sorted(versions))
+        self.assertEqual(len(versions), len(set(versions)))
+
+    def test_upgrade_applies_each_version_once(self):
+        applied = self.runner.upgrade()
+        self.assertEqual([m.version for m in applied], [m.version for m in self.runner.migrations])
+        self.assertEqual(self.runner.upgrade(), [])
+
+        inspector = inspect(self.engine)
+        columns = {c['name'] for c in inspector.get_columns('item')}
+        self.assertTrue({'icon_url', 'specifications'} <= columns)
+        indexes = {i['name'] for i in inspector.get_indexes('item')}
+        self.assertTrue({'idx_item_category', 'idx_item_category_price', 'idx_item_category_name'} <= indexes)
+        self.assertTrue(all(row.duration_ms >= 0 for row in self.runner.applied_versions().values()))
+
+    def test_upgrade_to_target_and_downgrade(self):
+        self.runner.upgrade('0002')
+        self.assertEqual(sorted(self.runner.applied_versions()), ['0001', '0002'])
+
+        self.runner.upgrade()
+        latest = self.runner.migrations[-1].version
+        rolled_back = self.runner.downgrade()
+        self.assertEqual([m.version for m in rolled_back], [latest])
+        self.assertNotIn(latest, self.runner.applied_versions())
+
+        self.runner.downgrade('0001')
+        self.assertEqual(sorted(self.runner.applied_versions()), ['0001'])
+        columns = {c['name'] for c in inspect(self.engine).get_columns('item')}
+        self.assertNotIn('icon_url', columns)
+
+    def test_backfill_updates_in_batches(self):
+        self.runner.upgrade('0002')
+        with self.engine.begin() as connection:
+            for i in range(25):
+                connection.execute(text("INSERT INTO item (name, price, category) VALUES (:n, :p, 'cars')"),
+                                   {'n': f'Car {i}', 'p': i})
+
+        context = MigrationContext(self.engine, log=self.log.append)
+        updated = context.backfill('item', "icon_url = :icon", "icon_url IS NULL", batch_size=10, pause=0, icon='x.png')
+        self.assertEqual(updated, 25)
+        self.assertEqual(sum('backfill item' in line for line in self.log), 3)
+        with self.engine.connect() as connection:
+            missing = connection.execute(text("SELECT COUNT(*) FROM item WHERE icon_url IS NULL")).scalar()
+        self.assertEqual(missing, 0)
+
+    def test_vacuum_analyze_collects_statistics(self):
+        self.runner.upgrade('0002')
+        with self.engine.begin() as connection:
+            connection.execute(text("INSERT INTO item (name, price, category) VALUES ('Car', 1, 'cars')"))
+        context = MigrationContext(self.engine, log=self.log.append)
+        context.vacuum_analyze('item')
+        self.assertTrue(any(line.startswith('    vacuum analyze item:') for line in self.log))
+        with self.engine.connect() as connection:
+            self.assertTrue(connection.execute(text("SELECT COUNT(*) FROM sqlite_stat1")).scalar() > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from datetime import datetime, timedelta
+
+import pytest
+
+from application import application, db, Item, User, PriceHistory, item_cache, price_rollup, rate_limit_store
+from migrations.backfill_price_history import backfill_price_history
+
+
+class TestPriceHistory(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        self.client = application.test_client()
+        rate_limit_store.clear()
+        item_cache.clear()
+        with application.app_context():
+            db.session.add(User(id='history-user', email='history@example.com', name='History User'))
+            db.session.commit()
+
+    def history(self, item_id):
+        return [(row.price, row.category) for row in
+                PriceHistory.query.filter_by(item_id=item_id).order_by(PriceHistory.id)]
+
+    def test_price_changes_recorded_in_item_transaction(self):
+        with application.app_context():
+            car = Item(category='cars', name='Car', price=10000)
+            unpriced = Item(category='cars', name='Unpriced')
+            db.session.add_all([car, unpriced])
+            db.session.commit()
+            self.assertEqual(self.history(car.id), [(10000, 'cars')])
+            self.assertEqual(self.history(unpriced.id), [])
+
+            car.name = 'Renamed Car'
+            db.session.commit()
+            car.price = 9500
+            db.session.commit()
+            car.price = 9000
+            db.session.rollback()
+            self.assertEqual(self.history(car.id), [(10000, 'cars'), (9500, 'cars')])
+
+    def test_rollup_buckets(self):
+        start = datetime(2025, 3, 3, 9)  # A Monday
+        with application.app_context():
+            db.session.add_all([
+                PriceHistory(item_id=1, category='cars', price=price, recorded_at=start + offset)
+                for price, offset in [(100, timedelta(0)), (200, timedelta(hours=1, minutes=30)),
+                                      (300, timedelta(days=1)), (400, timedelta(days=8)),
+                                      (999, -timedelta(days=30))]
+            ])
+            db.session.add(PriceHistory(item_id=2, category='houses', price=5, recorded_at=start))
+            db.session.commit()
+
+            days = price_rollup('day', start - timedelta(days=1), category='cars')
+            self.assertEqual([(point['bucket'], point['count'], point['avg']) for point in days], [
+                ('2025-03-03T00:00:00', 2, 150), ('2025-03-04T00:00:00', 1, 300), ('2025-03-11T00:00:00', 1, 400)])
+            weeks = price_rollup('week', start - timedelta(days=1), item_id=1)
+            self.assertEqual([(point['bucket'], point['min'], point['max']) for point in weeks], [
+                ('2025-03-03T00:00:00', 100, 300), ('2025-03-10T00:00:00', 400, 400)])
+            hours = price_rollup('hour', start, item_id=1)
+            self.assertEqual([point['bucket'] for point in hours][:2], ['2025-03-03T09:00:00', '2025-03-03T10:00:00'])
+            self.assertEqual(price_rollup('month', datetime(2025, 1, 1), category='cars')[0]['bucket'],
+                             '2025-02-01T00:00:00')
+
+    def test_endpoints(self):
+        with application.app_context():
+            car = Item(category='cars', name='Charted Car', price=10000)
+            db.session.add(car)
+            db.session.commit()
+            car.price = 8000
+            db.session.commit()
+            car_id = car.id
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['_user_id'] = 'history-user'
+            data = c.get(f'/api/items/{car_id}/price-history').get_json()
+            self.assertEqual((data['price'], data['bucket']), (8000, 'day'))
+            self.assertEqual([(point['count'], point['min'], point['max']) for point in data['points']], [(2, 8000, 10000)])
+            trend = c.get('/api/analytics/price-trend/cars?bucket=month&days=30').get_json()
+            self.assertEqual(trend['points'][0]['avg'], 9000)
+            self.assertEqual(c.get(f'/api/items/{car_id}/price-history?bucket=decade').status_code, 400)
+            self.assertEqual(c.get('/api/items/999999/price-history').status_code, 404)
+            self.assertEqual(c.get('/api/analytics/price-trend/boats').status_code, 404)
+
+
+# The backfill commits each batch on its own connection
+@pytest.mark.commits
+class TestPriceHistoryBackfill(unittest.TestCase):
+    def test_backfill_adds_only_missing_items(self):
+        with application.app_context():
+            db.session.add(Item(category='cars', name='Tracked', price=1))
+            db.session.commit()
+            db.session.execute(Item.__table__.insert(), [
+                {'category': 'houses', 'name': f'Bulk {i}', 'price': 1000 + i} for i in range(5)])
+            db.session.execute(Item.__table__.insert(), [{'category': 'houses', 'name': 'No Price'}])
+            db.session.commit()
+
+        self.assertEqual(backfill_price_history(batch_size=2, pause=0), 5)
+        self.assertEqual(backfill_price_history(batch_size=2, pause=0), 0)
+        with application.app_context():
+            self.assertEqual(PriceHistory.query.count(), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
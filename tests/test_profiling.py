@@ -0,0 +1,103 @@
+import tracemalloc
+import unittest
+
+import profiling
+from application import application, db, Item, User, listing_cache, rate_limit_store, request_profiles
+from profiling import ProfileStore, RequestProfile
+
+
+def build_rows(count):
+    return [{'name': f'row {i}', 'payload': 'x' * 100} for i in range(count)]
+
+
+class TestRequestProfile(unittest.TestCase):
+    def test_profile_records_peak_allocation_sites_and_functions(self):
+        profile = RequestProfile.start()
+        # One request at a time per process
+        self.assertIsNone(RequestProfile.start())
+        rows = build_rows(2000)
+        result = profile.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+
+        self.assertGreater(result['peak_bytes'], 2000 * 100)
+        top_site, size = result['allocations'].most_common(1)[0]
+        self.assertIn('test_profiling.py', top_site)
+        self.assertGreater(size, 2000 * 100)
+        self.assertTrue(any('(build_rows)' in function for function in result['functions']))
+        self.assertIsNotNone(RequestProfile.start().stop())
+        del rows
+
+    def test_store_sums_per_endpoint(self):
+        store = ProfileStore(max_entries=2)
+        for peak in (100, 300):
+            store.add('cars', {'seconds': 0.5, 'peak_bytes': peak,
+                               'allocations': {'a.py:1': peak, 'b.py:2': 10, 'c.py:3': 1},
+                               'functions': {'f': (1, 0.1, 0.4), 'g': (2, 0.2, 0.2), 'h': (1, 0.0, 0.0)}})
+        report = store.report()['cars']
+        self.assertEqual((report['profiled_requests'], report['avg_peak_bytes'], report['max_peak_bytes']),
+                         (2, 200, 300))
+        self.assertEqual(report['allocations'], [{'site': 'a.py:1', 'avg_bytes': 200}, {'site': 'b.py:2', 'avg_bytes': 10}])
+        self.assertEqual([entry['function'] for entry in report['functions']], ['f', 'g'])
+        self.assertEqual(report['functions'][0]['calls'], 2)
+
+    def test_selection(self):
+        self.assertTrue(profiling.selected('secret', 'secret', 0))
+        self.assertFalse(profiling.selected('guess', 'secret', 0))
+        self.assertFalse(profiling.selected('', None, 0))
+        self.assertTrue(profiling.selected(None, None, 1.0))
+
+
+class TestProfilingEndpoints(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        application.config['PROFILING_ENABLED'] = True
+        application.config['PROFILING_TOKEN'] = 'profile-token'
+        application.config['ADMIN_EMAILS'] = {'admin@example.com'}
+        # Profile the listing query, not a cached first page
+        application.config['LISTING_CACHE_TTL'] = 0
+        self.client = application.test_client()
+        rate_limit_store.clear()
+        request_profiles.clear()
+        with application.app_context():
+            db.session.add(User(id='admin', email='admin@example.com', name='Admin'))
+            db.session.add(User(id='viewer', email='viewer@example.com', name='Viewer'))
+            db.session.add_all([Item(category='cars', name=f'Car {i}', price=i) for i in range(30)])
+            db.session.commit()
+
+    def tearDown(self):
+        application.config['PROFILING_ENABLED'] = False
+        application.config['PROFILING_TOKEN'] = None
+        application.config['ADMIN_EMAILS'] = set()
+        application.config['LISTING_CACHE_TTL'] = listing_cache.ttl
+        request_profiles.clear()
+
+    def login(self, c, user_id):
+        with c.session_transaction() as sess:
+            sess['_user_id'] = user_id
+
+    def test_header_triggered_profiles_reported_per_route(self):
+        with self.client as c:
+            self.login(c, 'admin')
+            c.get('/cars')
+            c.get('/cars', headers={'X-Profile': 'wrong'})
+            self.assertEqual(request_profiles.report(), {})
+
+            self.assertEqual(c.get('/cars', headers={'X-Profile': 'profile-token'}).status_code, 200)
+            report = c.get('/api/admin/profiles').get_json()
+            self.assertEqual(list(report), ['cars'])
+            self.assertEqual(report['cars']['profiled_requests'], 1)
+            self.assertGreater(report['cars']['max_peak_bytes'], 0)
+            self.assertTrue(report['cars']['allocations'])
+            self.assertTrue(any('category_page' in entry['function'] for entry in report['cars']['functions']))
+
+            self.assertEqual(c.delete('/api/admin/profiles').status_code, 204)
+            self.assertEqual(c.get('/api/admin/profiles').get_json(), {})
+
+    def test_profiles_require_admin(self):
+        with self.client as c:
+            self.login(c, 'viewer')
+            self.assertEqual(c.get('/api/admin/profiles').status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from application import (application, db, Item, User, Favorite, PriceHistory, SimilarItem, CATEGORIES,
+                         item_cache, listing_cache, paginate_items, rate_limit_store, refresh_category_summary,
+                         suggest_cache)
+from migrations.seed_data import generate_large_item
+from query_plans import QueryCapture, explain
+
+CATALOG_SIZE = 1500
+# No single table access may read more rows than this; a category holds 500
+ROW_BUDGET = 200
+
+# Every GET route and API, with the most statements one request may run (signed-in user
+# lookup included). {item} and {cursor} are filled in from the seeded catalog.
+ROUTES = [
+    ('/', 2),
+    ('/cars', 3),
+    ('/cars?sort=price_asc', 3),
+    ('/furniture?sort=name', 3),
+    ('/houses?sort=price_desc', 3),
+    ('/houses?near=Seattle, WA', 3),
+    ('/cars?cursor={cursor}', 3),
+    ('/cars/cards?cursor={cursor}', 3),
+    ('/item/{item}', 5),
+    ('/item/{item}/similar', 4),
+    ('/favorites', 2),
+    ('/fragments/account?items={item}', 2),
+    ('/api/categories', 2),
+    ('/api/items/cars', 2),
+    ('/api/items/houses?near=Seattle, WA', 2),
+    ('/api/items/{item}/similar', 3),
+    ('/api/suggest?q=toy', 2),
+    ('/api/items/{item}/price-history', 3),
+    ('/api/analytics/price-trend/cars', 2),
+    # /api/analytics/prices reads the whole catalog into its columnar snapshot by design
+]
+
+# Tables a request may read in full: category_summary holds one row per category
+FULL_SCAN_TABLES = {'category_summary'}
+# Full scans a database cannot avoid, by (dialect, path)
+DIALECT_FULL_SCANS = {
+    # SQLite has no trigram index for substring matches (migration 0011)
+    ('sqlite', '/api/suggest?q=toy'): {'item'},
+}
+
+# Indexes only the migrations build (0008, 0011); create_all leaves them out
+POSTGRES_MIGRATION_INDEXES = (
+    "CREATE INDEX idx_item_house_location ON item USING gist (ll_to_earth(latitude, longitude)) "
+    "WHERE category = 'houses'",
+    "CREATE INDEX idx_item_name_trgm ON item USING gin (name gin_trgm_ops)",
+)
+
+
+class TestQueryPlanChecks(unittest.TestCase):
+    """The checks themselves catch what they are meant to."""
+
+    def setUp(self):
+        with application.app_context():
+            db.session.add_all([Item(category=CATEGORIES[i % 3], name=f'Item {i}', price=i) for i in range(30)])
+            db.session.commit()
+
+    def test_unindexed_scan_detected(self):
+        with application.app_context():
+            connection = db.session.connection()
+            scans = explain(connection, *self.compiled(select(Item).where(Item.description == 'x'), connection))
+            self.assertEqual([(scan.table, scan.full) for scan in scans], [('item', True)])
+            self.assertEqual(scans[0].rows, 30)
+
+            scans = explain(connection, *self.compiled(
+                select(Item).where(Item.category == 'cars', Item.id < 10), connection))
+            self.assertEqual([(scan.table, scan.full) for scan in scans], [('item', False)])
+            self.assertIsNotNone(scans[0].index)
+
+    def test_n_plus_one_detected(self):
+        with application.app_context():
+            ids = db.session.execute(select(Item.id).limit(3)).scalars().all()
+            db.session.expunge_all()
+            with QueryCapture(db.session.connection()) as capture:
+                for item_id in ids:
+                    db.session.get(Item, item_id)
+            self.assertEqual(list(capture.repeated().values()), [3])
+
+    @staticmethod
+    def compiled(statement, connection):
+        compiled = statement.compile(dialect=connection.dialect)
+        parameters = compiled.construct_params()
+        if compiled.positiontup is not None:
+            parameters = tuple(parameters[name] for name in compiled.positiontup)
+        return str(compiled), parameters
+
+
+class TestRouteQueryPlans(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        self.client = application.test_client()
+        rng = random.Random(7)
+        with application.app_context():
+            connection = db.session.connection()
+            if connection.dialect.name == 'postgresql':
+                for statement in POSTGRES_MIGRATION_INDEXES:
+                    connection.exec_driver_sql(statement)
+            db.session.execute(Item.__table__.insert(), [generate_large_item(i, rng) for i in range(CATALOG_SIZE)])
+            db.session.add(User(id='plan-user', email='plan@example.com', name='Plan User'))
+            item_ids = db.session.execute(select(Item.id).order_by(Item.id).limit(30)).scalars().all()
+            self.item_id = item_ids[0]
+            db.session.add_all([Favorite(user_id='plan-user', item_id=item_id) for item_id in item_ids])
+            db.session.add_all([SimilarItem(item_id=self.item_id, rank=rank, similar_item_id=similar_id,
+                                            score=1.0 / rank, category='furniture')
+                                for rank, similar_id in enumerate(item_ids[1:9], start=1)])
+            now = datetime.utcnow()
+            db.session.add_all([PriceHistory(item_id=item_id, category='cars', price=day,
+                                             recorded_at=now - timedelta(days=day))
+                                for item_id in item_ids for day in range(5)])
+            for category in CATEGORIES:
+                refresh_category_summary(connection, category)
+            db.session.commit()
+            self.cursor = paginate_items('cars')[1]
+
+    def login(self, c):
+        with c.session_transaction() as sess:
+            sess['_user_id'] = 'plan-user'
+
+    def test_routes_use_indexes_within_query_budgets(self):
+        with self.client as c:
+            self.login(c)
+            with application.app_context():
+                bind = db.engine
+                dialect = bind.dialect.name
+            for route, max_queries in ROUTES:
+                path = route.format(item=self.item_id, cursor=self.cursor)
+                with self.subTest(path=path):
+                    # Measure the uncached path
+                    for cache in (item_cache, listing_cache, suggest_cache, rate_limit_store):
+                        cache.clear()
+                    with QueryCapture(bind) as capture:
+                        self.assertEqual(c.get(path).status_code, 200)
+
+                    self.assertLessEqual(len(capture.queries), max_queries, [s for s, _ in capture.queries])
+                    self.assertEqual(capture.repeated(), {}, "statement repeated per row (N+1)")
+                    allowed = FULL_SCAN_TABLES | DIALECT_FULL_SCANS.get((dialect, route), set())
+                    with application.app_context():
+                        connection = db.session.connection()
+                        for statement, parameters in capture.selects:
+                            for scan in explain(connection, statement, parameters):
+                                if scan.table in allowed:
+                                    continue
+                                self.assertFalse(scan.full, f"unindexed scan of {scan.table}: {statement}")
+                                if scan.rows is not None:
+                                    self.assertLessEqual(scan.rows, ROW_BUDGET, f"{scan}: {statement}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import importlib.util
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from application import application, db, rate_limit_store, rate_limit_decisions
+from ratelimit import Limit, MemoryStore, RedisStore, create_store, parse_limit, parse_limits
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+# fakeredis runs Lua scripts through lupa
+FAKEREDIS_LUA = fakeredis is not None and importlib.util.find_spec('lupa') is not None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_parse_limits(self):
+        self.assertEqual(parse_limit('10/minute'), Limit(burst=10, rate=10 / 60))
+        self.assertEqual(parse_limits('login=5/second, api=100/hours'),
+                         {'login': Limit(5, 5.0), 'api': Limit(100, 100 / 3600)})
+        for invalid in ('10', '0/minute', 'ten/minute', '10/fortnight'):
+            with self.assertRaises(ValueError):
+                parse_limit(invalid)
+
+    def test_burst_then_refill_rate(self):
+        clock = FakeClock()
+        store = MemoryStore(clock=clock)
+        limit = Limit(burst=3, rate=1.0)
+        self.assertEqual([store.take('k', limit).allowed for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(store.take('k', limit).retry_after, 1.0)
+        clock.now += 1.5
+        self.assertTrue(store.take('k', limit).allowed)
+        self.assertFalse(store.take('k', limit).allowed)
+        # Other keys have their own bucket
+        self.assertTrue(store.take('other', limit).allowed)
+        # Idle buckets refill only up to the burst size
+        clock.now += 3600
+        self.assertEqual(store.take('k', limit).remaining, 2)
+
+    def test_evicted_bucket_comes_back_full(self):
+        store = MemoryStore(max_buckets=1, clock=FakeClock())
+        limit = Limit(burst=1, rate=0.001)
+        store.take('a', limit)
+        store.take('b', limit)
+        self.assertTrue(store.take('a', limit).allowed)
+
+
+@unittest.skipUnless(FAKEREDIS_LUA, "fakeredis[lua] from requirements-dev.txt is not installed")
+class TestRedisStore(unittest.TestCase):
+    """The shared store's Lua script, run on fakeredis with the server clock under test control."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch('time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = fakeredis.FakeRedis()
+        self.store = RedisStore(client=self.client)
+
+    def test_burst_then_refill_rate(self):
+        limit = Limit(burst=3, rate=1.0)
+        self.assertEqual([self.store.take('k', limit).allowed for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(self.store.take('k', limit).retry_after, 1.0)
+        self.clock.now += 1.5
+        self.assertTrue(self.store.take('k', limit).allowed)
+        self.assertFalse(self.store.take('k', limit).allowed)
+        self.assertTrue(self.store.take('other', limit).allowed)
+
+    def test_same_decisions_as_memory_store(self):
+        memory = MemoryStore(clock=self.clock)
+        limit = Limit(burst=5, rate=2.0)
+        for step in [0, 0, 0, 0.1, 0.3, 0, 0, 0, 0, 1.7, 0, 0, 0.2, 10, 0]:
+            self.clock.now += step
+            shared, local = self.store.take('k', limit), memory.take('k', limit)
+            self.assertEqual(shared[:2], local[:2])
+            # TIME has microsecond resolution
+            self.assertAlmostEqual(shared.retry_after, local.retry_after, places=5)
+
+    def test_bucket_expires_once_it_would_be_full(self):
+        limit = Limit(burst=10, rate=2.0)
+        self.store.take('k', limit, cost=4)
+        # Full again after burst / rate = 5 seconds, plus a second of slack
+        self.assertEqual(self.client.ttl('ratelimit:k'), 6)
+        self.clock.now += 5.5
+        self.assertEqual(self.client.exists('ratelimit:k'), 1)
+        self.clock.now += 1
+        self.assertEqual(self.client.exists('ratelimit:k'), 0)
+        self.assertEqual(self.store.take('k', limit).remaining, 9)
+
+    def test_clear_removes_only_its_buckets(self):
+        self.client.set('unrelated', 1)
+        self.store.take('a', Limit(1, 1.0))
+        self.store.clear()
+        self.assertEqual(self.client.keys('*'), [b'unrelated'])
+        self.assertTrue(self.store.take('a', Limit(1, 1.0)).allowed)
+
+    def test_storage_url_selects_the_store(self):
+        self.assertIsInstance(create_store('memory://'), MemoryStore)
+        self.assertIsInstance(create_store('redis://localhost:6379/0'), RedisStore)
+        with self.assertRaises(ValueError):
+            create_store('memcached://localhost')
+
+
+class TestRateLimitedRoutes(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        application.config['SECRET_KEY'] = 'test_secret_key'
+        self.limits = application.config['RATE_LIMITS']
+        application.config['RATE_LIMITS'] = {**self.limits, 'login': Limit(2, 0.001), 'api': Limit(2, 0.001)}
+        self.client = application.test_client()
+        rate_limit_store.clear()
+
+    def tearDown(self):
+        application.config['RATE_LIMITS'] = self.limits
+        application.config['RATE_LIMIT_TRUSTED_PROXIES'] = 0
+        application.config['METRICS_TOKEN'] = None
+        rate_limit_store.clear()
+
+    def test_over_budget_rejected_before_database_work(self):
+        """Test that a rejected request is answered with 429 without running a query"""
+        for _ in range(2):
+            self.assertNotEqual(self.client.get('/api/categories').status_code, 429)
+
+        statements = []
+        with application.app_context():
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                limited = rate_limit_decisions.value(group='api', scope='ip', decision='limited')
+                response = self.client.get('/api/categories')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.get_json(), {'error': 'Too many requests'})
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+        self.assertEqual(statements, [])
+        self.assertEqual(rate_limit_decisions.value(group='api', scope='ip', decision='limited'), limited + 1)
+
+    def test_limits_are_per_client(self):
+        application.config['RATE_LIMIT_TRUSTED_PROXIES'] = 1
+        for _ in range(2):
+            self.client.get('/api/categories', headers={'X-Forwarded-For': '203.0.113.1'})
+        self.assertEqual(self.client.get('/api/categories', headers={'X-Forwarded-For': '203.0.113.1'}).status_code, 429)
+        self.assertNotEqual(self.client.get('/api/categories', headers={'X-Forwarded-For': '203.0.113.2'}).status_code, 429)
+        # Signed-in users are limited by their own bucket, not their address's
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = 'someone'
+        self.assertNotEqual(self.client.get('/api/categories', headers={'X-Forwarded-For': '203.0.113.1'}).status_code, 429)
+
+    def test_metrics_endpoint_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        application.config['METRICS_TOKEN'] = 'secret'
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 404)
+        self.client.get('/api/categories')
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'ratelimit_decisions_total{group="api",scope="ip",decision="allowed"}', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
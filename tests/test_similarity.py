@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from similarity import build_features, similar_items, top_k_neighbours
+
+
+def car(item_id, price, make, year, mileage):
+    return (item_id, price, {'make': make, 'year': year, 'mileage': mileage, 'condition': 'used'}, None, None)
+
+
+class TestSimilarity(unittest.TestCase):
+    def test_features_are_unit_vectors_sorted_by_block(self):
+        rows = [car(1, 20000, 'Toyota', 2020, 10000), car(2, 21000, 'Honda', 2019, 15000),
+                car(3, 90000, 'Toyota', 2024, 100), (4, None, None, None, None)]
+        ids, features, sort_keys = build_features(rows, 'cars')
+        self.assertEqual(list(ids), [1, 2, 3, 4])
+        norms = np.linalg.norm(features, axis=1)
+        self.assertTrue(np.allclose(norms[:3], 1.0))
+        # Items without any features stay zero rather than NaN
+        self.assertFalse(np.isnan(features).any())
+        makes = [rows[i][2]['make'] if rows[i][2] else '' for i in sort_keys]
+        self.assertEqual(makes, sorted(makes))
+
+    def test_windowed_search_matches_exhaustive_search(self):
+        rng = np.random.default_rng(0)
+        features = rng.standard_normal((500, 6)).astype(np.float32)
+        features /= np.linalg.norm(features, axis=1, keepdims=True)
+        exact, exact_scores = top_k_neighbours(features, k=5, window=500, chunk_size=64)
+        windowed, _ = top_k_neighbours(features, k=5, window=600, chunk_size=64)
+        np.testing.assert_array_equal(exact, windowed)
+        self.assertTrue((exact != np.arange(500)[:, None]).all())
+        self.assertTrue((np.diff(exact_scores, axis=1) <= 0).all())
+
+        small, _ = top_k_neighbours(features[:3], k=5)
+        self.assertEqual(small.shape, (3, 2))
+
+    def test_similar_items_prefers_same_make_and_price(self):
+        rows = [car(1, 20000, 'Toyota', 2020, 10000), car(2, 20500, 'Toyota', 2020, 12000),
+                car(3, 85000, 'Tesla', 2024, 500), car(4, 90000, 'Tesla', 2024, 100),
+                car(5, 21000, 'Toyota', 2019, 20000)]
+        neighbours = {}
+        for item_id, rank, similar_id, score in similar_items(rows, 'cars', k=2):
+            neighbours.setdefault(item_id, []).append(similar_id)
+        self.assertEqual(set(neighbours[1]), {2, 5})
+        self.assertEqual(neighbours[3][0], 4)
+        self.assertNotIn(1, neighbours[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
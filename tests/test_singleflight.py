@@ -0,0 +1,213 @@
+import threading
+import time
+import unittest
+from collections import Counter
+
+from application import (application, db, Item, User, CardRow, listing_cache, listing_cache_events,
+                         rate_limit_store)
+from singleflight import CoalescingCache, SingleFlight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_callers_share_one_computation(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results, arrived = [], [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'page'
+
+        def call():
+            arrived.append(1)
+            results.append(flight.do('cars', compute))
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while len(arrived) < len(threads):
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('page', False)] + [('page', True)] * 7)
+        self.assertFalse(flight.in_flight('cars'))
+
+    def test_waiters_get_the_leaders_exception(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            raise RuntimeError('database down')
+
+        def call():
+            try:
+                flight.do('cars', compute)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        waiter = threading.Thread(target=call)
+        waiter.start()
+        time.sleep(0.05)
+        release.set()
+        leader.join(5)
+        waiter.join(5)
+        self.assertEqual(errors, ['database down'] * 2)
+        # The failure is not remembered
+        self.assertEqual(flight.do('cars', lambda: 'ok'), ('ok', False))
+
+
+class TestCoalescingCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.events = Counter()
+        self.spawned = []
+        self.loads = 0
+
+    def cache(self, **kwargs):
+        options = dict(maxsize=10, ttl=10, stale_ttl=30, beta=0, record=lambda event: self.events.update([event]),
+                       clock=self.clock, spawn=self.spawned.append)
+        options.update(kwargs)
+        return CoalescingCache(**options)
+
+    def loader(self):
+        self.loads += 1
+        self.clock.now += 2  # The query takes two seconds
+        return f'version {self.loads}'
+
+    def run_spawned(self):
+        spawned, self.spawned[:] = list(self.spawned), []
+        for refresh in spawned:
+            refresh()
+
+    def test_stale_while_revalidate(self):
+        cache = self.cache()
+        self.assertEqual(cache.get('cars', self.loader), 'version 1')
+        self.clock.now += 5
+        self.assertEqual(cache.get('cars', self.loader), 'version 1')
+        self.assertEqual(self.spawned, [])
+
+        # Expired but within stale_ttl: the old page is served while one refresh runs
+        self.clock.now += 10
+        self.assertEqual(cache.get('cars', self.loader), 'version 1')
+        self.assertEqual(cache.get('cars', self.loader), 'version 1')
+        self.assertEqual(len(self.spawned), 1)
+        self.run_spawned()
+        self.assertEqual(cache.get('cars', self.loader), 'version 2')
+
+        # Past stale_ttl the caller waits for a new value
+        self.clock.now += 100
+        self.assertEqual(cache.get('cars', self.loader), 'version 3')
+        self.assertEqual(self.events, Counter(hit=2, stale=2, miss=2, refresh_stale=1))
+
+    def test_early_probabilistic_refresh(self):
+        # random() near 0 draws a large head start, near 1 none
+        draws = [1.0, 1e-9, 1.0]
+        cache = self.cache(beta=1.0, rand=lambda: draws.pop(0))
+        cache.get('cars', self.loader)
+        self.clock.now += 8
+        self.assertEqual(cache.get('cars', self.loader), 'version 1')
+        self.assertEqual(self.spawned, [])
+        self.assertEqual(cache.get('cars', self.loader), 'version 1')
+        self.assertEqual(len(self.spawned), 1)
+        self.run_spawned()
+        self.assertEqual(cache.get('cars', self.loader), 'version 2')
+        self.assertEqual(self.events['refresh_early'], 1)
+
+    def test_failed_refresh_keeps_serving_stale_value(self):
+        cache = self.cache()
+        cache.get('cars', self.loader)
+        self.clock.now += 15
+
+        def failing():
+            raise RuntimeError('timeout')
+
+        self.assertEqual(cache.get('cars', failing), 'version 1')
+        with self.assertLogs('singleflight', 'ERROR'):
+            self.run_spawned()
+        self.assertEqual(cache.get('cars', self.loader), 'version 1')
+        self.assertEqual(self.events['refresh_failed'], 1)
+
+    def test_invalidate_discards_loads_started_before_it(self):
+        cache = self.cache()
+        cache.get('cars', self.loader)
+        cache.get('houses', self.loader)
+        cache.invalidate(lambda key: key == 'cars')
+        self.assertEqual(len(cache), 1)
+
+        def racing_write():
+            value = self.loader()
+            cache.invalidate()
+            return value
+
+        self.assertEqual(cache.get('cars', racing_write), 'version 3')
+        self.assertEqual(len(cache), 0)
+
+
+class TestListingCache(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        self.client = application.test_client()
+        rate_limit_store.clear()
+        listing_cache.clear()
+        with application.app_context():
+            db.session.add(User(id='cache-user', email='cache@example.com', name='Cache User'))
+            db.session.add_all([Item(category='cars', name=f'Cached Car {i}', price=i) for i in range(3)])
+            db.session.commit()
+
+    def tearDown(self):
+        listing_cache.clear()
+
+    def test_first_page_cached_and_evicted_on_commit(self):
+        misses = listing_cache_events.value(event='miss')
+        hits = listing_cache_events.value(event='hit')
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['_user_id'] = 'cache-user'
+            self.assertIn(b'Cached Car 2', c.get('/cars').data)
+            self.assertIn(b'Cached Car 2', c.get('/cars').data)
+            self.assertEqual(listing_cache_events.value(event='miss') - misses, 1)
+            self.assertEqual(listing_cache_events.value(event='hit') - hits, 1)
+            (items, next_cursor), = [entry[0] for entry in listing_cache.entries.values()]
+            self.assertIsInstance(items[0], CardRow)
+            self.assertIsNone(next_cursor)
+
+            with application.app_context():
+                db.session.add(Item(category='houses', name='Unrelated House', price=1))
+                db.session.commit()
+            self.assertEqual(len(listing_cache), 1)
+            with application.app_context():
+                Item.query.filter_by(name='Cached Car 0').one().name = 'Renamed Car'
+                db.session.commit()
+            self.assertEqual(len(listing_cache), 0)
+            self.assertIn(b'Renamed Car', c.get('/cars').data)
+
+            # Later pages and the API are read as before
+            self.assertEqual(c.get('/cars?cursor=bogus').status_code, 400)
+            self.assertEqual(len(c.get('/api/items/cars').get_json()['items']), 3)
+            self.assertEqual(len(listing_cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
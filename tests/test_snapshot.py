@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import snapshot
+from application import application, db, Item, User, item_cache, rate_limit_store, suggest_cache
+from snapshot import SnapshotReader
+
+
+# The exporter reads the catalog through its own connection
+@pytest.mark.commits
+class TestCatalogSnapshot(unittest.TestCase):
+    def setUp(self):
+        application.config['TESTING'] = True
+        self.client = application.test_client()
+        self.directory = tempfile.mkdtemp(prefix='snapshot-test-')
+        self.path = os.path.join(self.directory, 'catalog.db')
+        item_cache.clear()
+        suggest_cache.clear()
+        rate_limit_store.clear()
+        with application.app_context():
+            db.session.add(User(id='snapshot-user', email='snapshot@example.com', name='Snapshot User'))
+            db.session.add_all([
+                Item(category='cars', name='Toyota Camry', price=20000, specifications={'year': 2020}),
+                Item(category='cars', name='Honda Civic', price=18000),
+                Item(category='houses', name='Lake House', price=300000, latitude=47.6, longitude=-122.3),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        item_cache.clear()
+        suggest_cache.clear()
+
+    def export(self):
+        with application.app_context():
+            return snapshot.export(db.engine, Item.__table__, self.path, batch_size=2, log=lambda message: None)
+
+    def add_item(self, **fields):
+        with application.app_context():
+            item = Item(**fields)
+            db.session.add(item)
+            db.session.commit()
+            return item.id
+
+    def test_export_publishes_complete_file(self):
+        self.assertEqual(self.export(), 3)
+        self.assertEqual(snapshot.info(self.path)['item_count'], '3')
+        self.assertEqual([name for name in os.listdir(self.directory)], ['catalog.db'])
+
+    def test_catalog_routes_served_from_snapshot(self):
+        """Test that catalog reads come from the snapshot, and a republished snapshot replaces it"""
+        self.export()
+        later_id = self.add_item(category='cars', name='Toyota Corolla', price=15000)
+        reader = SnapshotReader(self.path, check_interval=0)
+        try:
+            with patch('application.catalog_snapshot', reader), self.client as c:
+                with c.session_transaction() as sess:
+                    sess['_user_id'] = 'snapshot-user'
+                names = [item['name'] for item in c.get('/api/items/cars?sort=price_asc').get_json()['items']]
+                self.assertEqual(names, ['Honda Civic', 'Toyota Camry'])
+                self.assertIn('Toyota Camry', c.get('/cars').data.decode('utf-8'))
+                self.assertEqual(c.get(f'/item/{later_id}').status_code, 404)
+                self.assertEqual([s['name'] for s in c.get('/api/suggest?q=toyo').get_json()], ['Toyota Camry'])
+                nearby = c.get('/api/items/houses?lat=47.6&lon=-122.3&radius_km=10').get_json()
+                self.assertEqual([item['name'] for item in nearby['items']], ['Lake House'])
+
+                # A session reading the old file keeps reading it after the swap
+                old_session = reader.session()
+                self.assertEqual(old_session.query(Item).filter_by(category='cars').count(), 2)
+                self.export()
+                suggest_cache.clear()
+                self.assertEqual(old_session.query(Item).filter_by(category='cars').count(), 2)
+                old_session.close()
+                self.assertEqual(c.get(f'/item/{later_id}').status_code, 200)
+                self.assertEqual([s['name'] for s in c.get('/api/suggest?q=toyo').get_json()],
+                                 ['Toyota Camry', 'Toyota Corolla'])
+        finally:
+            reader.dispose()
+
+    def test_snapshot_is_read_only(self):
+        self.export()
+        reader = SnapshotReader(self.path)
+        try:
+            session = reader.session()
+            session.add(Item(category='cars', name='Not Allowed', price=1))
+            with self.assertRaises(OperationalError):
+                session.commit()
+            session.close()
+        finally:
+            reader.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import io
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+import thumbnails
+from application import Item, thumbnail_src
+from thumbnails import IconRejected, LocalStore, S3Store, check_public_url, create_store, fetch_icon, make_thumbnail
+
+
+def resolving_to(*addresses):
+    return lambda host, port, **kwargs: [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (a, port)) for a in addresses]
+
+
+def fake_response(status=200, headers=None, chunks=()):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.is_redirect = status in (301, 302, 303, 307, 308)
+    response.headers = headers or {}
+    response.iter_content.return_value = iter(chunks)
+    response.raise_for_status.return_value = None
+    return response
+
+
+def png_bytes(size, mode='RGB'):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class TestIconFetch(unittest.TestCase):
+    def test_only_public_http_urls_allowed(self):
+        for url in ('file:///etc/passwd', 'ftp://example.com/a.png', 'gopher://example.com/', 'http:///a.png',
+                    'http://127.0.0.1/a.png', 'http://10.0.0.5/a.png', 'http://192.168.1.1/a.png',
+                    'http://169.254.169.254/latest/meta-data/', 'http://[::1]/a.png',
+                    'http://[::ffff:127.0.0.1]/a.png', 'http://100.64.0.1/a.png', 'http://0.0.0.0/a.png'):
+            with self.subTest(url=url):
+                with self.assertRaises(IconRejected):
+                    check_public_url(url)
+        check_public_url('https://93.184.216.34/a.png')
+
+    def test_host_with_any_private_address_rejected(self):
+        with patch('thumbnails.socket.getaddrinfo', resolving_to('93.184.216.34', '10.1.2.3')):
+            with self.assertRaises(IconRejected):
+                check_public_url('http://icons.example.com/a.png')
+        with patch('thumbnails.socket.getaddrinfo', resolving_to('93.184.216.34')):
+            check_public_url('http://icons.example.com/a.png')
+
+    def test_redirect_to_private_address_not_followed(self):
+        redirect = fake_response(302, {'Location': 'http://169.254.169.254/latest/meta-data/'})
+        with patch('thumbnails.requests.get', return_value=redirect) as get:
+            with self.assertRaises(IconRejected):
+                fetch_icon('http://93.184.216.34/a.png')
+        self.assertEqual(get.call_count, 1)
+        self.assertFalse(get.call_args.kwargs['allow_redirects'])
+
+    def test_response_size_capped_before_decoding(self):
+        declared = fake_response(headers={'Content-Length': str(thumbnails.MAX_ICON_BYTES + 1)})
+        with patch('thumbnails.requests.get', return_value=declared):
+            with self.assertRaises(IconRejected):
+                fetch_icon('http://93.184.216.34/a.png')
+        declared.iter_content.assert_not_called()
+
+        streamed = fake_response(chunks=[b'x' * 600, b'x' * 600])
+        with patch('thumbnails.requests.get', return_value=streamed):
+            with self.assertRaises(IconRejected):
+                fetch_icon('http://93.184.216.34/a.png', max_bytes=1000)
+
+        small = fake_response(chunks=[b'ab', b'cd'])
+        with patch('thumbnails.requests.get', return_value=small):
+            self.assertEqual(fetch_icon('http://93.184.216.34/a.png'), b'abcd')
+
+    def test_make_thumbnail_rejects_huge_or_invalid_images(self):
+        data = make_thumbnail(png_bytes((800, 600)))
+        self.assertEqual(Image.open(io.BytesIO(data)).size, (400, 300))
+        with self.assertRaises(IconRejected):
+            make_thumbnail(png_bytes((8000, 6000), mode='1'))
+        with self.assertRaises(IconRejected):
+            make_thumbnail(b'<html>not an image</html>')
+
+
+class TestThumbnailStores(unittest.TestCase):
+    def setUp(self):
+        self.static = tempfile.mkdtemp()
+        self.store = LocalStore(self.static, '/static')
+
+    def tearDown(self):
+        shutil.rmtree(self.static)
+
+    def test_local_thumbnail_only_servable_while_its_file_exists(self):
+        url = self.store.save('7.abc.webp', b'data')
+        self.assertEqual(url, '/static/thumbnails/7.abc.webp')
+        self.assertTrue(self.store.servable(url))
+
+        # A new deploy, or another instance, has no copy
+        os.remove(os.path.join(self.static, 'thumbnails', '7.abc.webp'))
+        self.assertFalse(self.store.servable(url))
+        self.assertFalse(self.store.servable('/static/thumbnails/../thumbnails/7.abc.webp'))
+        self.assertTrue(self.store.servable('https://cdn.example.com/thumbnails/7.abc.webp'))
+
+    def test_cards_fall_back_to_icon_without_local_file(self):
+        item = Item(id=1, name='Car', icon_url='http://example.com/car.png',
+                    thumbnail_url='/static/thumbnails/1.missing.webp')
+        self.assertIsNone(thumbnail_src(item.thumbnail_url))
+        self.assertIsNone(item.to_dict()['thumbnail_url'])
+        self.assertEqual(thumbnail_src('https://cdn.example.com/thumbnails/1.a.webp'),
+                         'https://cdn.example.com/thumbnails/1.a.webp')
+
+    def test_s3_store_uploads_shared_immutable_copy(self):
+        client = MagicMock()
+        store = S3Store('marketplace-media', 'thumbnails/', 'https://cdn.example.com/', client=client)
+        self.assertEqual(store.save('7.abc.webp', b'data'), 'https://cdn.example.com/thumbnails/7.abc.webp')
+        client.put_object.assert_called_once()
+        kwargs = client.put_object.call_args.kwargs
+        self.assertEqual((kwargs['Bucket'], kwargs['Key'], kwargs['ContentType']),
+                         ('marketplace-media', 'thumbnails/7.abc.webp', 'image/webp'))
+        self.assertIn('immutable', kwargs['CacheControl'])
+
+    def test_create_store_dispatch(self):
+        self.assertIsInstance(create_store('local://', self.static, '/static'), LocalStore)
+        with patch.dict('sys.modules', boto3=MagicMock()):
+            store = create_store('s3://marketplace-media/thumbs/', self.static, '/static')
+        self.assertEqual((store.bucket, store.prefix, store.base_url),
+                         ('marketplace-media', 'thumbs/', 'https://marketplace-media.s3.amazonaws.com'))
+        for url in ('s3:///thumbs', 'ftp://host/'):
+            with self.assertRaises(ValueError):
+                create_store(url, self.static, '/static')
+
+
+if __name__ == '__main__':
+    unittest.main()
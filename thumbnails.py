@@ -0,0 +1,157 @@
+"""
+Item thumbnails: fetching an item's icon, resizing it and storing the copy.
+
+icon_url is supplied by whoever listed the item, so fetch_icon() only requests
+http(s) URLs whose host resolves to public addresses only (checked again for
+every redirect), and stops reading after MAX_ICON_BYTES, before the image is
+decoded. Images larger than MAX_ICON_PIXELS are not decoded at all.
+
+Thumbnails are written to a store selected by URL:
+
+- s3://bucket/prefix   one bucket shared by every instance, and kept across
+                       deploys. Pages link to THUMBNAIL_BASE_URL (a CDN in front
+                       of the bucket), or to the bucket's own public URL.
+- local://             static/thumbnails on the instance that ran the job. static/
+                       is rebuilt on every deploy and not shared between
+                       instances, so pages only link a local thumbnail that exists
+                       on the serving instance and fall back to icon_url otherwise.
+"""
+
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from assets import IMMUTABLE_CACHE_CONTROL
+
+THUMBNAIL_SIZE = (400, 300)
+FETCH_TIMEOUT = 10
+MAX_ICON_BYTES = 10 * 1024 * 1024
+MAX_ICON_PIXELS = 40_000_000
+MAX_REDIRECTS = 3
+LOCAL_DIR = 'thumbnails'
+
+
+class IconRejected(ValueError):
+    """The icon URL or its response is not one the thumbnail job will fetch or decode."""
+
+
+def check_public_url(url):
+    """Raise IconRejected unless url is http(s) and every address of its host is public."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise IconRejected(f"not an http(s) URL: {url!r}")
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)}
+    except (OSError, ValueError) as e:
+        raise IconRejected(f"cannot resolve {parts.hostname!r}: {e}") from e
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        # is_global excludes private, loopback, link-local, shared and reserved ranges
+        if not ip.is_global or ip.is_multicast:
+            raise IconRejected(f"{parts.hostname!r} resolves to non-public address {ip}")
+
+
+def fetch_icon(url, max_bytes=MAX_ICON_BYTES, timeout=FETCH_TIMEOUT):
+    """Download an icon, following up to MAX_REDIRECTS redirects to public hosts only."""
+    for _ in range(MAX_REDIRECTS + 1):
+        check_public_url(url)
+        with requests.get(url, timeout=timeout, stream=True, allow_redirects=False) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['Location'])
+                continue
+            response.raise_for_status()
+            length = response.headers.get('Content-Length', '')
+            if length.isdigit() and int(length) > max_bytes:
+                raise IconRejected(f"icon is {length} bytes, over the {max_bytes} byte limit")
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > max_bytes:
+                    raise IconRejected(f"icon is over the {max_bytes} byte limit")
+            return bytes(data)
+    raise IconRejected(f"more than {MAX_REDIRECTS} redirects")
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    """Shrink image bytes to fit size; returns WEBP bytes."""
+    from PIL import Image
+
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.UnidentifiedImageError as e:
+        raise IconRejected("icon is not an image") from e
+    # Checked from the header, before any pixels are decoded
+    if image.width * image.height > MAX_ICON_PIXELS:
+        raise IconRejected(f"icon is {image.width}x{image.height}, over {MAX_ICON_PIXELS} pixels")
+    image.thumbnail(size)
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'WEBP', quality=80)
+    return buffer.getvalue()
+
+
+def thumbnail_name(item_id, data):
+    # Content-hashed name, so a changed icon never serves a stale cached thumbnail
+    return f"{item_id}.{hashlib.sha256(data).hexdigest()[:12]}.webp"
+
+
+class LocalStore:
+    """Thumbnails under static/thumbnails of this instance only."""
+
+    def __init__(self, static_folder, static_url_path):
+        self.directory = os.path.join(static_folder, LOCAL_DIR)
+        self.url_prefix = f"{static_url_path}/{LOCAL_DIR}/"
+
+    def save(self, name, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+        return self.url_prefix + name
+
+    def servable(self, url):
+        """Whether this instance can serve url: local thumbnails only while their file exists."""
+        if not url.startswith(self.url_prefix):
+            return True
+        name = url[len(self.url_prefix):]
+        return '/' not in name and os.path.isfile(os.path.join(self.directory, name))
+
+
+class S3Store:
+    """Thumbnails in an S3 bucket shared by every instance (boto3, from requirements.txt)."""
+
+    def __init__(self, bucket, prefix='thumbnails/', base_url=None, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client('s3')
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.base_url = (base_url or f"https://{bucket}.s3.amazonaws.com").rstrip('/')
+
+    def save(self, name, data):
+        key = self.prefix + name
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType='image/webp',
+                               CacheControl=IMMUTABLE_CACHE_CONTROL)
+        return f"{self.base_url}/{key}"
+
+
+def create_store(url, static_folder, static_url_path, base_url=None):
+    """Store for a THUMBNAIL_STORE_URL: 'local://' or 's3://bucket/prefix'."""
+    if url.startswith('s3://'):
+        bucket, _, prefix = url[len('s3://'):].partition('/')
+        if not bucket:
+            raise ValueError(f"invalid thumbnail store {url!r}, expected s3://bucket/prefix")
+        prefix = prefix.strip('/')
+        return S3Store(bucket, f"{prefix}/" if prefix else '', base_url)
+    if url.startswith('local://'):
+        return LocalStore(static_folder, static_url_path)
+    raise ValueError(f"unsupported thumbnail store {url!r}, expected local:// or s3://bucket/prefix")